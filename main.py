@@ -11,7 +11,8 @@ import uvicorn
 app = FastAPI()
 
 
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from services.scanner.src.metrics import CONTENT_TYPE, render as render_metrics
 
 @app.get("/", response_class=JSONResponse)
 @app.head("/", response_class=JSONResponse)
@@ -19,6 +20,12 @@ def ping():
     return {"status": "ok"}
 
 
+@app.get("/metrics")
+def metrics():
+    # scanner (quand /run tourne dans ce process) + bot: HTTP Bitget, scoring, redis, Telegram, stream d'alertes
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE)
+
+
 
 async def start():
     # lance uvicorn dans une coroutine séparée
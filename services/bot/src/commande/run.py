@@ -1,5 +1,6 @@
 import asyncio
 from aiogram import types, Bot
+from services.bot.src.delivery import get_delivery, winner_digest_line
 from services.bot.src.utils import compute_price_and_changes, format_winner_message, alert_listener
 from services.scanner.src.worker import BotWorker
 from loguru import logger
@@ -13,7 +14,7 @@ _alert_task: Optional[asyncio.Task] = None
 async def _get_worker():
     global _worker
     if _worker is None:
-        _worker = BotWorker()  # simple instance
+        _worker = BotWorker(scoring_workers=0)  # instance simple; scoring dans un thread, pas de processus dans le bot
     return _worker
 
 async def cmd_run(message: types.Message):
@@ -77,13 +78,23 @@ async def cmd_run(message: types.Message):
         await message.reply("\n".join(lines), parse_mode="HTML")
         return
 
-    for sym, summary, top in winners[:MAX_DISPLAY]:
+    delivery = get_delivery(message.bot)
+
+    async def send_winner(sym, summary, top):
         try:
             price_now, pct_1h, pct_24h, pct_7d = await compute_price_and_changes(sym)
             #print(sym, summary, price_now, pct_1h, pct_24h, pct_7d)
         except Exception:
             price_now = pct_1h = pct_24h = pct_7d = None
         msg = format_winner_message(sym, summary, price_now, pct_1h, pct_24h, pct_7d)
-        await message.reply(msg, parse_mode="HTML")
+        await delivery.submit(message.chat.id, msg, digest_line=winner_digest_line(sym, top, pct_24h))
+
+    # envoyés en parallèle via la file (limites Telegram, digest si rafale)
+    sent = await asyncio.gather(*(send_winner(sym, summary, top) for sym, summary, top in winners[:MAX_DISPLAY]),
+                                return_exceptions=True)
+    for err in sent:
+        if isinstance(err, Exception):
+            logger.error("winner message failed: {}", err)
 
-    await message.reply(f"🔔 {len(winners)} winner(s) detected in this batch (threshold {ALERT_THRESHOLD}).")
+    await delivery.submit(message.chat.id,
+                          f"🔔 {len(winners)} winner(s) detected in this batch (threshold {ALERT_THRESHOLD}).")
@@ -2,4 +2,4 @@ from aiogram import types
 from aiogram.filters import Command
 
 async def cmd_start(message: types.Message):
-    await message.reply("🤖 Bot ready. Commands: /run /stop /status /result (SYMBOL) /next" , parse_mode="HTML")
+    await message.reply("🤖 Bot ready. Commands: /run /stop /status /result (SYMBOL) /next /top (N) (1h|1d) /trace (RATE|off)" , parse_mode="HTML")
@@ -2,13 +2,27 @@ import os
 import json
 from aiogram import types
 from services.bot.src.utils import ensure_redis
+from services.scanner.src.scheduler import merge_snapshots
+from services.scanner.src.shards import SHARD_OWNED_PREFIX, SHARD_WORKERS_KEY
 from loguru import logger
 
 REDIS_INDEX_KEY = "bot:symbol_index"
+REDIS_SCHEDULER_KEY = "bot:scheduler"
+
+async def _scheduler_snapshot(r):
+    """File du scheduler (mode priority): bot:scheduler, ou bot:scheduler:<shard> en mode shardé."""
+    keys = [REDIS_SCHEDULER_KEY] + sorted([k async for k in r.scan_iter(match=REDIS_SCHEDULER_KEY + ":*")])
+    return merge_snapshots(await r.mget(keys))
+
+async def _rotation_indexes(r):
+    """Index de rotation (mode roundrobin): bot:symbol_index, ou un par shard."""
+    keys = sorted([k async for k in r.scan_iter(match=REDIS_INDEX_KEY + ":*")])
+    if not keys:
+        return [("", await r.get(REDIS_INDEX_KEY) or "0")]
+    return [(k.rsplit(":", 1)[1], v or "0") for k, v in zip(keys, await r.mget(keys))]
 
 async def cmd_status(message: types.Message, worker_task=None):
     r = await ensure_redis()
-    idx = await r.get(REDIS_INDEX_KEY) or "0"
     total = "unknown"
     try:
         path = os.getenv("SYMBOL_LIST_FILE", "filtered_pairs.json")
@@ -18,4 +32,38 @@ async def cmd_status(message: types.Message, worker_task=None):
     except Exception:
         total = "unknown"
     worker_running = worker_task and not worker_task.done()
-    await message.reply(f"Index: {idx}\nTotal symbols: {total}\nWorker running: {worker_running}")
+    try:
+        snap = await _scheduler_snapshot(r)
+    except Exception as e:
+        logger.warning("status: scheduler snapshot unreadable: {}", e)
+        snap = None
+    lines = [f"Total symbols: {total}", f"Worker running: {worker_running}"]
+    if snap:
+        # mode priority: pas d'index de rotation, l'état est la file du scheduler (écrite à chaque batch)
+        scanned = [e for e in snap["queue"] if e.get("heat") is not None]
+        heat = sum(e["heat"] for e in scanned) / len(scanned) if scanned else 0.0
+        intervals = sorted(e["interval"] for e in snap["queue"] if e.get("interval"))
+        lines.append(f"Schedule: priority ({snap['snapshots']} snapshot(s))")
+        lines.append(f"Due now: {snap['due']}/{snap['symbols']} (never scanned: {snap['never_scanned']})")
+        lines.append(f"Mean heat: {heat:.2f}")
+        if intervals:
+            lines.append(f"Intervals: {intervals[0] / 60:.0f}-{intervals[len(intervals) // 2] / 60:.0f}"
+                         f"-{intervals[-1] / 60:.0f} min (min-median-max)")
+        for e in snap["queue"][:5]:
+            heat_e = "-" if e.get("heat") is None else f"{e['heat']:.2f}"
+            lines.append(f"• {e['symbol']} in {max(0, e['due_in']) / 60:.0f} min (score {e['score']}, heat {heat_e}, "
+                         f"every {(e['interval'] or 0) / 60:.0f} min)")
+    else:
+        for shard, idx in await _rotation_indexes(r):
+            lines.append(f"Index{f' (shard {shard})' if shard else ''}: {idx}")
+    try:
+        workers = await r.zrange(SHARD_WORKERS_KEY, 0, -1)
+        owned = await r.mget([SHARD_OWNED_PREFIX + w for w in workers]) if workers else []
+    except Exception:
+        workers, owned = [], []
+    if workers:
+        # scanners en mode shardé (SCAN_SHARDS > 0) et shards dont ils détiennent le bail
+        lines.append(f"Scanners: {len(workers)}")
+        for w, shards in zip(workers, owned):
+            lines.append(f"• {w}: shards {shards or '-'}")
+    await message.reply("\n".join(lines))
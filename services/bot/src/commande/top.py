@@ -0,0 +1,36 @@
+import html
+from aiogram import types
+from loguru import logger
+from services.bot.src.utils import ensure_redis
+from services.scanner.src.result_store import TOP_TIMEFRAMES, top_symbols
+
+MAX_TOP = 50
+
+async def cmd_top(message: types.Message):
+    # /top [N] [1h|1d]
+    parts = message.text.strip().split()[1:]
+    n, timeframe = 10, "1h"
+    for p in parts:
+        if p.isdigit():
+            n = min(int(p), MAX_TOP)
+        elif p.lower() in TOP_TIMEFRAMES:
+            timeframe = p.lower()
+        else:
+            await message.reply("Usage: /top [N] [1h|1d] (e.g. /top 10 1d)")
+            return
+
+    r = await ensure_redis()
+    try:
+        rows = await top_symbols(r, timeframe, n)
+    except Exception as e:
+        logger.exception("redis top error: {}", e)
+        await message.reply(f"Redis error: {html.escape(str(e))}")
+        return
+
+    if not rows:
+        await message.reply(f"ℹ️ No {timeframe} scores yet. Use /run or /next first.")
+        return
+
+    lines = [f"🏆 <b>Top {len(rows)} — {timeframe}</b>"]
+    lines.extend(f"{i}. {html.escape(sym)} — <code>{sc:.4f}</code>" for i, (sym, sc) in enumerate(rows, 1))
+    await message.reply("\n".join(lines), parse_mode="HTML")
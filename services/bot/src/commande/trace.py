@@ -0,0 +1,35 @@
+import html
+from aiogram import types
+from loguru import logger
+from services.bot.src.utils import ensure_redis
+from services.scanner.src.tracing import TRACE_DIR, TRACE_RATE_KEY, TRACE_SAMPLE_RATE, parse_rate
+
+USAGE = "Usage: /trace [RATE|off|default] (e.g. /trace 0.01 or /trace 5%)"
+
+async def cmd_trace(message: types.Message):
+    # /trace [rate|off|default]: taux d'échantillonnage des traces de sweep, lu par tous les scanners
+    parts = message.text.strip().split()[1:]
+    r = await ensure_redis()
+    try:
+        if not parts:
+            rate = parse_rate(await r.get(TRACE_RATE_KEY))
+            source = "set by /trace" if rate is not None else "TRACE_SAMPLE_RATE"
+            rate = TRACE_SAMPLE_RATE if rate is None else rate
+            await message.reply(f"Trace sampling: {rate:.2%} of symbols per sweep ({source}).\n"
+                                f"Chrome trace files: {TRACE_DIR} on each scanner.\n{USAGE}")
+            return
+        arg = parts[0].lower()
+        if arg == "default":
+            await r.delete(TRACE_RATE_KEY)
+            await message.reply(f"Trace sampling back to TRACE_SAMPLE_RATE ({TRACE_SAMPLE_RATE:.2%}).")
+            return
+        rate = 0.0 if arg == "off" else parse_rate(arg)
+        if rate is None:
+            await message.reply(USAGE)
+            return
+        await r.set(TRACE_RATE_KEY, rate)
+    except Exception as e:
+        logger.exception("redis trace error: {}", e)
+        await message.reply(f"Redis error: {html.escape(str(e))}")
+        return
+    await message.reply(f"Trace sampling set to {rate:.2%}; applies from the scanners' next batch.")
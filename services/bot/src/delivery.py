@@ -0,0 +1,183 @@
+# services/bot/src/delivery.py
+import asyncio
+import html
+import os
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from loguru import logger
+from services.scanner.src.metrics import TELEGRAM_LATENCY, TELEGRAM_SENDS
+from services.scanner.src.ratelimit import TokenBucket
+
+# Telegram: ~30 msg/s per bot overall, ~1 msg/s per chat (20/min in groups)
+TG_GLOBAL_RPS = float(os.getenv("TG_GLOBAL_RPS", 25))
+TG_CHAT_RPS = float(os.getenv("TG_CHAT_RPS", 1))
+TG_CHAT_BURST = float(os.getenv("TG_CHAT_BURST", 3))
+TG_DIGEST_THRESHOLD = int(os.getenv("TG_DIGEST_THRESHOLD", 5))  # more queued alerts than that -> one digest
+TG_DIGEST_WINDOW = float(os.getenv("TG_DIGEST_WINDOW", 0.5))    # seconds to let a burst accumulate
+TG_MAX_RETRIES = int(os.getenv("TG_MAX_RETRIES", 5))
+TG_MAX_LEN = 4000  # Telegram caps messages at 4096 chars
+
+
+class _Item:
+    __slots__ = ("text", "digest_line", "parse_mode", "future")
+
+    def __init__(self, text: str, digest_line: Optional[str], parse_mode: str, future: asyncio.Future):
+        self.text = text
+        self.digest_line = digest_line
+        self.parse_mode = parse_mode
+        self.future = future
+
+
+class DeliveryQueue:
+    """
+    Envoi des messages du bot: une file par chat, les chats en parallèle.
+    Chaque envoi passe par un token bucket global et un par chat; un
+    TelegramRetryAfter est attendu puis réessayé. Si plus de
+    `digest_threshold` messages "résumables" attendent pour un même chat, ils
+    partent regroupés en un digest (découpé sous la limite de taille).
+    """
+
+    def __init__(self, bot: Bot, global_rate: float = TG_GLOBAL_RPS, chat_rate: float = TG_CHAT_RPS,
+                 chat_burst: float = TG_CHAT_BURST, digest_threshold: int = TG_DIGEST_THRESHOLD,
+                 digest_window: float = TG_DIGEST_WINDOW, max_retries: int = TG_MAX_RETRIES):
+        self.bot = bot
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.digest_threshold = digest_threshold
+        self.digest_window = digest_window
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: Dict[int, TokenBucket] = {}
+        self._queues: Dict[int, Deque[_Item]] = {}
+        self._runners: Dict[int, asyncio.Task] = {}
+        self.stats = {"sent": 0, "digests": 0, "coalesced": 0, "retry_after": 0, "failed": 0}
+
+    def submit(self, chat_id: int, text: str, digest_line: Optional[str] = None,
+               parse_mode: str = "HTML") -> asyncio.Future:
+        """
+        Met un message en file; le future est résolu quand il (ou le digest qui
+        le contient) est parti, ou porte l'exception de l'envoi.
+        `digest_line`: version une ligne du message, None = jamais regroupé.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._queues.setdefault(chat_id, deque()).append(_Item(text, digest_line, parse_mode, future))
+        runner = self._runners.get(chat_id)
+        if runner is None or runner.done():
+            self._runners[chat_id] = asyncio.create_task(self._run_chat(chat_id))
+        return future
+
+    async def _run_chat(self, chat_id: int):
+        q = self._queues[chat_id]
+        sending: List[_Item] = []
+        try:
+            if self.digest_window > 0:
+                # laisse une rafale s'accumuler pour décider digest / messages un par un
+                await asyncio.sleep(self.digest_window)
+            while q:
+                digestible = [it for it in q if it.digest_line is not None]
+                if len(digestible) > self.digest_threshold:
+                    q_rest = deque(it for it in q if it.digest_line is None)
+                    q.clear()
+                    q.extend(q_rest)
+                    sending = digestible
+                    await self._send_digest(chat_id, digestible)
+                    continue
+                item = q.popleft()
+                sending = [item]
+                await self._deliver(chat_id, item.text, item.parse_mode, [item])
+        finally:
+            # runner annulé (close(), arrêt du bot): personne ne doit rester bloqué sur un future
+            for it in sending + list(q):
+                if not it.future.done():
+                    it.future.cancel()
+            q.clear()
+            if self._runners.get(chat_id) is asyncio.current_task():
+                self._runners.pop(chat_id, None)
+
+    async def _send_digest(self, chat_id: int, items: List[_Item]):
+        header = f"🚀 <b>{len(items)} winners</b>\n"
+        chunk: List[_Item] = []
+        size = len(header)
+        for it in items:
+            if chunk and size + len(it.digest_line) + 1 > TG_MAX_LEN:
+                await self._deliver(chat_id, header + "\n".join(i.digest_line for i in chunk), "HTML", chunk)
+                chunk, size = [], len(header)
+            chunk.append(it)
+            size += len(it.digest_line) + 1
+        if chunk:
+            await self._deliver(chat_id, header + "\n".join(i.digest_line for i in chunk), "HTML", chunk)
+        self.stats["coalesced"] += len(items)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def _deliver(self, chat_id: int, text: str, parse_mode: str, items: List[_Item]):
+        try:
+            await self._send_message(chat_id, text, parse_mode)
+        except Exception as e:
+            self.stats["failed"] += 1
+            for it in items:
+                if not it.future.done():
+                    it.future.set_exception(e)
+            return
+        if len(items) > 1:
+            self.stats["digests"] += 1
+        for it in items:
+            if not it.future.done():
+                it.future.set_result(None)
+
+    async def _send_message(self, chat_id: int, text: str, parse_mode: str):
+        attempt = 0
+        while True:
+            await self._chat_bucket(chat_id).acquire()
+            await self._global.acquire()
+            t0 = time.perf_counter()
+            try:
+                await self.bot.send_message(chat_id, text, parse_mode=parse_mode)
+                TELEGRAM_LATENCY.observe(time.perf_counter() - t0)
+                TELEGRAM_SENDS.labels("sent").inc()
+                self.stats["sent"] += 1
+                return
+            except TelegramRetryAfter as e:
+                TELEGRAM_LATENCY.observe(time.perf_counter() - t0)
+                TELEGRAM_SENDS.labels("retry_after").inc()
+                attempt += 1
+                self.stats["retry_after"] += 1
+                if attempt > self.max_retries:
+                    raise
+                logger.warning("telegram flood control on chat {}: retry in {}s", chat_id, e.retry_after)
+                await asyncio.sleep(e.retry_after)
+            except Exception:
+                TELEGRAM_LATENCY.observe(time.perf_counter() - t0)
+                TELEGRAM_SENDS.labels("error").inc()
+                raise
+
+    async def close(self):
+        for t in list(self._runners.values()):
+            t.cancel()
+        await asyncio.gather(*self._runners.values(), return_exceptions=True)
+        self._runners.clear()
+
+
+_queues: Dict[int, DeliveryQueue] = {}
+
+
+def get_delivery(bot: Bot) -> DeliveryQueue:
+    """File partagée par bot (alertes, /run): les limites Telegram sont par bot."""
+    dq = _queues.get(id(bot))
+    if dq is None:
+        dq = _queues[id(bot)] = DeliveryQueue(bot)
+    return dq
+
+
+def winner_digest_line(symbol: str, top: float, pct_24h: Optional[float] = None) -> str:
+    line = f"• <b>{html.escape(symbol)}</b> — score <code>{top:.4f}</code>"
+    if pct_24h is not None:
+        line += f" | 24h <code>{pct_24h * 100:+.2f}%</code>"
+    return line
@@ -7,6 +7,8 @@ from services.bot.src.commande.run import cmd_run
 from services.bot.src.commande.stop import cmd_stop
 from services.bot.src.commande.next import cmd_next
 from services.bot.src.commande.result import cmd_result
+from services.bot.src.commande.top import cmd_top
+from services.bot.src.commande.trace import cmd_trace
 
 # Crée un router central
 router = Router()
@@ -18,3 +20,5 @@ router.message.register(cmd_run, Command(commands=["run"]))
 router.message.register(cmd_stop, Command(commands=["stop"]))
 router.message.register(cmd_next, Command(commands=["next"]))
 router.message.register(cmd_result, Command(commands=["result"]))
+router.message.register(cmd_top, Command(commands=["top"]))
+router.message.register(cmd_trace, Command(commands=["trace"]))
@@ -5,6 +5,8 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from loguru import logger
 from services.bot.src.handlers import router  # on importe le router (aiogram v3)
+from services.scanner.src.http_client import close_client
+from services.scanner.src.settings import setup_logging
 
 TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 if not TELEGRAM_TOKEN:
@@ -16,6 +18,7 @@ dp = Dispatcher()
 async def main():
     # inclure le router contenant tous les handlers
     dp.include_router(router)
+    setup_logging()
 
     logger.info("🤖 Bot starting...")
     try:
@@ -24,6 +27,7 @@ async def main():
         logger.exception(f"❌ Bot crashed: {e}")
     finally:
         await bot.session.close()
+        await close_client()
         logger.info("🛑 Bot stopped.")
 
 if __name__ == "__main__":
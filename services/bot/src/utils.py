@@ -1,15 +1,28 @@
 ﻿import os
 import json
 import html
+import socket
+import time
 import asyncio
 from typing import Optional
 from loguru import logger
 from aiogram import Bot
 import redis.asyncio as aioredis
+from services.bot.src.delivery import get_delivery, winner_digest_line
+from services.scanner.src.alert_codec import decode_alert
 from services.scanner.src.fetcher import get_candles
+from services.scanner.src.metrics import ALERT_STREAM_BACKLOG, ALERT_STREAM_LAG, ALERT_STREAM_PENDING
+from services.scanner.src.price_cache import get_cached_price, price_and_changes, set_cached_price
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 ALERT_STREAM = os.getenv("ALERT_STREAM", "alerts_stream")
+ALERT_GROUP = os.getenv("ALERT_GROUP", "bots")
+# stable across restarts: a restarted replica picks its own unacked alerts back up
+ALERT_CONSUMER = os.getenv("ALERT_CONSUMER", socket.gethostname())
+ALERT_CLAIM_IDLE_MS = int(os.getenv("ALERT_CLAIM_IDLE_MS", 60_000))  # pending longer than that -> reclaimed
+ALERT_CLAIM_EVERY = float(os.getenv("ALERT_CLAIM_EVERY", 30))         # seconds between XAUTOCLAIM passes
+ALERT_SENT_PREFIX = "bot:alert_sent:"  # bot:alert_sent:<group>:<msg_id>, guards against double sends
+ALERT_SENT_TTL = int(os.getenv("ALERT_SENT_TTL", 24 * 3600))
 
 # Redis client global
 _redis = None
@@ -96,59 +109,142 @@ def format_winner_message(symbol: str, summary: dict, price: Optional[float],
     return header + body + footer
 
 
-async def compute_price_and_changes(symbol: str):
-    # identique à ton compute_price_and_changes
+async def _fetch_price_and_changes(symbol: str):
     try:
         candles_1h = await get_candles(symbol, "1h", limit=2)
-        last = float(candles_1h[-1][4]) if candles_1h else 0.0
-        prev = float(candles_1h[-2][4]) if len(candles_1h) >= 2 else last
-        pct_1h = (last - prev) / prev if prev != 0 else 0.0
+        closes_1h = [float(c[4]) for c in candles_1h]
     except Exception:
-        last = 0.0
-        pct_1h = None
+        closes_1h = None
 
     try:
         candles_1d = await get_candles(symbol, "1day", limit=8)
-        lastd = float(candles_1d[-1][4]) if candles_1d else last
-        prev24 = float(candles_1d[-2][4]) if len(candles_1d) >= 2 else lastd
-        pct_24h = (lastd - prev24) / prev24 if prev24 != 0 else 0.0
-        prev7 = float(candles_1d[-8][4]) if len(candles_1d) >= 8 else lastd
-        pct_7d = (lastd - prev7) / prev7 if prev7 != 0 else 0.0
-        price_now = lastd if candles_1d else last
+        closes_1d = [float(c[4]) for c in candles_1d]
     except Exception:
-        price_now = last
-        pct_24h = pct_7d = None
+        closes_1d = None
 
+    price_now, pct_1h, pct_24h, pct_7d = price_and_changes(closes_1h or [], closes_1d or [])
+    if closes_1h is None:
+        pct_1h = None
+    if closes_1d is None:
+        pct_24h = pct_7d = None
     return price_now, pct_1h, pct_24h, pct_7d
 
 
-async def alert_listener(bot: Bot, chat_id: int, redis_url: str = REDIS_URL):
+async def compute_price_and_changes(symbol: str):
+    """Prix et variations 1h/24h/7d: cache du scanner (bot:price:<symbol>), sinon exchange."""
+    try:
+        r = await ensure_redis()
+        cached = await get_cached_price(r, symbol)
+    except Exception:
+        r = cached = None
+    if cached is not None:
+        return cached
+
+    values = await _fetch_price_and_changes(symbol)
+    if r is not None and None not in values:
+        try:
+            await set_cached_price(r, symbol, values)
+        except Exception:
+            pass
+    return values
+
+
+def alert_group_name(chat_id: int) -> str:
+    # one group per chat: every chat gets every alert, replicas serving the same chat share the load
+    return f"{ALERT_GROUP}:{chat_id}"
+
+
+async def ensure_alert_group(r, group: str, stream: str = ALERT_STREAM):
+    try:
+        await r.xgroup_create(stream, group, id="$", mkstream=True)
+    except aioredis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def deliver_alert(r, bot: Bot, chat_id: int, group: str, msg_id: str, fields: Optional[dict]) -> bool:
+    """
+    Sends one stream entry to the chat and acks it. A failed send is left
+    pending (XAUTOCLAIM retries it later); an entry already sent by a replica
+    that died before its XACK is only acked.
+    """
+    sent_key = f"{ALERT_SENT_PREFIX}{group}:{msg_id}"
+    if not fields or await r.exists(sent_key):
+        # trimmed from the stream, or already delivered
+        await r.xack(ALERT_STREAM, group, msg_id)
+        return True
+
+    # v1 (JSON under "data") and v2 (fixed fields) entries
+    payload = decode_alert(fields)
+
+    symbol = payload.get("symbol", "UNK")
+    price_now, pct_1h, pct_24h, pct_7d = await compute_price_and_changes(symbol)
+    text = format_winner_message(symbol, payload.get("summary", {}), price_now, pct_1h, pct_24h, pct_7d)
+    top = max(float(payload.get("score_1h", 0.0) or 0.0), float(payload.get("score_1d", 0.0) or 0.0))
+    try:
+        # rate limited, retried on flood control, merged into a digest during bursts
+        await get_delivery(bot).submit(chat_id, text, digest_line=winner_digest_line(symbol, top, pct_24h))
+    except Exception as e:
+        logger.exception("Failed to send alert to chat {}: {}", chat_id, e)
+        return False
+
+    # l'id d'entrée commence par l'heure du XADD (ms): écart scanner -> Telegram
+    ALERT_STREAM_LAG.observe(max(0.0, time.time() - int(msg_id.split("-", 1)[0]) / 1000))
+    async with r.pipeline(transaction=True) as pipe:
+        pipe.set(sent_key, 1, ex=ALERT_SENT_TTL)
+        pipe.xack(ALERT_STREAM, group, msg_id)
+        await pipe.execute()
+    return True
+
+
+async def update_stream_gauges(r, group: str, stream: str = ALERT_STREAM):
+    """Pending / not yet read entries of the group (XINFO GROUPS), for /metrics."""
+    for info in await r.xinfo_groups(stream):
+        if info.get("name") == group:
+            ALERT_STREAM_PENDING.labels(group).set(info.get("pending") or 0)
+            if info.get("lag") is not None:
+                ALERT_STREAM_BACKLOG.labels(group).set(info["lag"])
+
+
+async def alert_listener(bot: Bot, chat_id: int, redis_url: str = REDIS_URL, consumer: str = ALERT_CONSUMER):
     r = aioredis.from_url(redis_url, decode_responses=True)
+    group = alert_group_name(chat_id)
+    loop = asyncio.get_running_loop()
 
-    last_id = "$"
+    ready = False
+    backlog_id = "0"  # first drain what this consumer had pending before a restart
+    next_claim = 0.0
     while True:
         try:
-            streams = await r.xread({ALERT_STREAM: last_id}, block=20000, count=50)
-            print('no streams', streams)
-            if not streams:
-                #print('no streams',streams)
+            if not ready:
+                await ensure_alert_group(r, group)
+                ready = True
+
+            if backlog_id is not None:
+                streams = await r.xreadgroup(group, consumer, {ALERT_STREAM: backlog_id}, count=50)
+                messages = streams[0][1] if streams else []
+                if not messages:
+                    backlog_id = None
+                await asyncio.gather(*(deliver_alert(r, bot, chat_id, group, msg_id, fields)
+                                       for msg_id, fields in messages))
+                if messages:
+                    backlog_id = messages[-1][0]
                 continue
-            for _, messages in streams:
-                for msg_id, fields in messages:
-                    raw = fields.get("data") or fields.get("json") or ""
-                    try:
-                        payload = json.loads(raw)
-                    except Exception:
-                        payload = {"raw": raw}
-
-                    price_now, pct_1h, pct_24h, pct_7d = await compute_price_and_changes(payload.get("symbol", "UNK"))
-                    text = format_winner_message(payload.get("symbol", "UNK"), payload.get("summary", {}), price_now, pct_1h,
-                                                 pct_24h, pct_7d)
-                    try:
-                        await bot.send_message(chat_id, text, parse_mode="HTML")
-                    except Exception as e:
-                        logger.exception("Failed to send alert to chat %s: %s", chat_id, e)
-                    last_id = msg_id
+
+            if loop.time() >= next_claim:
+                # entries left pending by a dead replica (or a failed send) for too long
+                claimed = await r.xautoclaim(ALERT_STREAM, group, consumer, ALERT_CLAIM_IDLE_MS,
+                                             start_id="0-0", count=50)
+                await asyncio.gather(*(deliver_alert(r, bot, chat_id, group, msg_id, fields)
+                                       for msg_id, fields in claimed[1]))
+                next_claim = loop.time() + ALERT_CLAIM_EVERY
+                await update_stream_gauges(r, group)
+
+            streams = await r.xreadgroup(group, consumer, {ALERT_STREAM: ">"}, count=50, block=20000)
+            for _, messages in streams or []:
+                await asyncio.gather(*(deliver_alert(r, bot, chat_id, group, msg_id, fields)
+                                       for msg_id, fields in messages))
         except Exception as e:
-            logger.exception("alert_listener error: %s", e)
+            logger.exception("alert_listener error: {}", e)
+            ready = False
             await asyncio.sleep(2)
@@ -0,0 +1,73 @@
+# scanner/alert_codec.py
+"""
+Alert stream entries.
+
+v1 (legacy): {"data": json.dumps({"symbol", "score_1h", "score_1d", "summary"})}
+with the whole nested summary (norms + raw of both timeframes).
+
+v2: {"v": "2", "d": "<field>|<field>|..."} with only what the bot renders, in
+the fixed order of ALERT_FIELDS_V2. Floats are written with 6 significant
+digits. decode_alert() reads both and rebuilds the summary shape the bot's
+formatters expect.
+"""
+import json
+import os
+import time
+from typing import Optional
+
+ALERT_VERSION = "2"
+ALERT_SEP = "|"
+RAW_FIELDS = ("volume", "atr_pct", "adx", "rsi")  # latest_raw fields shown in the alert
+ALERT_FIELDS_V2 = (("symbol", "score_1h", "score_1d")
+                   + tuple(f"{k}_1h" for k in RAW_FIELDS) + tuple(f"{k}_1d" for k in RAW_FIELDS))
+
+# trimming: approximate MINID (keep the last N seconds) or, with 0, approximate MAXLEN
+ALERT_STREAM_RETENTION = int(os.getenv("ALERT_STREAM_RETENTION", 3 * 24 * 3600))
+ALERT_STREAM_MAXLEN = int(os.getenv("ALERT_STREAM_MAXLEN", 10_000))
+
+
+def _num(x) -> str:
+    try:
+        return f"{float(x):.6g}"
+    except (TypeError, ValueError):
+        return "nan"
+
+
+def encode_alert(symbol: str, summary: dict) -> dict:
+    """Stream fields (v2) for one alert."""
+    s1h = summary.get("1h", {}) or {}
+    s1d = summary.get("1d", {}) or {}
+    raw1h = s1h.get("latest_raw", {}) or {}
+    raw1d = s1d.get("latest_raw", {}) or {}
+    values = [symbol, _num(s1h.get("score", 0.0) or 0.0), _num(s1d.get("score", 0.0) or 0.0)]
+    values += [_num(raw1h.get(k)) for k in RAW_FIELDS]
+    values += [_num(raw1d.get(k)) for k in RAW_FIELDS]
+    return {"v": ALERT_VERSION, "d": ALERT_SEP.join(values)}
+
+
+def decode_alert(fields: dict) -> dict:
+    """{"symbol", "score_1h", "score_1d", "summary"} from a v1 or v2 entry."""
+    if fields.get("v") == ALERT_VERSION:
+        values = dict(zip(ALERT_FIELDS_V2, fields.get("d", "").split(ALERT_SEP)))
+        rec = {k: (v if k == "symbol" else float(v)) for k, v in values.items()}
+        summary = {}
+        for label in ("1h", "1d"):
+            summary[label] = {"score": rec.get(f"score_{label}", 0.0),
+                              "latest_raw": {k: rec[f"{k}_{label}"] for k in RAW_FIELDS if f"{k}_{label}" in rec}}
+        return {"symbol": rec.get("symbol", "UNK"), "score_1h": summary["1h"]["score"],
+                "score_1d": summary["1d"]["score"], "summary": summary}
+
+    raw = fields.get("data") or fields.get("json") or ""
+    try:
+        return json.loads(raw)
+    except Exception:
+        return {"raw": raw}
+
+
+def trim_args(retention: int = ALERT_STREAM_RETENTION, maxlen: int = ALERT_STREAM_MAXLEN) -> dict:
+    """XADD kwargs bounding the stream (approximate trimming: whole macro-nodes, cheap)."""
+    if retention > 0:
+        return {"minid": f"{int(time.time() * 1000) - retention * 1000}-0", "approximate": True}
+    if maxlen > 0:
+        return {"maxlen": maxlen, "approximate": True}
+    return {}
@@ -0,0 +1,189 @@
+# scanner/backtest.py
+"""
+Backtest vectorisé du modèle de scoring sur les bougies archivées.
+
+Pour chaque symbole et chaque barre close, le score est celui que
+compute_indicators -> compute_norms_from_indicator_df -> compute_simple_score
+donnerait sur l'historique jusqu'à cette barre. Toute la série est calculée
+d'un coup: indicateurs ta_kernels sur [symboles, barres], puis normes et
+scores de batch_scoring sur les mêmes tableaux (aucune boucle par barre).
+
+Différence avec le scanner en direct: les indicateurs Wilder (ATR/RSI/ADX)
+sont amorcés au début de l'historique et non au début d'une fenêtre de 200
+barres; l'écart disparaît après quelques dizaines de barres.
+
+Un "alert" est une barre dont le score >= threshold; un "episode" est un
+passage du seuil (le score était sous le seuil à la barre précédente).
+Les rendements forward sont close[t + h] / close[t] - 1, en barres.
+"""
+import os
+import time
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from services.scanner.src.batch_scoring import compute_indicators_batch, compute_norms_batch, compute_scores_batch
+from services.scanner.src.candle_archive import CandleArchive
+from services.scanner.src.scoring import CANDLE_DTYPE, DEFAULT_WEIGHTS, parse_candles
+
+BACKTEST_CHUNK = int(os.getenv("BACKTEST_CHUNK", 64))  # symboles traités ensemble (borne la mémoire)
+DEFAULT_HORIZONS = (1, 4, 24)
+
+
+def stack_candles(candles: Sequence[np.ndarray]) -> np.ndarray:
+    """Tableaux CANDLE_DTYPE -> ohlcv[S, T, 5] aligné à droite (NaN = padding)."""
+    T = max((len(c) for c in candles), default=0)
+    out = np.full((len(candles), T, 5), np.nan)
+    for i, c in enumerate(candles):
+        if len(c):
+            out[i, T - len(c):] = np.stack([c[k] for k in ("open", "high", "low", "close", "volume")], axis=-1)
+    return out
+
+
+def score_series(ohlcv: np.ndarray, weights: Optional[dict] = None, norm_params: Optional[dict] = None,
+                 backend: str = "numba") -> Tuple[np.ndarray, np.ndarray]:
+    """(score[S, T], complete[S, T]): score de chaque barre, et barres où tous les indicateurs existent."""
+    ind = compute_indicators_batch(ohlcv, backend)
+    complete = np.ones(ohlcv.shape[:2], dtype=bool)
+    for v in ind.values():
+        complete &= ~np.isnan(v)
+    score = compute_scores_batch(compute_norms_batch(ind, norm_params), weights or DEFAULT_WEIGHTS)
+    return np.where(complete, score, np.nan), complete
+
+
+def forward_returns(close: np.ndarray, h: int) -> np.ndarray:
+    """close[t + h] / close[t] - 1 sur le dernier axe (NaN sur les h dernières barres)."""
+    out = np.full(close.shape, np.nan)
+    if h < close.shape[-1]:
+        with np.errstate(invalid="ignore", divide="ignore"):
+            out[..., :-h] = close[..., h:] / close[..., :-h] - 1.0
+    return out
+
+
+def _stats(x: np.ndarray) -> dict:
+    x = x[~np.isnan(x)]
+    if not len(x):
+        return {"n": 0, "mean": None, "median": None, "hit_rate": None}
+    return {"n": int(len(x)), "mean": float(x.mean()), "median": float(np.median(x)),
+            "hit_rate": float((x > 0).mean())}
+
+
+def backtest(candles_by_symbol: Dict[str, np.ndarray], threshold: float = 0.7,
+             horizons: Iterable[int] = DEFAULT_HORIZONS, weights: Optional[dict] = None,
+             norm_params: Optional[dict] = None, backend: str = "numba",
+             chunk: int = BACKTEST_CHUNK) -> dict:
+    """
+    Rejoue tout l'historique de chaque symbole (tableaux CANDLE_DTYPE triés par ts).
+    Retourne {"bars", "alerts", "episodes", "horizons": {h: {"all": stats, "alerts": stats}},
+    "symbols": DataFrame par symbole}.
+    """
+    horizons = tuple(horizons)
+    symbols = list(candles_by_symbol)
+    bars = alerts = episodes = 0
+    fwd_all = {h: [] for h in horizons}
+    fwd_alert = {h: [] for h in horizons}
+    rows = []
+    for i in range(0, len(symbols), chunk):
+        names = symbols[i:i + chunk]
+        ohlcv = stack_candles([parse_candles(candles_by_symbol[s]) for s in names])
+        score, complete = score_series(ohlcv, weights, norm_params, backend)
+        hot = complete & (score >= threshold)
+        prev = np.zeros_like(hot)
+        prev[:, 1:] = hot[:, :-1]
+        rising = hot & ~prev
+        bars += int(complete.sum())
+        alerts += int(hot.sum())
+        episodes += int(rising.sum())
+
+        close = ohlcv[..., 3]
+        per_h = {}
+        for h in horizons:
+            fwd = forward_returns(close, h)
+            # une valeur par barre scorée; les alertes sont un sous-ensemble
+            fwd_all[h].append(fwd[complete])
+            fwd_alert[h].append(fwd[hot])
+            with np.errstate(invalid="ignore"):
+                per_h[h] = np.nanmean(np.where(hot, fwd, np.nan), axis=1) if hot.any() else np.full(len(names), np.nan)
+        for j, s in enumerate(names):
+            row = {"symbol": s, "bars": int(complete[j].sum()), "alerts": int(hot[j].sum()),
+                   "episodes": int(rising[j].sum()),
+                   "mean_score": float(np.nanmean(score[j])) if complete[j].any() else np.nan}
+            for h in horizons:
+                row[f"alert_fwd_{h}"] = per_h[h][j]
+            rows.append(row)
+
+    report = {"bars": bars, "alerts": alerts, "episodes": episodes, "threshold": threshold, "horizons": {}}
+    for h in horizons:
+        report["horizons"][h] = {
+            "all": _stats(np.concatenate(fwd_all[h]) if fwd_all[h] else np.empty(0)),
+            "alerts": _stats(np.concatenate(fwd_alert[h]) if fwd_alert[h] else np.empty(0)),
+        }
+    report["symbols"] = pd.DataFrame(rows).set_index("symbol") if rows else pd.DataFrame()
+    return report
+
+
+def load_candles(archive: CandleArchive, granularity: str, start_ts: Optional[int] = None,
+                 end_ts: Optional[int] = None, symbols: Optional[Iterable[str]] = None) -> Dict[str, np.ndarray]:
+    """{symbol: memmap} depuis l'archive; les barres ne sont copiées qu'au moment du scoring de leur paquet."""
+    return dict(archive.scan(granularity, start_ts, end_ts, symbols))
+
+
+def format_report(report: dict) -> str:
+    lines = [f"bars scored: {report['bars']}  alerts (score >= {report['threshold']}): {report['alerts']}"
+             f"  episodes: {report['episodes']}"]
+    for h, st in report["horizons"].items():
+        for name in ("all", "alerts"):
+            s = st[name]
+            if s["n"]:
+                lines.append(f"  fwd {h:>3} bars  {name:<6} n={s['n']:<8} mean={s['mean'] * 100:+.3f}%"
+                             f"  median={s['median'] * 100:+.3f}%  hit={s['hit_rate'] * 100:.1f}%")
+            else:
+                lines.append(f"  fwd {h:>3} bars  {name:<6} n=0")
+    return "\n".join(lines)
+
+
+def _synthetic(n_symbols: int, n_bars: int, seed: int = 42) -> Dict[str, np.ndarray]:
+    rng = np.random.default_rng(seed)
+    out = {}
+    for i in range(n_symbols):
+        c = np.empty(n_bars, dtype=CANDLE_DTYPE)
+        close = np.cumprod(1 + rng.normal(0, 0.01, n_bars)) * rng.uniform(0.01, 100)
+        c["ts"] = 1_700_000_000_000 + np.arange(n_bars) * 3_600_000
+        c["open"] = close
+        c["close"] = close
+        c["high"] = close * (1 + rng.uniform(0, 0.02, n_bars))
+        c["low"] = close * (1 - rng.uniform(0, 0.02, n_bars))
+        c["volume"] = rng.lognormal(10, 1, n_bars)
+        c["usdt_volume"] = c["volume"] * close
+        c["quote_volume"] = c["usdt_volume"]
+        out[f"SYM{i}USDT"] = c
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+    from services.scanner.src.candle_archive import CANDLE_ARCHIVE_DIR
+    from services.scanner.src.settings import norm_config, weights_config
+
+    p = argparse.ArgumentParser(description="Backtest du scoring sur l'archive de bougies")
+    p.add_argument("--granularity", default="1h")
+    p.add_argument("--days", type=float, default=365)
+    p.add_argument("--threshold", type=float, default=float(os.getenv("ALERT_THRESHOLD", "0.7")))
+    p.add_argument("--horizons", default=",".join(map(str, DEFAULT_HORIZONS)), help="en barres, ex. 1,4,24")
+    p.add_argument("--archive", default=CANDLE_ARCHIVE_DIR)
+    p.add_argument("--synthetic", type=int, default=0, help="N symboles aléatoires (un an de 1h) au lieu de l'archive")
+    p.add_argument("--top", type=int, default=10, help="symboles affichés")
+    args = p.parse_args()
+
+    if args.synthetic:
+        data = _synthetic(args.synthetic, 24 * 365)
+    else:
+        start = int((time.time() - args.days * 86400) * 1000)
+        data = load_candles(CandleArchive(args.archive), args.granularity, start_ts=start)
+    t0 = time.perf_counter()
+    rep = backtest(data, args.threshold, [int(h) for h in args.horizons.split(",")],
+                   weights=weights_config() or None, norm_params=norm_config() or None)
+    print(f"{len(data)} symbols in {time.perf_counter() - t0:.2f}s")
+    print(format_report(rep))
+    if len(rep["symbols"]):
+        print(rep["symbols"].sort_values("alerts", ascending=False).head(args.top))
@@ -0,0 +1,199 @@
+# scanner/batch_scoring.py
+"""
+Scoring vectorisé de tout l'univers en une passe NumPy.
+
+Les bougies de tous les symboles sont empilées dans un tableau
+(symboles x barres x OHLCV), les indicateurs sont calculés par ta_kernels sur
+l'axe des barres pour tous les symboles à la fois, puis normes et scores sont
+évalués sur la dernière barre complète de chaque symbole. Les résultats sont
+ceux de compute_scores_from_ohlcv, symbole par symbole.
+"""
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from services.scanner.src import ta_kernels
+from services.scanner.src.scoring import DEFAULT_WEIGHTS, parse_candles
+
+OHLCV_COLUMNS = ("open", "high", "low", "close", "volume")
+NORM_KEYS = ("volume_norm", "atr_pct_norm", "vol_spike_norm", "adx_norm", "rsi_pull_norm")
+RAW_KEYS = ("volume", "vol_ma20", "vol_ratio", "atr_pct", "vol_spike_ratio", "adx", "rsi")
+# (clé de poids, poids par défaut, norme) dans l'ordre de compute_simple_score
+WEIGHT_TERMS = (
+    ("liquidity_vol", 0.25, "volume_norm"),
+    ("atr_percent", 0.25, "atr_pct_norm"),
+    ("volume_spike", 0.2, "vol_spike_norm"),
+    ("adx", 0.15, "adx_norm"),
+    ("rsi_pullback", 0.15, "rsi_pull_norm"),
+)
+
+
+def _rows_to_array(rows) -> Tuple[np.ndarray, np.ndarray]:
+    c = parse_candles(rows)
+    c = c[np.argsort(c["ts"], kind="stable")]
+    return c["ts"], np.stack([c[k] for k in OHLCV_COLUMNS], axis=-1)
+
+
+def stack_ohlcv(rows_by_symbol: Dict[str, list], bars: Optional[int] = None) -> Tuple[List[str], np.ndarray, np.ndarray]:
+    """
+    Empile les bougies Bitget de chaque symbole, alignées à droite.
+    Retourne (symbols, ts[S, T] int64 (-1 = padding), ohlcv[S, T, 5] float64 (NaN = padding)).
+    """
+    symbols = list(rows_by_symbol)
+    parsed = [_rows_to_array(rows_by_symbol[s]) if len(rows_by_symbol[s]) else
+              (np.empty(0, np.int64), np.empty((0, 5))) for s in symbols]
+    T = bars or max((len(ts) for ts, _ in parsed), default=0)
+    ts_out = np.full((len(symbols), T), -1, dtype=np.int64)
+    out = np.full((len(symbols), T, 5), np.nan)
+    for i, (ts, a) in enumerate(parsed):
+        n = min(len(ts), T)
+        if n:
+            ts_out[i, T - n:] = ts[-n:]
+            out[i, T - n:] = a[-n:]
+    return symbols, ts_out, out
+
+
+def compute_indicators_batch(ohlcv: np.ndarray, backend: str = "numpy") -> dict:
+    """Indicateurs de compute_indicators pour chaque symbole: dict de tableaux [S, T]."""
+    cols = [ohlcv[..., i] for i in range(5)]
+    return ta_kernels.indicators(*cols, backend=backend)
+
+
+def _clamp(x: np.ndarray) -> np.ndarray:
+    # même comportement que scoring._clamp: NaN -> 1.0 (min/max Python), inf borné
+    return np.where(np.isnan(x), 1.0, np.clip(x, 0.0, 1.0))
+
+
+def compute_norms_batch(latest: dict, params: Optional[dict] = None) -> dict:
+    """Version vectorisée de compute_norms_from_indicator_df (une valeur par symbole)."""
+    params = params or {}
+    volume_ratio_cap = params.get("volume_ratio_cap", 3.0)
+    atr_pct_cap = params.get("atr_pct_cap", 0.05)
+    adx_cap = params.get("adx_cap", 40.0)
+
+    vol = latest["volume"]
+    vol_ma20 = latest["vol_ma20"]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        vol_ratio = np.where(vol_ma20 > 0, vol / vol_ma20, 0.0)
+        atr_pct = latest["atr_pct"]
+        vol_spike_ratio = latest["vol_spike_ratio"]
+        adx = latest["adx"]
+        # `float(x or 50.0)`: un RSI exactement nul vaut 50
+        rsi = np.where(latest["rsi"] == 0, 50.0, latest["rsi"])
+
+        norms = {
+            "volume_norm": _clamp(vol_ratio / volume_ratio_cap),
+            "atr_pct_norm": _clamp(atr_pct / atr_pct_cap),
+            "vol_spike_norm": _clamp(vol_spike_ratio / volume_ratio_cap),
+            "adx_norm": _clamp(adx / adx_cap),
+            "rsi_pull_norm": _clamp((60.0 - rsi) / 30.0),
+        }
+    norms["raw"] = {
+        "volume": vol,
+        "vol_ma20": vol_ma20,
+        "vol_ratio": vol_ratio,
+        "atr_pct": atr_pct,
+        "vol_spike_ratio": vol_spike_ratio,
+        "adx": adx,
+        "rsi": rsi,
+    }
+    return norms
+
+
+def compute_scores_batch(norms: dict, weights: dict) -> np.ndarray:
+    score = np.zeros_like(norms["volume_norm"])
+    for key, default, norm in WEIGHT_TERMS:
+        score = score + weights.get(key, default) * norms[norm]
+    return score
+
+
+def _latest_rows(ind: dict) -> Tuple[np.ndarray, dict]:
+    last = ta_kernels.last_complete_index(ind)
+    rows = np.arange(len(last))
+    safe = np.maximum(last, 0)
+    latest = {k: np.where(last >= 0, v[rows, safe], np.nan) for k, v in ind.items()}
+    return last, latest
+
+
+def score_table(symbols: Sequence[str], ts: np.ndarray, ohlcv: np.ndarray,
+                weights: Optional[dict] = None, norm_params: Optional[dict] = None,
+                backend: str = "numpy") -> pd.DataFrame:
+    """
+    Table des scores (une ligne par symbole) pour un tableau empilé.
+    Les symboles sans barre complète ont score 0.0 et une colonne `error`.
+    """
+    weights = weights or DEFAULT_WEIGHTS
+    ind = compute_indicators_batch(ohlcv, backend)
+    last, latest = _latest_rows(ind)
+    norms = compute_norms_batch(latest, norm_params)
+    score = compute_scores_batch(norms, weights)
+    ok = last >= 0
+    any_bar = (ts >= 0).any(axis=1)
+
+    data = {"timestamp": np.where(ok, ts[np.arange(len(last)), np.maximum(last, 0)], -1),
+            "score": np.where(ok, score, 0.0)}
+    for k in NORM_KEYS:
+        data[k] = np.where(ok, norms[k], np.nan)
+    for k in RAW_KEYS:
+        data["raw_" + k] = np.where(ok, norms["raw"][k], np.nan)
+    data["error"] = np.where(ok, None, np.where(any_bar, "insufficient data after indicators", "no data"))
+    return pd.DataFrame(data, index=pd.Index(list(symbols), name="symbol"))
+
+
+def score_universe(rows_by_symbol: Dict[str, list], weights: Optional[dict] = None,
+                   norm_params: Optional[dict] = None, bars: Optional[int] = None,
+                   backend: str = "numpy") -> pd.DataFrame:
+    """Empile puis score toutes les paires d'une granularité en un appel."""
+    symbols, ts, ohlcv = stack_ohlcv(rows_by_symbol, bars)
+    return score_table(symbols, ts, ohlcv, weights, norm_params, backend)
+
+
+def _summary_from_row(row) -> dict:
+    if row["error"]:
+        return {"error": row["error"], "score": 0.0}
+    norms = {k: float(row[k]) for k in NORM_KEYS}
+    norms["raw"] = {k: float(row["raw_" + k]) for k in RAW_KEYS}
+    return {"norms": norms, "score": float(row["score"]), "latest_raw": norms["raw"]}
+
+
+def batch_scores_from_ohlcv(ohlcv_1h_by_symbol: Dict[str, list], ohlcv_1d_by_symbol: Dict[str, list],
+                            weights: Optional[dict] = None, norm_params: Optional[dict] = None,
+                            backend: str = "numpy") -> Dict[str, dict]:
+    """Comme compute_scores_from_ohlcv, mais pour tous les symboles: {symbol: {"1h": ..., "1d": ...}}."""
+    out = {s: {} for s in list(ohlcv_1h_by_symbol) + list(ohlcv_1d_by_symbol)}
+    for label, by_symbol in (("1h", ohlcv_1h_by_symbol), ("1d", ohlcv_1d_by_symbol)):
+        table = score_universe(by_symbol, weights, norm_params, backend=backend)
+        for symbol, row in zip(table.index, table.to_dict("records")):
+            out[symbol][label] = _summary_from_row(row)
+    for symbol, summary in out.items():
+        for label in ("1h", "1d"):
+            summary.setdefault(label, {"error": "no data", "score": 0.0})
+    return out
+
+
+if __name__ == "__main__":
+    # benchmark: univers synthétique, chemin par symbole vs passe vectorisée
+    from services.scanner.src.scoring import compute_scores_from_ohlcv
+
+    rng = np.random.default_rng(42)
+    n_symbols, n_bars = 377, 200
+    universe = {}
+    for i in range(n_symbols):
+        close = np.cumprod(1 + rng.normal(0, 0.02, n_bars)) * rng.uniform(0.01, 100)
+        high = close * (1 + rng.uniform(0, 0.02, n_bars))
+        low = close * (1 - rng.uniform(0, 0.02, n_bars))
+        vol = rng.uniform(1e3, 1e6, n_bars)
+        universe[f"SYM{i}USDT"] = [[str(1_700_000_000_000 + j * 3_600_000), str(close[j]), str(high[j]), str(low[j]),
+                                    str(close[j]), str(vol[j]), "0", "0"] for j in range(n_bars)]
+
+    t0 = time.perf_counter()
+    per_symbol = {s: compute_scores_from_ohlcv(rows, [])["1h"] for s, rows in universe.items()}
+    t1 = time.perf_counter()
+    table = score_universe(universe)
+    t2 = time.perf_counter()
+
+    diff = max(abs(per_symbol[s]["score"] - table.loc[s, "score"]) for s in universe)
+    print(f"per-symbol: {t1 - t0:.3f}s  batch: {t2 - t1:.3f}s  speedup x{(t1 - t0) / (t2 - t1):.1f}")
+    print(f"max |score diff| = {diff:.3e}")
+    print(table.sort_values("score", ascending=False).head(10)[["score", "timestamp"]])
@@ -0,0 +1,117 @@
+# scanner/candle_archive.py
+"""
+Archive locale des bougies closes, un fichier par symbole et granularité:
+<root>/<granularity>/<symbol>.bin = enregistrements CANDLE_DTYPE bruts (64 octets),
+triés par ts, en ajout seul.
+
+Lecture par np.memmap: un démarrage à chaud ne lit que les dernières pages du
+fichier, et une analyse sur des mois de barres et tous les symboles ne charge
+en mémoire que ce qu'elle touche (scan() ouvre un symbole à la fois).
+
+Un seul écrivain par répertoire (le worker); les lecteurs peuvent être
+d'autres processus. La barre en cours n'est jamais archivée; une barre déjà
+archivée n'est pas réécrite (déduplication sur ts).
+"""
+import os
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from services.scanner.src.candle_store import GRANULARITY_MS
+from services.scanner.src.scoring import CANDLE_DTYPE, parse_candles
+
+CANDLE_ARCHIVE_DIR = os.getenv("CANDLE_ARCHIVE_DIR", "./data/candles")  # "" = pas d'archive
+RECORD_SIZE = CANDLE_DTYPE.itemsize
+
+
+def candles_to_rows(candles: np.ndarray) -> List[list]:
+    """Tableau CANDLE_DTYPE -> lignes au format Bitget (str), celui de get_candles()."""
+    cols = ("open", "high", "low", "close", "volume", "usdt_volume", "quote_volume")
+    return [[str(int(c["ts"]))] + [repr(float(c[k])) for k in cols] for c in candles]
+
+
+class CandleArchive:
+    def __init__(self, root: str = CANDLE_ARCHIVE_DIR):
+        self.root = root
+        self._last: Dict[Tuple[str, str], Optional[int]] = {}  # dernier ts archivé, lu une fois par fichier
+        self.stats = {"appended": 0, "skipped": 0}
+
+    def _path(self, symbol: str, granularity: str) -> str:
+        return os.path.join(self.root, granularity, f"{symbol}.bin")
+
+    def read(self, symbol: str, granularity: str, start_ts: Optional[int] = None,
+             end_ts: Optional[int] = None, limit: Optional[int] = None) -> np.ndarray:
+        """Barres [start_ts, end_ts] (ms, bornes incluses), les `limit` dernières; vue memmap en lecture seule."""
+        path = self._path(symbol, granularity)
+        try:
+            n = os.path.getsize(path) // RECORD_SIZE
+        except FileNotFoundError:
+            n = 0
+        if n == 0:
+            return np.empty(0, dtype=CANDLE_DTYPE)
+        arr = np.memmap(path, dtype=CANDLE_DTYPE, mode="r", shape=(n,))
+        lo, hi = 0, n
+        if start_ts is not None or end_ts is not None:
+            ts = arr["ts"]
+            if start_ts is not None:
+                lo = int(np.searchsorted(ts, start_ts, side="left"))
+            if end_ts is not None:
+                hi = int(np.searchsorted(ts, end_ts, side="right"))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return arr[lo:hi]
+
+    def rows(self, symbol: str, granularity: str, limit: Optional[int] = None) -> List[list]:
+        return candles_to_rows(self.read(symbol, granularity, limit=limit))
+
+    def last_ts(self, symbol: str, granularity: str) -> Optional[int]:
+        key = (symbol, granularity)
+        if key not in self._last:
+            tail = self.read(symbol, granularity, limit=1)
+            self._last[key] = int(tail["ts"][0]) if len(tail) else None
+        return self._last[key]
+
+    def append(self, symbol: str, granularity: str, rows, now_ms: Optional[int] = None) -> int:
+        """Ajoute les barres closes de `rows` (lignes Bitget ou CANDLE_DTYPE) plus récentes que l'archive."""
+        candles = parse_candles(rows)
+        if len(candles) == 0:
+            return 0
+        candles = np.sort(candles, order="ts")
+        bar_ms = GRANULARITY_MS.get(granularity)
+        if bar_ms:
+            now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+            candles = candles[candles["ts"] + bar_ms <= now_ms]
+        last = self.last_ts(symbol, granularity)
+        if last is not None:
+            candles = candles[candles["ts"] > last]
+        if len(candles) > 1:
+            candles = candles[np.concatenate(([True], np.diff(candles["ts"]) > 0))]
+        if len(candles) == 0:
+            self.stats["skipped"] += 1
+            return 0
+
+        path = self._path(symbol, granularity)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "ab") as f:
+            size = f.tell()
+            if size % RECORD_SIZE:
+                # écriture interrompue: on retire l'enregistrement partiel
+                f.truncate(size - size % RECORD_SIZE)
+            f.write(candles.tobytes())
+        self._last[(symbol, granularity)] = int(candles["ts"][-1])
+        self.stats["appended"] += len(candles)
+        return len(candles)
+
+    def symbols(self, granularity: str) -> List[str]:
+        try:
+            names = os.listdir(os.path.join(self.root, granularity))
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-4] for n in names if n.endswith(".bin"))
+
+    def scan(self, granularity: str, start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+             symbols: Optional[Iterable[str]] = None) -> Iterator[Tuple[str, np.ndarray]]:
+        """(symbole, barres) pour chaque symbole archivé, un memmap à la fois."""
+        for symbol in (self.symbols(granularity) if symbols is None else symbols):
+            arr = self.read(symbol, granularity, start_ts, end_ts)
+            if len(arr):
+                yield symbol, arr
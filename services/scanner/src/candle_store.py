@@ -0,0 +1,219 @@
+# scanner/candle_store.py
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+from loguru import logger
+from services.scanner.src.fetcher import get_candles
+
+CANDLE_STORE_SIZE = int(os.getenv("CANDLE_STORE_SIZE", 200))
+CANDLE_STORE_PERSIST = os.getenv("CANDLE_STORE_PERSIST", "")  # "" | "redis"
+REDIS_CANDLES_PREFIX = "bot:candles:"  # bot:candles:<symbol>:<granularity>
+REDIS_CANDLES_TTL = int(os.getenv("REDIS_CANDLES_TTL", 3 * 24 * 3600))
+
+# granularité Bitget -> durée d'une barre en ms
+GRANULARITY_MS = {
+    "1min": 60_000,
+    "3min": 3 * 60_000,
+    "5min": 5 * 60_000,
+    "15min": 15 * 60_000,
+    "30min": 30 * 60_000,
+    "1h": 3_600_000,
+    "4h": 4 * 3_600_000,
+    "6h": 6 * 3_600_000,
+    "12h": 12 * 3_600_000,
+    "1day": 86_400_000,
+    "3day": 3 * 86_400_000,
+    "1week": 7 * 86_400_000,
+}
+
+
+def merge_rows(buf: deque, rows: List[list]) -> int:
+    """
+    Fusionne des lignes de bougies Bitget (triées ou non) dans `buf` (ts croissant).
+    Une ligne dont le ts est déjà présent le remplace (mise à jour de la barre en cours).
+    Retourne le nombre de nouvelles barres ajoutées.
+    """
+    appended = 0
+    for row in sorted(rows, key=lambda x: int(x[0])):
+        ts = int(row[0])
+        if buf:
+            last_ts = int(buf[-1][0])
+            if ts < last_ts:
+                # correction tardive d'une barre plus ancienne encore dans la fenêtre
+                for i in range(len(buf) - 2, -1, -1):
+                    if int(buf[i][0]) == ts:
+                        buf[i] = row
+                        break
+                continue
+            if ts == last_ts:
+                buf[-1] = row
+                continue
+        buf.append(row)
+        appended += 1
+    return appended
+
+
+class CandleStore:
+    """
+    Buffers circulaires des `size` dernières bougies Bitget, par symbole et granularité.
+    get() ne demande à l'exchange que les barres plus récentes que le stock, à partir
+    de l'avant-dernière barre stockée pour rafraîchir la barre en cours.
+    Avec une `archive` (CandleArchive), merge() met en file les seules barres closes;
+    flush_archive() écrit la file sur disque hors de la boucle asyncio (le worker
+    l'appelle une fois par batch) et les buffers vides repartent de l'archive.
+    """
+
+    def __init__(self, size: int = CANDLE_STORE_SIZE, redis=None, persist: str = CANDLE_STORE_PERSIST,
+                 archive=None):
+        self.size = size
+        self.r = redis if persist == "redis" else None
+        self.archive = archive
+        self._bufs: Dict[Tuple[str, str], deque] = {}
+        # barres demandées par le dernier fetch complet (un listing récent peut en avoir moins)
+        self._depth: Dict[Tuple[str, str], int] = {}
+        # barres closes en attente de flush_archive(), et le ts le plus récent mis en file par buffer
+        self._archive_queue: Dict[Tuple[str, str], List[list]] = {}
+        self._queued_ts: Dict[Tuple[str, str], int] = {}
+        self._archive_busy = False
+        self.stats = {"full": 0, "incremental": 0, "rows_fetched": 0, "warm": 0}
+
+    def _buf(self, symbol: str, granularity: str) -> deque:
+        key = (symbol, granularity)
+        buf = self._bufs.get(key)
+        if buf is None:
+            buf = self._bufs[key] = deque(maxlen=self.size)
+        return buf
+
+    def rows(self, symbol: str, granularity: str, limit: Optional[int] = None) -> List[list]:
+        buf = self._bufs.get((symbol, granularity))
+        if not buf:
+            return []
+        rows = list(buf)
+        return rows[-limit:] if limit else rows
+
+    def last_ts(self, symbol: str, granularity: str) -> Optional[int]:
+        buf = self._bufs.get((symbol, granularity))
+        return int(buf[-1][0]) if buf else None
+
+    def merge(self, symbol: str, granularity: str, rows: List[list]) -> int:
+        buf = self._buf(symbol, granularity)
+        added = merge_rows(buf, rows)
+        if self.archive is not None and rows:
+            self._queue_closed(symbol, granularity, buf)
+        return added
+
+    def _queue_closed(self, symbol: str, granularity: str, buf: deque):
+        """Met en file les barres closes de `buf` pas encore en file (remonte depuis la plus récente)."""
+        key = (symbol, granularity)
+        bar_ms = GRANULARITY_MS.get(granularity)
+        now_ms = int(time.time() * 1000)
+        since = self._queued_ts.get(key, -1)
+        closed = []
+        for i in range(len(buf) - 1, -1, -1):
+            row = buf[i]
+            ts = int(row[0])
+            if ts <= since:
+                break
+            # durée de barre inconnue: la dernière barre est prise pour la barre en cours
+            if (ts + bar_ms > now_ms) if bar_ms else i == len(buf) - 1:
+                continue
+            closed.append(row)
+        if closed:
+            closed.reverse()
+            self._archive_queue.setdefault(key, []).extend(closed)
+            self._queued_ts[key] = int(closed[-1][0])
+
+    def _write_archive(self, queue: Dict[Tuple[str, str], List[list]]) -> int:
+        written = 0
+        for (symbol, granularity), rows in queue.items():
+            try:
+                written += self.archive.append(symbol, granularity, rows)
+            except Exception as e:
+                logger.warning("candle archive append failed for {} {}: {}", symbol, granularity, e)
+        return written
+
+    async def flush_archive(self) -> int:
+        """Écrit les barres closes en file dans l'archive depuis un thread; retourne le nombre de barres écrites."""
+        if self.archive is None or not self._archive_queue or self._archive_busy:
+            # un flush encore en cours ne reprend rien de neuf: l'appel suivant prendra la file
+            return 0
+        queue, self._archive_queue = self._archive_queue, {}
+        self._archive_busy = True
+        try:
+            return await asyncio.to_thread(self._write_archive, queue)
+        finally:
+            self._archive_busy = False
+
+    async def _load(self, symbol: str, granularity: str):
+        if self._bufs.get((symbol, granularity)):
+            return
+        if self.r is not None:
+            try:
+                v = await self.r.get(f"{REDIS_CANDLES_PREFIX}{symbol}:{granularity}")
+                if v:
+                    saved = json.loads(v)
+                    merge_rows(self._buf(symbol, granularity), saved["rows"])
+                    self._depth[(symbol, granularity)] = saved["depth"]
+                    return
+            except Exception as e:
+                logger.warning("candle store load failed for {} {}: {}", symbol, granularity, e)
+        if self.archive is not None:
+            # démarrage à chaud depuis le disque: refresh() ne télécharge que les barres après la dernière archivée
+            try:
+                rows = self.archive.rows(symbol, granularity, limit=self.size)
+            except Exception as e:
+                logger.warning("candle archive load failed for {} {}: {}", symbol, granularity, e)
+                return
+            if rows:
+                merge_rows(self._buf(symbol, granularity), rows)
+                # + la barre en cours, jamais archivée, que le fetch incrémental ramène
+                self._depth[(symbol, granularity)] = len(rows) + 1
+                self.stats["warm"] += 1
+
+    async def _save(self, symbol: str, granularity: str):
+        if self.r is None:
+            return
+        try:
+            await self.r.set(f"{REDIS_CANDLES_PREFIX}{symbol}:{granularity}",
+                             json.dumps({"depth": self._depth.get((symbol, granularity), 0),
+                                         "rows": self.rows(symbol, granularity)}, separators=(",", ":")),
+                             ex=REDIS_CANDLES_TTL)
+        except Exception as e:
+            logger.warning("candle store save failed for {} {}: {}", symbol, granularity, e)
+
+    async def refresh(self, symbol: str, granularity: str, limit: int = None) -> int:
+        """Met le buffer à jour; retourne le nombre de nouvelles barres."""
+        limit = min(limit or self.size, self.size)
+        await self._load(symbol, granularity)
+        buf = self._buf(symbol, granularity)
+        bar_ms = GRANULARITY_MS.get(granularity)
+
+        if bar_ms and len(buf) >= 2 and self._depth.get((symbol, granularity), 0) >= limit:
+            start_ts = int(buf[-2][0])
+            # au plus autant de barres que [start_ts, now] peut en contenir, plus une: page pleine = "trou trop grand"
+            request = (int(time.time() * 1000) - start_ts) // bar_ms + 2
+            if request < limit:
+                rows = await get_candles(symbol, granularity, limit=int(request), startTime=start_ts)
+                self.stats["rows_fetched"] += len(rows)
+                if len(rows) < request:
+                    self.stats["incremental"] += 1
+                    added = self.merge(symbol, granularity, rows)
+                    await self._save(symbol, granularity)
+                    return added
+
+        rows = await get_candles(symbol, granularity, limit=limit)
+        self.stats["full"] += 1
+        self.stats["rows_fetched"] += len(rows)
+        buf.clear()
+        self._depth[(symbol, granularity)] = limit
+        added = self.merge(symbol, granularity, rows)
+        await self._save(symbol, granularity)
+        return added
+
+    async def get(self, symbol: str, granularity: str, limit: int = None) -> List[list]:
+        """Bougies à jour (ts croissant), même forme que get_candles()."""
+        await self.refresh(symbol, granularity, limit)
+        return self.rows(symbol, granularity, limit)
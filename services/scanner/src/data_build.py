@@ -1,68 +1,73 @@
-import requests
+import asyncio
 import json
-from collections import defaultdict
+import os
+from typing import Dict, List, Tuple
+from services.scanner.src.http_client import get_client
 
 # URLs Bitget
 URL_COINS = "https://api.bitget.com/api/v2/spot/public/coins"
 URL_SYMBOLS = "https://api.bitget.com/api/v2/spot/public/symbols"
-OUT_FILE = "./data/filtered_pairs.json"
+OUT_FILE = os.getenv("SYMBOL_LIST_FILE", "./data/filtered_pairs.json")
 # Ordre de potentiel (priorité de tri)
 BLOCKCHAIN_ORDER = [
     "BTC", "ERC20", "TRC20", "SOL", "Polygon", "AVAXC",
     "ARBITRUM", "APTOS", "SUI"
 ]
+CHAIN_RANK = {name: i for i, name in enumerate(BLOCKCHAIN_ORDER)}
 
-# 1) Récupérer les données (avec gestion d'erreur basique)
-def fetch_json(url):
-    r = requests.get(url, timeout=15)
-    r.raise_for_status()
-    return r.json().get("data", [])
-
-coins_data = fetch_json(URL_COINS)
-symbols_data = fetch_json(URL_SYMBOLS)
-
-# 2) Construire un mapping coin -> chains utiles (filtrer par BLOCKCHAIN_ORDER)
-coins_chains = {}  # coin -> list of chain dicts (filtered)
-for c in coins_data:
-    coin_name = c.get("coin")
-    chains = []
-    for ch in c.get("chains", []):
-        chain_name = ch.get("chain")
-        if chain_name in BLOCKCHAIN_ORDER and ch.get("withdrawable") == "true":
-            chains.append({
-                "chain": chain_name,
-                "needTag": ch.get("needTag"),
-                "withdrawFee": ch.get("withdrawFee"),
-                "minWithdrawAmount": ch.get("minWithdrawAmount"),
-                "contractAddress": ch.get("contractAddress"),
-                "congestion": ch.get("congestion")
-            })
-    if chains:
-        coins_chains[coin_name] = chains
-
-# 3) Filtrer symbols : ne garder que les paires contre USDT et dont baseCoin est dans coins_chains
-filtered_pairs = defaultdict(lambda: {"coin": None, "chains": [], "pairs": []})
-for s in symbols_data:
-    base = s.get("baseCoin")
-    quote = s.get("quoteCoin")
-    status = s.get("status")
-    symbol_name = s.get("symbol")
-    # Condition : paire USDT, coin supporté par chain utiles, et paire en ligne
-    if quote == "USDT" and base in coins_chains and status == "online":
-        # prepare entry
-        entry = filtered_pairs[base]
-        entry["coin"] = base
-        # add chain infos (ensure unique)
-        for ch in coins_chains[base]:
-            if ch not in entry["chains"]:
-                entry["chains"].append(ch)
-        # add pair metadata
-        #"baseCoin": "ENA",
-            #"quoteCoin": "EUR",
+
+# 1) Récupérer les données (pool HTTP partagé, limité et réessayé)
+async def fetch_json(url) -> list:
+    j = await get_client().get_json(url)
+    if j.get("code") != "00000":
+        raise RuntimeError(f"Bitget API error: {j.get('msg')}")
+    return j.get("data", [])
+
+
+async def fetch_universe() -> list:
+    coins_data, symbols_data = await asyncio.gather(fetch_json(URL_COINS), fetch_json(URL_SYMBOLS))
+    return build_universe(coins_data, symbols_data)
+
+
+def build_universe(coins_data: list, symbols_data: list) -> list:
+    # 2) Construire un mapping coin -> chains utiles (filtrer par BLOCKCHAIN_ORDER)
+    coins_chains = {}  # coin -> list of chain dicts (filtered)
+    for c in coins_data:
+        coin_name = c.get("coin")
+        chains = []
+        for ch in c.get("chains", []):
+            chain_name = ch.get("chain")
+            if chain_name in CHAIN_RANK and ch.get("withdrawable") == "true":
+                chains.append({
+                    "chain": chain_name,
+                    "needTag": ch.get("needTag"),
+                    "withdrawFee": ch.get("withdrawFee"),
+                    "minWithdrawAmount": ch.get("minWithdrawAmount"),
+                    "contractAddress": ch.get("contractAddress"),
+                    "congestion": ch.get("congestion")
+                })
+        if chains:
+            coins_chains[coin_name] = chains
+
+    # 3) Filtrer symbols : ne garder que les paires contre USDT et dont baseCoin est dans coins_chains
+    filtered_pairs = {}
+    for s in symbols_data:
+        base = s.get("baseCoin")
+        # Condition : paire USDT, coin supporté par chain utiles, et paire en ligne
+        if s.get("quoteCoin") != "USDT" or base not in coins_chains or s.get("status") != "online":
+            continue
+        entry = filtered_pairs.get(base)
+        if entry is None:
+            # chains dédupliquées une fois par coin (et non à chaque paire)
+            chains = []
+            for ch in coins_chains[base]:
+                if ch not in chains:
+                    chains.append(ch)
+            entry = filtered_pairs[base] = {"coin": base, "chains": chains, "pairs": []}
         entry["pairs"].append({
-            "symbol": symbol_name,
-            "baseCoin":s.get("baseCoin"),
-            "quoteCoin":s.get("quoteCoin"),
+            "symbol": s.get("symbol"),
+            "baseCoin": s.get("baseCoin"),
+            "quoteCoin": s.get("quoteCoin"),
             "minTradeAmount": s.get("minTradeAmount"),
             "maxTradeAmount": s.get("maxTradeAmount"),
             "takerFeeRate": s.get("takerFeeRate"),
@@ -70,36 +75,96 @@ for s in symbols_data:
             "pricePrecision": s.get("pricePrecision"),
             "quantityPrecision": s.get("quantityPrecision"),
             "minTradeUSDT": s.get("minTradeUSDT"),
-
         })
 
-# 4) Transformer en liste et trier par ordre de blockchain (on met en tête la meilleure chain disponible)
+    # 4) Transformer en liste et trier par ordre de blockchain (on met en tête la meilleure chain disponible)
+    result_list = [r for r in filtered_pairs.values() if r["pairs"]]
+    result_list.sort(key=sort_key)
+    return result_list
+
+
 def sort_key(item):
-    # item: {"coin":..., "chains":[...], ...}
-    chains = item.get("chains", [])
-    # find smallest index among chains (best chain for this coin)
-    idxs = []
-    for ch in chains:
+    # item: {"coin":..., "chains":[...], ...} -> rang de la meilleure chain du coin
+    return min((CHAIN_RANK[ch["chain"]] for ch in item.get("chains", []) if ch["chain"] in CHAIN_RANK),
+               default=len(BLOCKCHAIN_ORDER))
+
+
+def symbols_from_universe(entries: list) -> List[str]:
+    """Symbole scanné pour chaque coin: sa première paire USDT."""
+    syms = []
+    for entry in entries:
+        for p in entry.get("pairs", []):
+            sym = p.get("symbol")
+            if sym and sym.endswith("USDT"):
+                syms.append(sym)
+                break
+    return syms
+
+
+def diff_universe(old: list, new: list) -> Dict[str, List[str]]:
+    """Symboles ajoutés / retirés / dont les métadonnées (paire ou chains) ont changé."""
+    def by_symbol(entries):
+        out = {}
+        for entry in entries:
+            for p in entry.get("pairs", []):
+                out[p.get("symbol")] = (p, entry.get("chains"))
+        return out
+
+    a, b = by_symbol(old), by_symbol(new)
+    return {
+        "added": sorted(set(b) - set(a)),
+        "removed": sorted(set(a) - set(b)),
+        "changed": sorted(s for s in set(a) & set(b) if a[s] != b[s]),
+    }
+
+
+def load_universe(path: str = OUT_FILE) -> list:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return []
+
+
+def write_universe(entries: list, path: str = OUT_FILE):
+    # 5) Écrire en JSON compact, remplacement atomique (un lecteur ne voit jamais un fichier à moitié écrit)
+    tmp = f"{path}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entries, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+    except BaseException:
+        # pas de .tmp à moitié écrit laissé à côté du fichier
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+async def refresh_universe(path: str = OUT_FILE) -> Tuple[list, Dict[str, List[str]]]:
+    """Télécharge l'univers, le compare au fichier et ne le réécrit que s'il a changé."""
+    new = await fetch_universe()
+    old = await asyncio.to_thread(load_universe, path)
+    diff = diff_universe(old, new)
+    if any(diff.values()) or not old:
+        await asyncio.to_thread(write_universe, new, path)
+    return new, diff
+
+
+if __name__ == "__main__":
+    from services.scanner.src.http_client import close_client
+
+    async def main():
         try:
-            idxs.append(BLOCKCHAIN_ORDER.index(ch["chain"]))
-        except ValueError:
-            pass
-    return min(idxs) if idxs else len(BLOCKCHAIN_ORDER)
-
-result_list = list(filtered_pairs.values())
-# remove entries without pairs (filtres de sécurité)
-result_list = [r for r in result_list if r["pairs"]]
-result_list.sort(key=sort_key)
-
-# 5) Écrire dans JSON
-
-with open(OUT_FILE, "w", encoding="utf-8") as f:
-    json.dump(result_list, f, ensure_ascii=False, indent=4)
-
-print(f"✅ {len(result_list)} coins/paires filtrés enregistrés dans '{OUT_FILE}'")
-# Affichage rapide d'exemple
-for i, item in enumerate(result_list[:10], 1):
-    coin = item["coin"]
-    chains = ", ".join(ch["chain"] for ch in item["chains"])
-    n_pairs = len(item["pairs"])
-    print(f"{i}. {coin} — chains: {chains} — paires USDT: {n_pairs}")
+            return await refresh_universe()
+        finally:
+            await close_client()
+
+    result_list, diff = asyncio.run(main())
+    print(f"✅ {len(result_list)} coins/paires filtrés enregistrés dans '{OUT_FILE}'")
+    print(f"   +{len(diff['added'])} -{len(diff['removed'])} ~{len(diff['changed'])} depuis la version précédente")
+    # Affichage rapide d'exemple
+    for i, item in enumerate(result_list[:10], 1):
+        coin = item["coin"]
+        chains = ", ".join(ch["chain"] for ch in item["chains"])
+        n_pairs = len(item["pairs"])
+        print(f"{i}. {coin} — chains: {chains} — paires USDT: {n_pairs}")
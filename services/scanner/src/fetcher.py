@@ -1,22 +1,29 @@
 ﻿# bot/api.py
-import requests
-import asyncio
+from services.scanner.src.http_client import get_client
 
 BASE_CANDLES = "https://api.bitget.com/api/v2/spot/market/candles"
 
-def _fetch_candles_sync(symbol: str, granularity: str, limit: int = 200, startTime: str = None, endTime: str = None):
+def _candles_params(symbol: str, granularity: str, limit: int, startTime=None, endTime=None) -> dict:
     params = {"symbol": symbol, "granularity": granularity, "limit": limit}
     if startTime:
         params["startTime"] = str(startTime)
     if endTime:
         params["endTime"] = str(endTime)
-    r = requests.get(BASE_CANDLES, params=params, timeout=20)
-    r.raise_for_status()
-    j = r.json()
+    return params
+
+async def get_candles(symbol: str, granularity: str = "1h", limit: int = 200, startTime: str = None, endTime: str = None):
+    """Async candles fetch over the shared pooled client (rate limited, retried on 429/5xx)."""
+    params = _candles_params(symbol, granularity, limit, startTime, endTime)
+    j = await get_client().get_json(BASE_CANDLES, params)
     if j.get("code") != "00000":
         raise RuntimeError(f"Bitget API error: {j.get('msg')}")
     return j.get("data", [])
 
-async def get_candles(symbol: str, granularity: str = "1h", limit: int = 200):
-    """Async wrapper returning list of candles."""
-    return await asyncio.to_thread(_fetch_candles_sync, symbol, granularity, limit)
+BASE_TICKERS = "https://api.bitget.com/api/v2/spot/market/tickers"
+
+async def get_tickers(symbol: str = None):
+    """24h tickers; without `symbol` the whole spot market in a single request."""
+    j = await get_client().get_json(BASE_TICKERS, {"symbol": symbol} if symbol else None)
+    if j.get("code") != "00000":
+        raise RuntimeError(f"Bitget API error: {j.get('msg')}")
+    return j.get("data", [])
@@ -0,0 +1,121 @@
+# scanner/http_client.py
+import asyncio
+import os
+import random
+import time
+from typing import Optional
+import aiohttp
+from loguru import logger
+from services.scanner.src.metrics import HTTP_LATENCY, HTTP_REQUESTS
+from services.scanner.src.ratelimit import MARKET_LIMITER, MAX_IN_FLIGHT, RequestLimiter
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", 64))
+HTTP_POOL_PER_HOST = int(os.getenv("HTTP_POOL_PER_HOST", MAX_IN_FLIGHT))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", 20))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", 5))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", 3))
+HTTP_BACKOFF = float(os.getenv("HTTP_BACKOFF", 0.5))  # secondes, doublé à chaque tentative
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class HttpStatusError(RuntimeError):
+    def __init__(self, status: int, url: str, body: str = ""):
+        super().__init__(f"HTTP {status} for {url}: {body[:200]}")
+        self.status = status
+
+
+class BitgetClient:
+    """
+    Session aiohttp partagée (pool keep-alive) pour l'API REST publique Bitget.
+    Chaque tentative passe par le limiteur; 429/5xx et erreurs réseau sont
+    retentés avec un backoff exponentiel (Retry-After respecté s'il est présent).
+    """
+
+    def __init__(self, pool_size: int = HTTP_POOL_SIZE, per_host: int = HTTP_POOL_PER_HOST,
+                 timeout: float = HTTP_TIMEOUT, connect_timeout: float = HTTP_CONNECT_TIMEOUT,
+                 retries: int = HTTP_RETRIES, backoff: float = HTTP_BACKOFF,
+                 limiter: RequestLimiter = MARKET_LIMITER):
+        self.pool_size = pool_size
+        self.per_host = per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        # une session est liée à la boucle qui l'a créée (asyncio.run() dans les scripts)
+        if self._session is None or self._session.closed or self._loop is not loop:
+            connector = aiohttp.TCPConnector(limit=self.pool_size, limit_per_host=self.per_host,
+                                             ttl_dns_cache=300, keepalive_timeout=30)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+            self._loop = loop
+        return self._session
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after:
+            try:
+                return max(0.0, float(retry_after))
+            except ValueError:
+                pass
+        return self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+
+    async def get_json(self, url: str, params: dict = None) -> dict:
+        session = self._get_session()
+        endpoint = url.rsplit("/", 1)[-1]  # "candles", "tickers"...
+        latency = HTTP_LATENCY.labels(endpoint)
+        attempt = 0
+        while True:
+            retry_after = None
+            status = "error"
+            try:
+                async with self.limiter:
+                    t0 = time.perf_counter()
+                    try:
+                        async with session.get(url, params=params) as resp:
+                            status = resp.status
+                            if resp.status in RETRY_STATUSES:
+                                retry_after = resp.headers.get("Retry-After")
+                                raise HttpStatusError(resp.status, url, await resp.text())
+                            if resp.status >= 400:
+                                # les autres 4xx ne s'arrangeront pas en réessayant
+                                raise RuntimeError(f"HTTP {resp.status} for {url}: {(await resp.text())[:200]}")
+                            return await resp.json(content_type=None)
+                    finally:
+                        # un échantillon par tentative (retries compris), attente du limiteur exclue
+                        latency.observe(time.perf_counter() - t0)
+                        HTTP_REQUESTS.labels(endpoint, status).inc()
+            except (HttpStatusError, aiohttp.ClientConnectionError, aiohttp.ClientPayloadError,
+                    asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    raise
+                delay = self._retry_delay(attempt, retry_after)
+                logger.warning("GET {} failed ({}), retry {}/{} in {:.2f}s", url, e, attempt + 1, self.retries, delay)
+                attempt += 1
+                await asyncio.sleep(delay)
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+_client: Optional[BitgetClient] = None
+
+
+def get_client() -> BitgetClient:
+    """Client unique du processus, partagé par le worker du scanner et le bot."""
+    global _client
+    if _client is None:
+        _client = BitgetClient()
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.close()
+        _client = None
@@ -0,0 +1,26 @@
+# scanner/main.py
+# scanner autonome (docker-compose): boucle du worker, sans le bot Telegram.
+# Plusieurs conteneurs se partagent l'univers si SCAN_SHARDS > 0 (voir shards.py).
+import asyncio
+from services.scanner.src.http_client import close_client
+from services.scanner.src.metrics import METRICS_PORT, serve
+from services.scanner.src.settings import setup_logging
+from services.scanner.src.worker import BotWorker
+
+
+async def main():
+    setup_logging()
+    worker = BotWorker()
+    # pas d'app FastAPI ici: /metrics servi par aiohttp si METRICS_PORT est défini
+    metrics = await serve(METRICS_PORT) if METRICS_PORT else None
+    try:
+        await worker.run_forever()
+    finally:
+        worker.scorer.close()
+        await close_client()
+        if metrics is not None:
+            await metrics.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
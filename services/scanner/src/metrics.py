@@ -0,0 +1,288 @@
+# scanner/metrics.py
+"""
+Métriques au format texte Prometheus, sans dépendance.
+
+Compteurs, jauges et histogrammes vivent dans le registre du process
+(REGISTRY); une métrique à labels crée un enfant par combinaison de valeurs
+(`.labels(...)`, mis en cache: pas d'allocation sur le chemin chaud). Les
+compteurs déjà tenus ailleurs (ScoreCache.stats, CandleStore.stats...) sont
+exposés par `REGISTRY.callback` au moment du rendu plutôt que comptés deux fois.
+
+Rendu: `render()`, servi sur /metrics par l'app FastAPI (main.py) et, pour un
+scanner autonome, par `serve()` si METRICS_PORT est défini.
+"""
+import bisect
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+METRICS_PORT = int(os.getenv("METRICS_PORT", 0))  # scanner autonome: 0 = pas de serveur /metrics
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# secondes: de l'appel redis local (~ms) au sweep complet de l'univers
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _fmt(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    if float(v).is_integer() and abs(v) < 1e15:
+        return str(int(v))
+    return repr(float(v))
+
+
+def _escape(v: str) -> str:
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labelstr(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Timer:
+    __slots__ = ("child", "t0")
+
+    def __init__(self, child):
+        self.child = child
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.child.observe(time.perf_counter() - self.t0)
+        return False
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self, _metric=None):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self, _metric=None):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, metric):
+        self.bounds = metric.buckets
+        self.counts = [0] * len(self.bounds)  # non cumulés; cumulés au rendu
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        i = bisect.bisect_left(self.bounds, value)
+        if i < len(self.counts):
+            self.counts[i] += 1
+        self.sum += value
+        self.count += 1
+
+    def time(self) -> _Timer:
+        return _Timer(self)
+
+
+class _Metric:
+    kind = ""
+    _child = _CounterChild
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._children[()] = self._child(self)
+        (registry if registry is not None else REGISTRY).register(self)
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name}: expected labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(key, self._child(self))
+        return child
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_labelstr(self.labelnames, k)} {_fmt(c.value)}" for k, c in list(self._children.items())]
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _child = _CounterChild
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+    _child = _GaugeChild
+
+    def set(self, value: float):
+        self._default.set(value)
+
+    def inc(self, amount: float = 1.0):
+        self._default.inc(amount)
+
+    def dec(self, amount: float = 1.0):
+        self._default.dec(amount)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+    _child = _HistogramChild
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames, registry)
+
+    def observe(self, value: float):
+        self._default.observe(value)
+
+    def time(self) -> _Timer:
+        return _Timer(self._default)
+
+    def _samples(self) -> List[str]:
+        out = []
+        for key, c in list(self._children.items()):
+            acc = 0
+            for bound, n in zip(c.bounds, c.counts):
+                acc += n
+                le = 'le="%s"' % _fmt(bound)
+                out.append(f"{self.name}_bucket{_labelstr(self.labelnames, key, le)} {acc}")
+            le = 'le="+Inf"'
+            out.append(f"{self.name}_bucket{_labelstr(self.labelnames, key, le)} {c.count}")
+            out.append(f"{self.name}_sum{_labelstr(self.labelnames, key)} {_fmt(c.sum)}")
+            out.append(f"{self.name}_count{_labelstr(self.labelnames, key)} {c.count}")
+        return out
+
+
+class _Callback:
+    """Valeurs lues au rendu: fn() -> nombre, ou {(valeurs de labels...): nombre}."""
+
+    def __init__(self, name: str, documentation: str, fn: Callable[[], Union[float, dict]], kind: str,
+                 labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.fn = fn
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []  # une source en erreur ne casse pas tout /metrics
+        if values is None:
+            return []
+        if not isinstance(values, dict):
+            values = {(): values}
+        head = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return head + [f"{self.name}{_labelstr(self.labelnames, k if isinstance(k, tuple) else (k,))} {_fmt(v)}"
+                       for k, v in values.items() if v is not None]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def register(self, metric):
+        # même nom et même nature = remplace (une nouvelle instance de worker rebranche ses callbacks);
+        # un autre type sous le même nom produirait deux # TYPE contradictoires
+        old = self._metrics.get(metric.name)
+        if old is not None and (type(old), old.kind) != (type(metric), metric.kind):
+            raise ValueError(f"metric {metric.name!r} already registered as {old.kind}")
+        self._metrics[metric.name] = metric
+
+    def callback(self, name: str, documentation: str, fn: Callable[[], Union[float, dict]],
+                 kind: str = "gauge", labelnames: Sequence[str] = ()):
+        self.register(_Callback(name, documentation, fn, kind, labelnames))
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        lines = []
+        for m in list(self._metrics.values()):
+            lines += m.render()
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# --- métriques partagées (scanner + bot) ---
+
+HTTP_REQUESTS = Counter("scanner_http_requests_total", "Bitget REST attempts by endpoint and HTTP status "
+                        "(\"error\" = network error or timeout)", ["endpoint", "status"])
+HTTP_LATENCY = Histogram("scanner_http_request_seconds", "Bitget REST attempt latency", ["endpoint"])
+SCORING_LATENCY = Histogram("scanner_scoring_seconds", "ScoringPool.score_many wall time per batch")
+SYMBOLS_SCORED = Counter("scanner_symbols_scored_total", "Symbols scored by outcome", ["outcome"])
+REDIS_FLUSH_LATENCY = Histogram("scanner_redis_flush_seconds", "ResultBatch transaction latency")
+REDIS_COMMANDS = Counter("scanner_redis_commands_total", "Commands sent in ResultBatch transactions")
+REDIS_FLUSH_ERRORS = Counter("scanner_redis_flush_errors_total", "Failed ResultBatch transactions")
+BATCH_LATENCY = Histogram("scanner_batch_seconds", "Worker batch duration (fetch, score, store)", ["mode"])
+SYMBOLS_PROCESSED = Counter("scanner_symbols_processed_total", "Symbols through a worker batch", ["mode"])
+SYMBOLS_PER_SECOND = Gauge("scanner_symbols_per_second", "Throughput of the last worker batch")
+SWEEP_DURATION = Histogram("scanner_sweep_seconds", "Time to scan every symbol of the worker once",
+                           buckets=(10, 30, 60, 120, 300, 600, 1200, 1800, 3600, 7200))
+STAGE_SYMBOLS = Counter("scanner_stage_symbols_total", "Symbols entering each pipeline stage", ["stage"])
+WORKER_ERRORS = Counter("scanner_worker_errors_total", "Worker loop exceptions")
+TELEGRAM_SENDS = Counter("bot_telegram_sends_total", "Telegram send_message calls by outcome", ["outcome"])
+TELEGRAM_LATENCY = Histogram("bot_telegram_send_seconds", "Telegram send_message latency (excluding rate limit waits)")
+ALERT_STREAM_LAG = Histogram("bot_alert_stream_lag_seconds", "Age of an alert stream entry when it is delivered",
+                             buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900))
+ALERT_STREAM_PENDING = Gauge("bot_alert_stream_pending", "Alert entries delivered to the group but not acked",
+                             ["group"])
+ALERT_STREAM_BACKLOG = Gauge("bot_alert_stream_backlog", "Alert entries not yet read by the group (redis >= 7)",
+                             ["group"])
+
+
+async def serve(port: int = METRICS_PORT, host: str = "0.0.0.0"):
+    """GET /metrics sur aiohttp (scanner sans l'app FastAPI); renvoie le runner à fermer."""
+    from aiohttp import web
+
+    async def handler(_request):
+        return web.Response(body=render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handler)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    return runner
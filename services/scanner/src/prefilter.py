@@ -0,0 +1,121 @@
+# scanner/prefilter.py
+"""
+Etapes d'élagage avant le scoring complet, pilotées par la section `scan`
+de config.yaml (une clé absente ou nulle désactive le filtre):
+
+1. tickers: un seul appel market/tickers pour tout le marché; les paires dont
+   le volume 24h en USDT est < min_volume ou le spread relatif > spread_max
+   ne sont pas scannées.
+2. cutoffs (seulement avec cutoffs_enabled: true): par unité de temps, sur
+   la dernière barre complète de ses bougies, atr_pct < atr_cutoff,
+   vol_spike_ratio < vol_spike_cutoff ou adx < adx_cutoff écarte cette unité
+   de temps du scoring. Un 1h raté n'empêche pas le score 1d (les alertes 1d
+   seules restent possibles).
+
+Une unité de temps écartée reçoit un résultat filtered_summary (raison
+visible dans /result) et sort du classement bot:top:<tf>.
+"""
+import asyncio
+import os
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+from loguru import logger
+from services.scanner.src.fetcher import get_tickers
+from services.scanner.src.settings import scan_config
+
+TICKER_TTL = float(os.getenv("TICKER_TTL", 30))  # secondes: un snapshot sert à plusieurs batchs
+# (colonne d'indicateur, clé de config) dans l'ordre d'évaluation
+CUTOFF_KEYS = (("atr_pct", "atr_cutoff"), ("vol_spike_ratio", "vol_spike_cutoff"), ("adx", "adx_cutoff"))
+STAGES = ("universe", "tickers", "cutoffs", "scored")
+
+
+def new_stage_counts() -> dict:
+    # symboles entrés dans chaque étape (pass-through: universe >= tickers >= cutoffs >= scored)
+    return {k: 0 for k in STAGES}
+
+
+def cutoffs_from_config(cfg: Optional[dict] = None) -> dict:
+    """Seuils de la section `scan`; {} (aucun cutoff) tant que cutoffs_enabled n'y est pas vrai."""
+    cfg = scan_config() if cfg is None else cfg
+    if not cfg.get("cutoffs_enabled"):
+        return {}
+    return {key: float(cfg[key]) for _, key in CUTOFF_KEYS if cfg.get(key)}
+
+
+def filtered_summary(reason: str) -> dict:
+    """Résultat d'une unité de temps écartée avant le scoring (même forme qu'un résumé en erreur)."""
+    return {"error": reason, "filtered": True, "score": 0.0}
+
+
+def cutoff_failure(latest: Optional[dict], cutoffs: dict) -> Optional[str]:
+    """Raison du premier cutoff raté (ordre CUTOFF_KEYS), None si tous passent."""
+    if latest is None:
+        return "insufficient data after indicators"
+    for col, key in CUTOFF_KEYS:
+        cut = cutoffs.get(key)
+        if cut is not None and not (latest[col] >= cut):
+            return f"cutoff: {col} {latest[col]:.4g} < {cut:g}"
+    return None
+
+
+def _spread(t: dict) -> float:
+    try:
+        bid, ask = float(t.get("bidPr") or 0), float(t.get("askPr") or 0)
+    except ValueError:
+        return float("inf")
+    if bid <= 0 or ask <= 0:
+        return float("inf")
+    return (ask - bid) / ((ask + bid) / 2)
+
+
+class TickerPrefilter:
+    """Premier étage: snapshot des tickers de tout le marché (1 requête, mis en cache TICKER_TTL)."""
+
+    def __init__(self, min_volume: Optional[float] = None, spread_max: Optional[float] = None,
+                 ttl: float = TICKER_TTL, cfg: Optional[dict] = None):
+        cfg = scan_config() if cfg is None else cfg
+        self.min_volume = float(cfg["min_volume"]) if min_volume is None and cfg.get("min_volume") else min_volume
+        self.spread_max = float(cfg["spread_max"]) if spread_max is None and cfg.get("spread_max") else spread_max
+        self.ttl = ttl
+        self._tickers: Dict[str, dict] = {}
+        self._fetched_at = 0.0
+        self._lock = asyncio.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.min_volume or self.spread_max)
+
+    async def tickers(self) -> Dict[str, dict]:
+        async with self._lock:
+            if time.monotonic() - self._fetched_at > self.ttl:
+                self._tickers = {t.get("symbol"): t for t in await get_tickers()}
+                self._fetched_at = time.monotonic()
+            return self._tickers
+
+    async def split(self, symbols: Sequence[str]) -> Tuple[List[str], Dict[str, str], Dict[str, float]]:
+        """(gardés, {écarté: raison}, {symbole: volume 24h USDT}). En cas d'erreur, tout passe."""
+        if not self.enabled:
+            return list(symbols), {}, {}
+        try:
+            tickers = await self.tickers()
+        except Exception as e:
+            logger.warning("ticker prefilter skipped: {}", e)
+            return list(symbols), {}, {}
+
+        kept, dropped, volumes = [], {}, {}
+        for s in symbols:
+            t = tickers.get(s)
+            if t is None:
+                # pas (encore) dans le snapshot: nouvelle cotation, on laisse passer
+                kept.append(s)
+                continue
+            vol = float(t.get("usdtVolume") or 0.0)
+            volumes[s] = vol
+            spread = _spread(t)
+            if self.min_volume and vol < self.min_volume:
+                dropped[s] = f"prefilter: volume {vol:.0f} < {self.min_volume:.0f}"
+            elif self.spread_max and spread > self.spread_max:
+                dropped[s] = f"prefilter: spread {spread:.4g} > {self.spread_max:g}"
+            else:
+                kept.append(s)
+        return kept, dropped, volumes
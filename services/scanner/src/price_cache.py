@@ -0,0 +1,61 @@
+# scanner/price_cache.py
+"""
+Cache court (bot:price:<symbol>) du dernier prix et des variations 1h/24h/7d.
+
+Le worker l'écrit à chaque scoring à partir des bougies qu'il vient de
+télécharger; le bot le lit pour ses messages et n'interroge l'exchange
+qu'en cas d'absence (clé expirée ou symbole jamais scanné).
+"""
+import os
+from typing import Optional, Sequence, Tuple
+
+from services.scanner.src.scoring import parse_candles
+
+PRICE_CACHE_PREFIX = "bot:price:"
+PRICE_CACHE_TTL = int(os.getenv("PRICE_CACHE_TTL", 300))  # secondes
+
+PriceChanges = Tuple[float, Optional[float], Optional[float], Optional[float]]  # price, pct_1h, pct_24h, pct_7d
+
+
+def _pct(last: float, prev: float) -> float:
+    return (last - prev) / prev if prev != 0 else 0.0
+
+
+def price_and_changes(closes_1h: Sequence[float], closes_1d: Sequence[float]) -> PriceChanges:
+    """Même calcul que le bot: dernier close, variation sur 1 bougie 1h, 1 et 7 bougies 1d."""
+    last = float(closes_1h[-1]) if len(closes_1h) else 0.0
+    prev = float(closes_1h[-2]) if len(closes_1h) >= 2 else last
+    pct_1h = _pct(last, prev)
+
+    lastd = float(closes_1d[-1]) if len(closes_1d) else last
+    prev24 = float(closes_1d[-2]) if len(closes_1d) >= 2 else lastd
+    prev7 = float(closes_1d[-8]) if len(closes_1d) >= 8 else lastd
+    price_now = lastd if len(closes_1d) else last
+    return price_now, pct_1h, _pct(lastd, prev24), _pct(lastd, prev7)
+
+
+def price_from_candles(candles_1h, candles_1d) -> PriceChanges:
+    """price_and_changes depuis des bougies Bitget (lignes brutes ou tableau CANDLE_DTYPE)."""
+    return price_and_changes(parse_candles(candles_1h[-2:])["close"], parse_candles(candles_1d[-8:])["close"])
+
+
+def encode_price(values: PriceChanges) -> str:
+    return "|".join("" if v is None else repr(float(v)) for v in values)
+
+
+def decode_price(raw: Optional[str]) -> Optional[PriceChanges]:
+    if not raw:
+        return None
+    try:
+        price, pct_1h, pct_24h, pct_7d = (None if v == "" else float(v) for v in raw.split("|"))
+    except ValueError:
+        return None
+    return price, pct_1h, pct_24h, pct_7d
+
+
+async def get_cached_price(r, symbol: str) -> Optional[PriceChanges]:
+    return decode_price(await r.get(PRICE_CACHE_PREFIX + symbol))
+
+
+async def set_cached_price(r, symbol: str, values: PriceChanges, ttl: int = PRICE_CACHE_TTL):
+    await r.set(PRICE_CACHE_PREFIX + symbol, encode_price(values), ex=ttl)
@@ -1,6 +1,6 @@
-﻿import json
-import redis.asyncio as redis
+﻿import redis.asyncio as redis
 from loguru import logger
+from services.scanner.src.alert_codec import encode_alert, trim_args
 
 class RedisPublisher:
     def __init__(self, redis_url="redis://redis:6379/0", stream_name="alerts_stream"):
@@ -9,7 +9,7 @@ class RedisPublisher:
 
     async def publish(self, payload: dict):
         try:
-            # store JSON under field "data"
-            await self.r.xadd(self.stream, {"data": json.dumps(payload)})
+            # compact v2 entry, stream trimmed to the retention window
+            await self.r.xadd(self.stream, encode_alert(payload["symbol"], payload.get("summary", {})), **trim_args())
         except Exception as e:
-            logger.exception("Failed to publish to redis: %s", e)
+            logger.exception("Failed to publish to redis: {}", e)
@@ -0,0 +1,90 @@
+# scanner/ratelimit.py
+import asyncio
+import os
+import time
+import weakref
+
+# Bitget spot market endpoints (candles, tickers): 20 req/s per IP
+BITGET_MARKET_RPS = float(os.getenv("BITGET_MARKET_RPS", "18"))
+BITGET_MARKET_BURST = float(os.getenv("BITGET_MARKET_BURST", "18"))
+MAX_IN_FLIGHT = int(os.getenv("MAX_IN_FLIGHT", "16"))
+
+
+def _per_loop(cache: weakref.WeakKeyDictionary, factory):
+    """
+    The asyncio primitive of `cache` for the running loop, created on first use.
+    Locks and semaphores bind to the loop that first waits on them, while the
+    limiters below are module-level and outlive loops (asyncio.run() per bot
+    command, scripts): each loop gets its own, the token budget stays shared.
+    """
+    loop = asyncio.get_running_loop()
+    obj = cache.get(loop)
+    if obj is None:
+        obj = cache[loop] = factory()
+    return obj
+
+
+class TokenBucket:
+    """
+    Async token bucket: `rate` tokens per second, up to `capacity` tokens banked.
+    acquire() waits until enough tokens are available.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        if rate <= 0:
+            raise ValueError("rate must be > 0")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._locks = weakref.WeakKeyDictionary()  # event loop -> asyncio.Lock
+
+    def _refill(self, now: float):
+        elapsed = now - self._updated
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        # the lock keeps waiters FIFO so a burst cannot starve earlier callers
+        async with _per_loop(self._locks, asyncio.Lock):
+            while True:
+                self._refill(time.monotonic())
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class RequestLimiter:
+    """
+    Bounds in-flight requests (semaphore) and their start rate (token bucket).
+    Use as `async with limiter: ...` around a single HTTP request.
+    """
+
+    def __init__(self, max_in_flight: int = MAX_IN_FLIGHT, rate: float = BITGET_MARKET_RPS,
+                 burst: float = BITGET_MARKET_BURST):
+        self.max_in_flight = max_in_flight
+        self.bucket = TokenBucket(rate, burst)
+        self._sems = weakref.WeakKeyDictionary()  # event loop -> asyncio.Semaphore
+
+    def _sem(self) -> asyncio.Semaphore:
+        return _per_loop(self._sems, lambda: asyncio.Semaphore(self.max_in_flight))
+
+    async def __aenter__(self):
+        sem = self._sem()
+        await sem.acquire()
+        try:
+            await self.bucket.acquire()
+        except BaseException:
+            sem.release()
+            raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._sem().release()
+        return False
+
+
+# shared by every caller of the Bitget market endpoints (scanner + bot)
+MARKET_LIMITER = RequestLimiter()
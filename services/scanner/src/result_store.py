@@ -0,0 +1,193 @@
+# scanner/result_store.py
+import json
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from services.scanner.src.alert_codec import encode_alert, trim_args
+from services.scanner.src.metrics import REDIS_COMMANDS, REDIS_FLUSH_LATENCY
+
+REDIS_TOP_PREFIX = "bot:top:"  # bot:top:<1h|1d> ZSET symbole -> dernier score
+REDIS_SEEN_SUFFIX = ":seen"  # bot:top:<1h|1d>:seen ZSET symbole -> ts unix de ce score (purge)
+REDIS_RESULT_PREFIX = "bot:result:"  # bot:result:<symbol>:<1h|1d> -> dernier résumé en JSON
+REDIS_SWEEP_GEN_KEY = "bot:sweep:gen"  # incrémenté à chaque tour complet de la rotation sur l'univers
+TOP_TIMEFRAMES = ("1h", "1d")
+# bot:result:<symbol>:<tf> expire seul ~une barre (plus une marge) après sa dernière écriture:
+# l'ancienne valeur reste servie pendant le sweep suivant, rien n'est jamais supprimé en masse
+RESULT_TTL = {
+    "1h": int(os.getenv("RESULT_TTL_1H", 2 * 3600)),
+    "1d": int(os.getenv("RESULT_TTL_1D", 26 * 3600)),
+}
+# membres du classement dont le score est plus vieux que le TTL des résultats (symbole délisté, écarté par le
+# préfiltre, fetchs en échec...): retirés du classement et de son jumeau :seen. KEYS = classement, :seen;
+# ARGV[1] = seuil (unix s)
+_PRUNE = """
+local old = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', ARGV[1])
+for i = 1, #old, 500 do
+  local chunk = {unpack(old, i, math.min(i + 499, #old))}
+  redis.call('ZREM', KEYS[1], unpack(chunk))
+  redis.call('ZREM', KEYS[2], unpack(chunk))
+end
+return #old
+"""
+
+
+def new_redis_stats() -> dict:
+    # round trips réellement envoyés à redis et commandes qu'ils transportaient
+    return {"round_trips": 0, "commands": 0}
+
+
+class ResultBatch:
+    """
+    Écritures redis d'un batch (résultats par unité de temps, classements, alertes,
+    clés simples comme l'index de rotation) accumulées en mémoire et envoyées en un
+    seul pipeline MULTI/EXEC: un round trip pour tout le batch au lieu d'un SET par
+    symbole plus un XADD par alerte.
+    """
+
+    def __init__(self, result_prefix: str, alert_stream: str):
+        self.result_prefix = result_prefix
+        self.alert_stream = alert_stream
+        self.alerts: List[dict] = []  # champs de stream encodés
+        self.keys: Dict[str, Tuple[str, Optional[int]]] = {}  # key -> (value, ttl)
+        self.scores: Dict[str, Dict[str, float]] = {tf: {} for tf in TOP_TIMEFRAMES}
+        self.unscored: Dict[str, List[str]] = {tf: [] for tf in TOP_TIMEFRAMES}
+        self.incrs: List[str] = []
+
+    def add_result(self, symbol: str, summary: dict, gen: int = 0):
+        now = int(time.time())
+        for tf in TOP_TIMEFRAMES:
+            tf_summary = summary.get(tf) or {}
+            self.set(result_key(self.result_prefix, symbol, tf), json.dumps({**tf_summary, "gen": gen, "ts": now}),
+                     ex=RESULT_TTL[tf])
+            if tf_summary.get("error") is None and tf_summary.get("score") is not None:
+                self.scores[tf][symbol] = float(tf_summary["score"])
+            else:
+                # plus de score sur cette unité de temps: retiré du classement
+                self.unscored[tf].append(symbol)
+
+    def add_alert(self, symbol: str, summary: dict):
+        self.alerts.append(encode_alert(symbol, summary))
+
+    def set(self, key: str, value, ex: Optional[int] = None):
+        self.keys[key] = (str(value), ex)
+
+    def incr(self, key: str):
+        self.incrs.append(key)
+
+    def remove(self, symbol: str):
+        """Retire `symbol` de tous les classements (plus de score: filtré, délisté...)."""
+        for tf in TOP_TIMEFRAMES:
+            self.unscored[tf].append(symbol)
+
+    def __len__(self) -> int:
+        # classements: ZADD/ZREM sur le classement et son jumeau :seen
+        return (len(self.alerts) + len(self.keys) + len(self.incrs)
+                + 2 * sum(1 for m in self.scores.values() if m) + 2 * sum(1 for m in self.unscored.values() if m))
+
+    async def flush(self, r, stats: Optional[dict] = None) -> int:
+        """
+        Envoie tout en une transaction; retourne le nombre de commandes envoyées.
+        Chaque classement perd aussi les membres non rescorés depuis RESULT_TTL.
+        """
+        n = len(self)
+        if not n:
+            return 0
+        now = int(time.time())
+        t0 = time.perf_counter()
+        async with r.pipeline(transaction=True) as pipe:
+            for tf in TOP_TIMEFRAMES:
+                top, seen = REDIS_TOP_PREFIX + tf, REDIS_TOP_PREFIX + tf + REDIS_SEEN_SUFFIX
+                if self.scores[tf]:
+                    pipe.zadd(top, self.scores[tf])
+                    pipe.zadd(seen, {symbol: now for symbol in self.scores[tf]})
+                if self.unscored[tf]:
+                    pipe.zrem(top, *self.unscored[tf])
+                    pipe.zrem(seen, *self.unscored[tf])
+                pipe.eval(_PRUNE, 2, top, seen, now - RESULT_TTL[tf])
+            trim = trim_args()
+            for fields in self.alerts:
+                pipe.xadd(self.alert_stream, fields, **trim)
+            for key, (value, ex) in self.keys.items():
+                pipe.set(key, value, ex=ex)
+            for key in self.incrs:
+                pipe.incr(key)
+            await pipe.execute()
+        n += len(TOP_TIMEFRAMES)  # les purges
+        REDIS_FLUSH_LATENCY.observe(time.perf_counter() - t0)
+        REDIS_COMMANDS.inc(n)
+        if stats is not None:
+            stats["round_trips"] += 1
+            stats["commands"] += n
+        self.alerts, self.keys, self.incrs = [], {}, []
+        self.scores = {tf: {} for tf in TOP_TIMEFRAMES}
+        self.unscored = {tf: [] for tf in TOP_TIMEFRAMES}
+        return n
+
+
+def result_key(prefix: str, symbol: str, timeframe: str) -> str:
+    return f"{prefix}{symbol}:{timeframe}"
+
+
+async def load_result(r, prefix: str, symbol: str) -> Optional[dict]:
+    """Dernier résumé stocké {"1h": ..., "1d": ...} d'un symbole (un MGET), None si les deux ont expiré."""
+    values = await r.mget([result_key(prefix, symbol, tf) for tf in TOP_TIMEFRAMES])
+    if not any(values):
+        return None
+    return {tf: (json.loads(v) if v else {"error": "expired", "score": 0.0}) for tf, v in zip(TOP_TIMEFRAMES, values)}
+
+
+def _check_timeframe(timeframe: str):
+    if timeframe not in TOP_TIMEFRAMES:
+        raise ValueError(f"unknown timeframe {timeframe!r} (expected one of {TOP_TIMEFRAMES})")
+
+
+async def _live_rows(r, timeframe: str, fetch, n: Optional[int], result_prefix: str) -> List[Tuple[str, float]]:
+    """
+    Lignes du classement lues par `fetch(start, num)` dont la clé bot:result existe
+    encore, jusqu'à n (None = toutes). Les membres trouvés sans résultat (expiré
+    avant la purge du flush suivant) sont retirés (ZREM) au passage.
+    """
+    key = REDIS_TOP_PREFIX + timeframe
+    page = n or 100
+    out, start = [], 0
+    while n is None or len(out) < n:
+        rows = await fetch(start, page)
+        if not rows:
+            break
+        alive = await r.mget([result_key(result_prefix, m, timeframe) for m, _ in rows])
+        stale = [m for (m, _), v in zip(rows, alive) if v is None]
+        out += [(m, float(sc)) for (m, sc), v in zip(rows, alive) if v is not None]
+        if stale:
+            await r.zrem(key, *stale)
+            await r.zrem(key + REDIS_SEEN_SUFFIX, *stale)
+        if len(rows) < page:
+            break
+        # les membres périmés qu'on vient de retirer n'occupent plus de rang
+        start += len(rows) - len(stale)
+    return out if n is None else out[:n]
+
+
+async def top_symbols(r, timeframe: str = "1h", n: int = 10,
+                      result_prefix: str = REDIS_RESULT_PREFIX) -> List[Tuple[str, float]]:
+    """[(symbol, score)] des n meilleurs derniers scores (un ZREVRANGE + un MGET dans le cas courant)."""
+    _check_timeframe(timeframe)
+    if n <= 0:
+        return []
+
+    async def fetch(start, num):
+        return await r.zrevrange(REDIS_TOP_PREFIX + timeframe, start, start + num - 1, withscores=True)
+
+    return await _live_rows(r, timeframe, fetch, n, result_prefix)
+
+
+async def symbols_in_range(r, timeframe: str = "1h", min_score: float = 0.0, max_score: float = 1.0,
+                           limit: Optional[int] = None,
+                           result_prefix: str = REDIS_RESULT_PREFIX) -> List[Tuple[str, float]]:
+    """[(symbol, score)] avec min_score <= score <= max_score, meilleurs en tête."""
+    _check_timeframe(timeframe)
+
+    async def fetch(start, num):
+        return await r.zrevrangebyscore(REDIS_TOP_PREFIX + timeframe, max_score, min_score, start=start, num=num,
+                                        withscores=True)
+
+    return await _live_rows(r, timeframe, fetch, limit or None, result_prefix)
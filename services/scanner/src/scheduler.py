@@ -0,0 +1,163 @@
+# scanner/scheduler.py
+import bisect
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+from services.scanner.src.scoring import parse_candles
+
+SCHED_HOT_INTERVAL = float(os.getenv("SCHED_HOT_INTERVAL", 3600))       # symboles chauds: à chaque barre 1h
+SCHED_COLD_INTERVAL = float(os.getenv("SCHED_COLD_INTERVAL", 4 * 3600))  # paires mortes: toutes les 4h
+SCHED_MAX_STALENESS = float(os.getenv("SCHED_MAX_STALENESS", 6 * 3600))  # plafond strict entre deux scans
+SCHED_HOT_SCORE = float(os.getenv("SCHED_HOT_SCORE", 0.6))              # score max qui rend un symbole tout chaud
+
+
+def usdt_volume_24h(candles_1h) -> float:
+    """Volume USDT 24h: somme de la colonne usdtVolume (index 6) sur les 24 dernières bougies 1h."""
+    c = parse_candles(candles_1h[-24:])
+    return float(np.nansum(c["usdt_volume"])) if len(c) else 0.0
+
+
+class _Entry:
+    __slots__ = ("symbol", "score", "volume", "last_scan", "next_due", "interval", "heat")
+
+    def __init__(self, symbol: str):
+        self.symbol = symbol
+        self.score = 0.0
+        self.volume = 0.0
+        self.last_scan = None   # secondes unix, None = jamais scanné
+        self.next_due = 0.0     # dû tout de suite
+        self.interval = None
+        self.heat = None        # dans [0, 1], fixé à chaque scan
+
+    def to_dict(self, now: float) -> dict:
+        return {"symbol": self.symbol, "score": round(self.score, 4), "volume_24h": round(self.volume, 2),
+                "interval": self.interval, "heat": self.heat, "last_scan": self.last_scan,
+                "due_in": round(self.next_due - now, 1)}
+
+
+class SymbolScheduler:
+    """
+    Choisit les symboles que scanne le batch suivant.
+
+    Chaque symbole a un intervalle de rescan entre `hot_interval` et `cold_interval`
+    (interpolation géométrique sur une chaleur dans [0, 1]: le plus grand de son
+    score max récent / `hot_score` et de son percentile de volume USDT 24h dans
+    l'univers), jamais au-dessus de `max_staleness`. next_batch() retourne les
+    symboles dont l'échéance est passée, la plus ancienne d'abord; les symboles
+    jamais scannés passent devant.
+    """
+
+    def __init__(self, symbols: Sequence[str], hot_interval: float = SCHED_HOT_INTERVAL,
+                 cold_interval: float = SCHED_COLD_INTERVAL, max_staleness: float = SCHED_MAX_STALENESS,
+                 hot_score: float = SCHED_HOT_SCORE):
+        self.hot_interval = hot_interval
+        self.cold_interval = min(cold_interval, max_staleness)
+        self.max_staleness = max_staleness
+        self.hot_score = hot_score
+        self.entries: Dict[str, _Entry] = {}
+        self._pass: set = set()  # symboles scannés depuis le dernier passage complet
+        self.set_symbols(symbols)
+
+    def set_symbols(self, symbols: Sequence[str]):
+        """Adopte un nouvel univers: les nouveaux symboles sont dus tout de suite, les retirés sont oubliés."""
+        self.entries = {s: self.entries.get(s) or _Entry(s) for s in symbols}
+        self._pass &= set(self.entries)
+
+    def _heat(self, entry: _Entry, volumes: List[float]) -> float:
+        score_heat = min(1.0, max(0.0, entry.score / self.hot_score)) if self.hot_score > 0 else 0.0
+        liq_heat = bisect.bisect_left(volumes, entry.volume) / len(volumes) if volumes else 0.0
+        return max(score_heat, liq_heat)
+
+    def _interval(self, heat: float) -> float:
+        return min(self.max_staleness, self.cold_interval * (self.hot_interval / self.cold_interval) ** heat)
+
+    def update(self, symbol: str, score: Optional[float] = None, volume_24h: Optional[float] = None,
+               now: Optional[float] = None):
+        """Enregistre un scan de `symbol` (score None = scoring en échec) et planifie le suivant."""
+        entry = self.entries.get(symbol)
+        if entry is None:
+            return
+        now = time.time() if now is None else now
+        entry.score = float(score or 0.0)
+        if volume_24h is not None:
+            entry.volume = float(volume_24h)
+        entry.last_scan = now
+        volumes = sorted(e.volume for e in self.entries.values() if e.last_scan is not None)
+        entry.heat = round(self._heat(entry, volumes), 3)
+        entry.interval = round(self._interval(entry.heat), 1)
+        entry.next_due = now + entry.interval
+        self._pass.add(symbol)
+
+    def end_of_pass(self) -> bool:
+        """True dès que tout l'univers a été scanné depuis le passage complet précédent (puis remet à zéro)."""
+        if self.entries and len(self._pass) >= len(self.entries):
+            self._pass = set()
+            return True
+        return False
+
+    def next_batch(self, n: int, now: Optional[float] = None) -> List[str]:
+        now = time.time() if now is None else now
+        due = [e for e in self.entries.values() if e.next_due <= now]
+        due.sort(key=lambda e: (e.last_scan is not None, e.next_due, -e.score))
+        return [e.symbol for e in due[:n]]
+
+    def snapshot(self, now: Optional[float] = None, limit: Optional[int] = None,
+                 symbols: Optional[Sequence[str]] = None) -> dict:
+        """État de la file, échéance la plus proche d'abord (seulement `symbols` s'il est donné)."""
+        now = time.time() if now is None else now
+        entries = self.entries.values() if symbols is None else \
+            [self.entries[s] for s in symbols if s in self.entries]
+        entries = sorted(entries, key=lambda e: e.next_due)
+        return {
+            "ts": int(now),
+            "symbols": len(entries),
+            "due": sum(1 for e in entries if e.next_due <= now),
+            "never_scanned": sum(1 for e in entries if e.last_scan is None),
+            "queue": [e.to_dict(now) for e in entries[:limit]],
+        }
+
+    def dumps(self, symbols: Optional[Sequence[str]] = None) -> str:
+        return json.dumps(self.snapshot(symbols=symbols), separators=(",", ":"))
+
+    def restore(self, raw: Optional[str]):
+        """Recharge last_scan/score/volume depuis un dumps(): un redémarrage ne rescanne pas tout."""
+        if not raw:
+            return
+        for row in json.loads(raw).get("queue", []):
+            entry = self.entries.get(row.get("symbol"))
+            if entry is None or row.get("last_scan") is None:
+                continue
+            entry.score = float(row.get("score") or 0.0)
+            entry.volume = float(row.get("volume_24h") or 0.0)
+            entry.last_scan = float(row["last_scan"])
+            entry.interval = row.get("interval")
+            entry.heat = row.get("heat")
+            entry.next_due = entry.last_scan + float(entry.interval or 0.0)
+
+
+def merge_snapshots(raws: Iterable[Optional[str]], now: Optional[float] = None) -> Optional[dict]:
+    """
+    Un seul snapshot() à partir de plusieurs dumps() (un par shard en mode shardé),
+    None s'il n'y en a aucun. due_in est recalculé pour `now`: chaque snapshot a
+    l'âge du dernier batch de son shard.
+    """
+    now = time.time() if now is None else now
+    snaps = [json.loads(raw) for raw in raws if raw]
+    if not snaps:
+        return None
+    queue = []
+    for snap in snaps:
+        age = now - snap.get("ts", now)
+        queue += [{**e, "due_in": round(e["due_in"] - age, 1)} for e in snap.get("queue", [])]
+    queue.sort(key=lambda e: e["due_in"])
+    return {
+        "ts": int(now),
+        "snapshots": len(snaps),
+        "symbols": sum(s["symbols"] for s in snaps),
+        "due": sum(1 for e in queue if e["due_in"] <= 0),
+        "never_scanned": sum(s["never_scanned"] for s in snaps),
+        "queue": queue,
+    }
@@ -0,0 +1,92 @@
+# scanner/score_cache.py
+"""
+Cache LRU/TTL des résumés de scoring par (symbole, unité de temps, identité
+des barres en entrée): tant que les bougies n'ont pas changé, le résumé
+stocké est renvoyé sans recalculer d'indicateurs.
+
+La barre en cours (dernière bougie pas encore close) change à chaque passe;
+SCORE_CACHE_LIVE_BAR décide comment elle compte:
+- "include": ses valeurs font partie de la clé (résultats identiques au calcul sans cache)
+- "stale":   seul son timestamp compte: le résumé est réutilisé jusqu'à la clôture
+             de la barre ou l'expiration du TTL
+- "exclude": elle est retirée avant le scoring, la clé est la dernière barre close
+
+Le cache vit dans le processus qui score: le scanner et le BotWorker de /run
+(conteneur du bot) ont chacun le leur, rien n'est partagé entre les deux.
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Hashable, Optional, Tuple
+import numpy as np
+from services.scanner.src.candle_store import GRANULARITY_MS
+
+SCORE_CACHE_SIZE = int(os.getenv("SCORE_CACHE_SIZE", 4096))  # entrées (symbole x unité de temps), 0 = pas de cache
+SCORE_CACHE_TTL = float(os.getenv("SCORE_CACHE_TTL", 3600))  # secondes
+SCORE_CACHE_LIVE_BAR = os.getenv("SCORE_CACHE_LIVE_BAR", "include")  # "include" | "stale" | "exclude"
+LIVE_BAR_POLICIES = ("include", "stale", "exclude")
+LABEL_GRANULARITY = {"1h": "1h", "1d": "1day"}  # label de résumé -> granularité Bitget
+
+
+def new_cache_stats() -> dict:
+    return {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+
+
+class ScoreCache:
+    def __init__(self, maxsize: int = SCORE_CACHE_SIZE, ttl: float = SCORE_CACHE_TTL,
+                 live_bar: str = SCORE_CACHE_LIVE_BAR):
+        if live_bar not in LIVE_BAR_POLICIES:
+            raise ValueError(f"SCORE_CACHE_LIVE_BAR must be one of {LIVE_BAR_POLICIES}, got {live_bar!r}")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.live_bar = live_bar
+        self._data: "OrderedDict[Hashable, Tuple[float, dict]]" = OrderedDict()
+        self.stats = new_cache_stats()
+
+    def __len__(self):
+        return len(self._data)
+
+    def key(self, symbol: str, label: str, candles: np.ndarray,
+            now_ms: Optional[int] = None) -> Tuple[Hashable, np.ndarray]:
+        """(clé, bougies à scorer) pour un tableau CANDLE_DTYPE, selon la politique de barre en cours."""
+        if len(candles) == 0:
+            return (symbol, label, 0), candles
+        now_ms = int(time.time() * 1000) if now_ms is None else now_ms
+        last = candles[-1]
+        live = int(last["ts"]) + GRANULARITY_MS.get(LABEL_GRANULARITY.get(label), 0) > now_ms
+        if live and self.live_bar == "exclude":
+            candles = candles[:-1]
+            live = False
+            if len(candles) == 0:
+                return (symbol, label, 0), candles
+            last = candles[-1]
+        ident = (symbol, label, len(candles), int(candles[0]["ts"]), int(last["ts"]))
+        if live and self.live_bar == "include":
+            ident += (float(last["open"]), float(last["high"]), float(last["low"]), float(last["close"]),
+                      float(last["volume"]))
+        return ident, candles
+
+    def get(self, key: Hashable) -> Optional[dict]:
+        item = self._data.get(key)
+        if item is None:
+            self.stats["misses"] += 1
+            return None
+        expires, value = item
+        if expires < time.monotonic():
+            del self._data[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._data.move_to_end(key)
+        self.stats["hits"] += 1
+        return value
+
+    def put(self, key: Hashable, value: dict):
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def clear(self):
+        self._data.clear()
@@ -1,7 +1,74 @@
 ﻿# bot/scoring.py
+import os
+import time
+import numpy as np
 import pandas as pd
 import pandas_ta as ta
 import json
+from loguru import logger
+from services.scanner.src import ta_kernels
+
+# moteur de calcul ATR/RSI/ADX: "numba" (JIT, repli numpy), "numpy" ou "pandas_ta" (référence).
+# Hors pandas_ta, le scoring passe par parse_candles et ne construit aucun DataFrame.
+SCORING_BACKEND = os.getenv("SCORING_BACKEND", "numba")
+_backend_warned = set()
+
+DEFAULT_WEIGHTS = {
+    "liquidity_vol": 0.25,
+    "atr_percent": 0.25,
+    "volume_spike": 0.2,
+    "adx": 0.15,
+    "rsi_pullback": 0.15
+}
+
+# bougie Bitget décodée: ts, open, high, low, close, baseVolume, usdtVolume, quoteVolume
+CANDLE_DTYPE = np.dtype([
+    ("ts", "i8"),
+    ("open", "f8"),
+    ("high", "f8"),
+    ("low", "f8"),
+    ("close", "f8"),
+    ("volume", "f8"),
+    ("usdt_volume", "f8"),
+    ("quote_volume", "f8"),
+])
+
+
+def _to_float(col):
+    try:
+        return np.asarray(col, dtype=np.float64)
+    except (TypeError, ValueError):
+        # même tolérance que pd.to_numeric(errors="coerce")
+        return np.asarray(pd.to_numeric(pd.Series(col), errors="coerce"), dtype=np.float64)
+
+
+def parse_candles(ohlcv) -> np.ndarray:
+    """
+    Décode directement les lignes Bitget (listes de str, 6 ou 8 colonnes) en
+    tableau structuré CANDLE_DTYPE (ts en ms int64), dans l'ordre reçu.
+    Les lignes sans open/high/low/close valides sont retirées, comme dans ohlcv_to_df.
+    """
+    if isinstance(ohlcv, np.ndarray) and ohlcv.dtype == CANDLE_DTYPE:
+        return ohlcv
+    n = len(ohlcv) if ohlcv is not None else 0
+    out = np.empty(n, dtype=CANDLE_DTYPE)
+    if n == 0:
+        return out
+    cols = list(zip(*ohlcv))
+    out["ts"] = np.asarray(cols[0], dtype=np.int64)
+    for i, name in enumerate(("open", "high", "low", "close", "volume", "usdt_volume", "quote_volume"), start=1):
+        out[name] = _to_float(cols[i]) if i < len(cols) else (0.0 if name == "volume" else np.nan)
+    ok = ~(np.isnan(out["open"]) | np.isnan(out["high"]) | np.isnan(out["low"]) | np.isnan(out["close"]))
+    return out if ok.all() else out[ok]
+
+
+def candles_to_df(candles: np.ndarray) -> pd.DataFrame:
+    """Tableau structuré -> DataFrame au format de ohlcv_to_df (pour le backend pandas_ta)."""
+    df = pd.DataFrame({c: candles[c] for c in ("open", "high", "low", "close", "volume")},
+                      index=pd.to_datetime(candles["ts"], unit="ms"))
+    df.index.name = "timestamp"
+    return df
+
 
 def ohlcv_to_df(ohlcv):
     """
@@ -52,20 +119,72 @@ def ohlcv_to_df(ohlcv):
     return df
 
 
-def compute_indicators(df):
+def resolve_backend(backend=None):
+    backend = backend or SCORING_BACKEND
+    if backend == "pandas_ta":
+        return backend
+    resolved = ta_kernels.resolve_backend(backend)
+    if resolved != backend and backend not in _backend_warned:
+        _backend_warned.add(backend)
+        logger.warning("scoring backend {} unavailable, using {}", backend, resolved)
+    return resolved
+
+
+def compute_indicators(df, backend=None):
+    backend = resolve_backend(backend)
     df = df.copy()
-    df["atr"] = ta.atr(df["high"], df["low"], df["close"], length=14)
-    df["atr_pct"] = df["atr"] / df["close"]
-    df["rsi"] = ta.rsi(df["close"], length=14)
-    adx_df = ta.adx(df["high"], df["low"], df["close"], length=14)
-    df["adx"] = adx_df.get("ADX_14")
-    df["ma20"] = ta.sma(df["close"], length=20)
-    df["ma50"] = ta.sma(df["close"], length=50)
+    if backend == "pandas_ta":
+        df["atr"] = ta.atr(df["high"], df["low"], df["close"], length=14)
+        df["atr_pct"] = df["atr"] / df["close"]
+        df["rsi"] = ta.rsi(df["close"], length=14)
+        adx_df = ta.adx(df["high"], df["low"], df["close"], length=14)
+        # série trop courte: pandas_ta renvoie None (comme les noyaux, aucune ligne complète)
+        df["adx"] = adx_df.get("ADX_14") if adx_df is not None else np.nan
+        df["ma20"] = ta.sma(df["close"], length=20)
+        df["ma50"] = ta.sma(df["close"], length=50)
+    else:
+        # noyaux sur tableaux float64 contigus, sans Series intermédiaires
+        high, low, close = (df[c].to_numpy(dtype="float64") for c in ("high", "low", "close"))
+        atr, rsi, adx = ta_kernels.wilder_indicators(high, low, close, backend)
+        df["atr"] = atr
+        df["atr_pct"] = atr / close
+        df["rsi"] = rsi
+        df["adx"] = adx
+        df["ma20"] = ta_kernels.sma(close, 20)
+        df["ma50"] = ta_kernels.sma(close, 50)
     df["vol_ma20"] = df["volume"].rolling(20).mean()
     df["vol_spike_ratio"] = df["volume"] / df["vol_ma20"]
     df = df.dropna()
     return df
 
+def compute_indicators_arrays(candles: np.ndarray, backend=None) -> dict:
+    """Colonnes de compute_indicators (avant dropna) à partir d'un tableau structuré."""
+    backend = resolve_backend(backend)
+    if backend == "pandas_ta":
+        df = compute_indicators(candles_to_df(candles), backend)
+        return {c: df[c].to_numpy() for c in df.columns}
+    cols = [np.ascontiguousarray(candles[c]) for c in ("open", "high", "low", "close", "volume")]
+    return ta_kernels.indicators(*cols, backend=backend)
+
+
+def latest_indicators(candles: np.ndarray, backend=None):
+    """
+    Dernière ligne complète d'indicateurs (équivalent de compute_indicators(df).iloc[-1])
+    sous forme de dict de floats, ou None si aucune ligne n'est complète.
+    """
+    if len(candles) == 0:
+        return None
+    backend = resolve_backend(backend)
+    if backend == "pandas_ta":
+        df = compute_indicators(candles_to_df(candles), backend)
+        return None if df.empty else df.iloc[-1]
+    ind = compute_indicators_arrays(candles, backend)
+    i = int(ta_kernels.last_complete_index(ind))
+    if i < 0:
+        return None
+    return {k: float(v[i]) for k, v in ind.items()}
+
+
 def compute_simple_score(norm_dict, weights):
     s = 0.0
     s += weights.get("liquidity_vol", 0.25) * norm_dict.get("volume_norm", 0)
@@ -121,30 +240,38 @@ def compute_norms_from_indicator_df(df_latest, params=None):
     }
     return norm_dict
 
-def compute_scores_from_ohlcv(ohlcv_1h, ohlcv_1d, weights=None, norm_params=None):
+def score_timeframe(raw, weights=None, norm_params=None, backend=None, spans=None) -> dict:
+    """
+    Résumé d'une seule unité de temps ({"norms", "score", "latest_raw"} ou {"error", "score": 0.0}).
+    `spans`: liste où ajouter ("indicators" | "norms", t0, t1) en secondes epoch (traces du sweep).
+    """
     if weights is None:
-        weights = {
-            "liquidity_vol": 0.25,
-            "atr_percent": 0.25,
-            "volume_spike": 0.2,
-            "adx": 0.15,
-            "rsi_pullback": 0.15
-        }
+        weights = DEFAULT_WEIGHTS
     if norm_params is None:
         norm_params = {}
+    if raw is None or len(raw) == 0:
+        return {"error": "no data", "score": 0.0}
+
+    backend = resolve_backend(backend)
+    t0 = time.time() if spans is not None else 0.0
+    if backend == "pandas_ta" and not isinstance(raw, np.ndarray):
+        df_ind = compute_indicators(ohlcv_to_df(raw), backend)
+        latest = None if df_ind.empty else df_ind.iloc[-1]
+    else:
+        # chemin rapide: lignes Bitget -> tableau typé -> noyaux, sans DataFrame
+        latest = latest_indicators(parse_candles(raw), backend)
+    if spans is not None:
+        t1 = time.time()
+        spans.append(("indicators", t0, t1))
+    if latest is None:
+        return {"error": "insufficient data after indicators", "score": 0.0}
+    norms = compute_norms_from_indicator_df(latest, norm_params)
+    score = compute_simple_score(norms, weights)
+    if spans is not None:
+        spans.append(("norms", t1, time.time()))
+    return {"norms": norms, "score": float(score), "latest_raw": norms["raw"]}
+
 
-    out = {}
-    for label, raw in (("1h", ohlcv_1h), ("1d", ohlcv_1d)):
-        if not raw or len(raw) == 0:
-            out[label] = {"error": "no data", "score": 0.0}
-            continue
-        df = ohlcv_to_df(raw)
-        df_ind = compute_indicators(df)
-        if df_ind.empty:
-            out[label] = {"error": "insufficient data after indicators", "score": 0.0}
-            continue
-        latest = df_ind.iloc[-1]
-        norms = compute_norms_from_indicator_df(latest, norm_params)
-        score = compute_simple_score(norms, weights)
-        out[label] = {"norms": norms, "score": float(score), "latest_raw": norms["raw"]}
-    return out
+def compute_scores_from_ohlcv(ohlcv_1h, ohlcv_1d, weights=None, norm_params=None, backend=None):
+    return {label: score_timeframe(raw, weights, norm_params, backend)
+            for label, raw in (("1h", ohlcv_1h), ("1d", ohlcv_1d))}
@@ -0,0 +1,198 @@
+# scanner/scoring_pool.py
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple
+import numpy as np
+from loguru import logger
+from services.scanner.src.metrics import SCORING_LATENCY, SYMBOLS_SCORED
+from services.scanner.src.prefilter import cutoff_failure
+from services.scanner.src.score_cache import SCORE_CACHE_SIZE, ScoreCache
+from services.scanner.src.settings import norm_config, weights_config
+from services.scanner.src.scoring import compute_scores_from_ohlcv, latest_indicators, parse_candles, score_timeframe
+
+# 0 = pas de processus: le scoring tourne dans un thread (hors de la boucle asyncio)
+SCORING_WORKERS = int(os.getenv("SCORING_WORKERS", os.cpu_count() or 1))
+SCORING_CHUNK = int(os.getenv("SCORING_CHUNK", 16))  # symboles par tâche envoyée à un worker
+
+ScoreItem = Tuple[str, Optional[np.ndarray], Optional[np.ndarray]]  # (symbol, candles 1h, candles 1d), None = en cache
+LABELS = ("1h", "1d")
+
+
+def _init_worker():
+    # compile/charge les noyaux numba une fois par processus plutôt qu'au premier symbole
+    rows = [[str(i), "1", "1", "1", "1", "1"] for i in range(60)]
+    compute_scores_from_ohlcv(rows, rows)
+
+
+def _score_chunk(items: Sequence[ScoreItem], weights: Optional[dict], norm_params: Optional[dict],
+                 backend: Optional[str], traced: FrozenSet[str] = frozenset()
+                 ) -> List[Tuple[str, Optional[dict], Optional[str], Optional[list]]]:
+    """(symbole, résumé, erreur, spans); spans [(étape, label, t0, t1)] pour les symboles de `traced` seulement."""
+    out = []
+    for symbol, c1h, c1d in items:
+        spans = [] if symbol in traced else None
+        try:
+            summary = {}
+            for label, c in zip(LABELS, (c1h, c1d)):
+                if c is None:
+                    continue
+                tf_spans = [] if spans is not None else None
+                summary[label] = score_timeframe(c, weights, norm_params, backend, tf_spans)
+                if tf_spans:
+                    spans += [(name, label, t0, t1) for name, t0, t1 in tf_spans]
+            out.append((symbol, summary, None, spans))
+        except Exception as e:
+            out.append((symbol, None, f"scoring error: {e}", spans))
+    return out
+
+
+def _cutoff_chunk(items: Sequence[Tuple[str, np.ndarray]], cutoffs: dict,
+                  backend: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    out = []
+    for symbol, candles in items:
+        try:
+            out.append((symbol, cutoff_failure(latest_indicators(candles, backend), cutoffs)))
+        except Exception as e:
+            out.append((symbol, f"scoring error: {e}"))
+    return out
+
+
+class ScoringPool:
+    """
+    Etape de scoring hors boucle asyncio: les bougies (tableaux CANDLE_DTYPE)
+    partent par paquets de `chunk_size` symboles vers des processus persistants
+    et reviennent sous forme de résumés (format compute_scores_from_ohlcv).
+    Les unités de temps dont les bougies n'ont pas changé sont servies par le
+    ScoreCache sans passer par les processus.
+    """
+
+    def __init__(self, workers: int = SCORING_WORKERS, chunk_size: int = SCORING_CHUNK,
+                 weights: Optional[dict] = None, norm_params: Optional[dict] = None, backend: Optional[str] = None,
+                 cache: Optional[ScoreCache] = None):
+        # weights/norm_params/backend sont fixes pour la vie du pool: ils n'ont pas à entrer dans la clé du cache
+        self.cache = cache if cache is not None else (ScoreCache() if SCORE_CACHE_SIZE > 0 else None)
+        self.workers = workers
+        self.chunk_size = max(1, chunk_size)
+        # par défaut ceux de config.yaml (scoring_weights / norm_params), sinon ceux du code
+        self.weights = weights if weights is not None else (weights_config() or None)
+        self.norm_params = norm_params if norm_params is not None else (norm_config() or None)
+        self.backend = backend
+        self._executor: Optional[Executor] = None
+
+    def _get_executor(self) -> Optional[Executor]:
+        if self.workers <= 0:
+            return None
+        if self._executor is None:
+            # spawn: pas de fork d'un processus qui a déjà une boucle asyncio, des sockets et des threads
+            self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                 mp_context=multiprocessing.get_context("spawn"),
+                                                 initializer=_init_worker)
+        return self._executor
+
+    async def _map(self, fn, items: list, *args) -> List[Tuple[list, object]]:
+        """fn(paquet, *args) pour chaque paquet de `items`, dans le pool: [(paquet, résultat ou exception)]."""
+        chunks = [items[i:i + self.chunk_size] for i in range(0, len(items), self.chunk_size)]
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        if executor is None:
+            futures = [asyncio.to_thread(fn, chunk, *args) for chunk in chunks]
+        else:
+            futures = [loop.run_in_executor(executor, fn, chunk, *args) for chunk in chunks]
+        out = list(zip(chunks, await asyncio.gather(*futures, return_exceptions=True)))
+        for _, res in out:
+            if isinstance(res, BrokenProcessPool):
+                logger.error("scoring pool broken, restarting it: {}", res)
+                self.close()
+                break
+        return out
+
+    async def score_many(self, items: Sequence[Tuple[str, list, list]],
+                         tracer=None) -> Dict[str, Tuple[Optional[dict], Optional[str]]]:
+        """
+        {symbol: (summary, error)} pour chaque (symbol, candles_1h, candles_1d).
+        `tracer` (SweepTracer): spans parse / indicators / norms des symboles échantillonnés.
+        """
+        if not items:
+            return {}
+        t0 = time.perf_counter()
+        traced = frozenset(s for s, _, _ in items if tracer is not None and tracer.sampled(s))
+        # décodage dans le processus principal: des tableaux typés se sérialisent bien mieux que des listes de str
+        if traced:
+            parsed = []
+            for s, c1h, c1d in items:
+                with tracer.span(s, "parse"):
+                    parsed.append((s, parse_candles(c1h), parse_candles(c1d)))
+            items = parsed
+        else:
+            items = [(s, parse_candles(c1h), parse_candles(c1d)) for s, c1h, c1d in items]
+
+        out = {}
+        cached = {}  # symbol -> {label: résumé en cache}
+        keys = {}    # (symbol, label) -> clé à remplir après calcul
+        todo = []
+        for symbol, c1h, c1d in items:
+            if self.cache is None:
+                todo.append((symbol, c1h, c1d))
+                continue
+            hits, missing = {}, []
+            for label, c in zip(LABELS, (c1h, c1d)):
+                key, c = self.cache.key(symbol, label, c)
+                hit = self.cache.get(key)
+                if hit is None:
+                    keys[(symbol, label)] = key
+                    missing.append(c)
+                else:
+                    hits[label] = hit
+                    missing.append(None)
+                    if symbol in traced:
+                        tracer.instant(symbol, "score cache hit", time.time(), timeframe=label)
+            cached[symbol] = hits
+            if len(hits) < len(LABELS):
+                todo.append((symbol, *missing))
+            else:
+                out[symbol] = ({label: hits[label] for label in LABELS}, None)
+
+        for chunk, res in await self._map(_score_chunk, todo, self.weights, self.norm_params, self.backend, traced):
+            if isinstance(res, BaseException):
+                for symbol, _, _ in chunk:
+                    out[symbol] = (None, f"scoring error: {res}")
+                continue
+            for symbol, summary, err, spans in res:
+                for name, label, s0, s1 in spans or ():
+                    tracer.add(symbol, name, s0, s1, timeframe=label)
+                if err is not None:
+                    out[symbol] = (None, err)
+                    continue
+                if self.cache is not None:
+                    for label, tf_summary in summary.items():
+                        self.cache.put(keys[(symbol, label)], tf_summary)
+                    summary = {**cached[symbol], **summary}
+                out[symbol] = ({label: summary[label] for label in LABELS}, None)
+        SCORING_LATENCY.observe(time.perf_counter() - t0)
+        errors = sum(1 for _, err in out.values() if err is not None)
+        SYMBOLS_SCORED.labels("ok").inc(len(out) - errors)
+        SYMBOLS_SCORED.labels("error").inc(errors)
+        return out
+
+    async def check_cutoffs(self, items: Sequence[Tuple[str, list]], cutoffs: dict) -> Dict[str, Optional[str]]:
+        """{symbol: raison du cutoff raté ou None} sur la dernière barre complète de chaque (symbol, candles)."""
+        if not items:
+            return {}
+        items = [(s, parse_candles(c)) for s, c in items]
+        out = {}
+        for chunk, res in await self._map(_cutoff_chunk, items, cutoffs, self.backend):
+            if isinstance(res, BaseException):
+                for symbol, _ in chunk:
+                    out[symbol] = f"scoring error: {res}"
+                continue
+            out.update(res)
+        return out
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
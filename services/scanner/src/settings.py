@@ -0,0 +1,48 @@
+# scanner/settings.py
+import os
+import sys
+from functools import lru_cache
+from loguru import logger
+
+try:
+    import yaml
+except ImportError:  # PyYAML optionnel: sans lui, valeurs par défaut du code
+    yaml = None
+
+CONFIG_FILE = os.getenv("CONFIG_FILE", "./config/config.yaml")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")  # DEBUG: une ligne par batch (étapes, débit, round trips redis)
+LOG_JSON = os.getenv("LOG_JSON", "0") == "1"  # une ligne JSON par log, champs structurés dans record.extra
+
+
+def setup_logging(level: str = LOG_LEVEL, json_lines: bool = LOG_JSON):
+    """Sink loguru unique sur stderr; en dessous de `level` un appel logger.debug ne formate rien."""
+    logger.remove()
+    logger.add(sys.stderr, level=level.upper(), serialize=json_lines, enqueue=False, backtrace=False)
+
+
+@lru_cache(maxsize=None)
+def load_config(path: str = CONFIG_FILE) -> dict:
+    """config.yaml en dict ({} si absent ou illisible)."""
+    if yaml is None:
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8-sig") as f:
+            return yaml.safe_load(f) or {}
+    except FileNotFoundError:
+        return {}
+    except Exception as e:
+        logger.warning("config {} unreadable: {}", path, e)
+        return {}
+
+
+def scan_config(path: str = CONFIG_FILE) -> dict:
+    return load_config(path).get("scan") or {}
+
+
+def weights_config(path: str = CONFIG_FILE) -> dict:
+    return load_config(path).get("scoring_weights") or {}
+
+
+def norm_config(path: str = CONFIG_FILE) -> dict:
+    # volume_ratio_cap / atr_pct_cap / adx_cap de compute_norms_from_indicator_df
+    return load_config(path).get("norm_params") or {}
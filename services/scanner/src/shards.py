@@ -0,0 +1,274 @@
+# scanner/shards.py
+"""
+Partage de l'univers entre plusieurs scanners.
+
+Chaque symbole appartient à un shard fixe (hash blake2b du symbole % n_shards). Un
+shard est scanné par le worker qui détient son bail redis
+bot:shard:lease:<i> (SET NX PX, valeur = id du worker). Toutes les
+`heartbeat` secondes chaque worker:
+- s'inscrit dans bot:shard:workers (ZSET id -> dernier battement) et en retire
+  les workers muets depuis plus de `lease_ttl`;
+- renouvelle ses baux (un bail perdu n'est plus scanné);
+- vise ceil(n_shards / workers vivants) shards: il rend ceux en trop (un
+  nouveau worker les récupère au battement suivant) et prend des shards
+  libres s'il en manque, y compris ceux d'un worker mort dont le bail a expiré.
+
+Ce que les replicas partagent passe aussi par redis: le budget de requêtes
+Bitget (20 req/s par IP, SharedTokenBucket) et la génération de sweep, qui
+n'avance que quand tous les shards ont fini un passage (ShardLeases.pass_done).
+"""
+import asyncio
+import hashlib
+import math
+import os
+import socket
+import time
+import zlib
+from typing import Callable, List, Optional, Sequence, Set
+from loguru import logger
+
+SCAN_SHARDS = int(os.getenv("SCAN_SHARDS", 0))  # 0 = un seul scanner, pas de baux
+SHARD_LEASE_TTL = float(os.getenv("SHARD_LEASE_TTL", 30))  # secondes
+SHARD_HEARTBEAT = float(os.getenv("SHARD_HEARTBEAT", 10))  # secondes, << SHARD_LEASE_TTL
+SHARD_LEASE_PREFIX = "bot:shard:lease:"  # bot:shard:lease:<i> -> worker id
+SHARD_WORKERS_KEY = "bot:shard:workers"  # ZSET worker id -> last heartbeat (unix s)
+SHARD_OWNED_PREFIX = "bot:shard:owned:"  # bot:shard:owned:<worker id> -> "0,3,7" (pour /status)
+SHARD_PASSES_KEY = "bot:shard:passes"  # SET des shards qui ont fini un passage depuis le dernier sweep
+SHARED_RATE_KEY = "bot:shard:rate:market"  # HASH tokens/ts du seau de requêtes commun aux replicas
+
+# renouvelle les baux encore à nous; renvoie 1/0 par clé
+_RENEW = """
+local out = {}
+for i, key in ipairs(KEYS) do
+  if redis.call('GET', key) == ARGV[1] then
+    redis.call('PEXPIRE', key, ARGV[2])
+    out[i] = 1
+  else
+    out[i] = 0
+  end
+end
+return out
+"""
+# prend au plus ARGV[3] baux libres, dans l'ordre des clés; renvoie les index (1-based) obtenus
+_CLAIM = """
+local got = {}
+local want = tonumber(ARGV[3])
+for i, key in ipairs(KEYS) do
+  if #got >= want then break end
+  if redis.call('SET', key, ARGV[1], 'NX', 'PX', ARGV[2]) then
+    got[#got + 1] = i
+  end
+end
+return got
+"""
+# rend les baux encore à nous
+_RELEASE = """
+local n = 0
+for _, key in ipairs(KEYS) do
+  if redis.call('GET', key) == ARGV[1] then
+    redis.call('DEL', key)
+    n = n + 1
+  end
+end
+return n
+"""
+# note les shards qui viennent de finir un passage; quand tous l'ont fait, vide le SET et incrémente
+# la génération de sweep (renvoyée), sinon 0. ARGV[1] = n_shards, ARGV[2..] = shards
+_PASS_DONE = """
+local n = tonumber(ARGV[1])
+for i = 2, #ARGV do
+  redis.call('SADD', KEYS[1], ARGV[i])
+end
+local done = 0
+for _, shard in ipairs(redis.call('SMEMBERS', KEYS[1])) do
+  if tonumber(shard) < n then done = done + 1 end
+end
+if done >= n then
+  redis.call('DEL', KEYS[1])
+  return redis.call('INCR', KEYS[2])
+end
+return 0
+"""
+# seau de jetons réservé: prend ARGV[3] jetons quitte à passer en négatif et renvoie l'attente (ms)
+# avant de pouvoir s'en servir. Un appel par requête, pas de nouvel essai: les replicas sont servis
+# dans l'ordre d'arrivée. Horloge = TIME du serveur redis (pas celle des replicas).
+_TAKE = """
+local rate = tonumber(ARGV[1])
+local cap = tonumber(ARGV[2])
+local want = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or now
+tokens = math.min(cap, tokens + math.max(0, now - ts) * rate / 1000) - want
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((cap - tokens) * 1000 / rate) + 1000)
+if tokens >= 0 then return 0 end
+return math.ceil(-tokens * 1000 / rate)
+"""
+
+
+def shard_of(symbol: str, n_shards: int) -> int:
+    # stable d'un process à l'autre (contrairement à hash()); crc32 répartit mal des noms presque identiques
+    return int.from_bytes(hashlib.blake2b(symbol.encode(), digest_size=8).digest(), "big") % n_shards
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class ShardLeases:
+    def __init__(self, r, n_shards: int = SCAN_SHARDS, worker_id: Optional[str] = None,
+                 lease_ttl: float = SHARD_LEASE_TTL, heartbeat: float = SHARD_HEARTBEAT,
+                 on_change: Optional[Callable[[Set[int]], None]] = None):
+        if n_shards <= 0:
+            raise ValueError("n_shards must be > 0")
+        self.r = r
+        self.n_shards = n_shards
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_ttl = lease_ttl
+        self.heartbeat = heartbeat
+        self.on_change = on_change
+        self.owned: Set[int] = set()
+        self._rr = 0
+        self._task: Optional[asyncio.Task] = None
+        self._renew = r.register_script(_RENEW)
+        self._claim = r.register_script(_CLAIM)
+        self._release = r.register_script(_RELEASE)
+        self._pass_done = r.register_script(_PASS_DONE)
+        # ordre de prise propre à chaque worker: deux workers qui démarrent ensemble ne se disputent pas les mêmes shards
+        start = zlib.crc32(self.worker_id.encode()) % n_shards
+        self._claim_order = [(start + i) % n_shards for i in range(n_shards)]
+
+    def _key(self, shard: int) -> str:
+        return f"{SHARD_LEASE_PREFIX}{shard}"
+
+    def owns(self, symbol: str) -> bool:
+        return shard_of(symbol, self.n_shards) in self.owned
+
+    def filter(self, symbols: Sequence[str]) -> List[str]:
+        return [s for s in symbols if self.owns(s)]
+
+    def next_shard(self) -> Optional[int]:
+        """Shards détenus à tour de rôle (rotation round-robin par shard)."""
+        owned = sorted(self.owned)
+        if not owned:
+            return None
+        self._rr = (self._rr + 1) % len(owned)
+        return owned[self._rr]
+
+    async def beat(self) -> Set[int]:
+        """Un battement: inscription, renouvellement, rééquilibrage. Renvoie les shards détenus."""
+        now = time.time()
+        ttl_ms = int(self.lease_ttl * 1000)
+        async with self.r.pipeline(transaction=True) as pipe:
+            pipe.zadd(SHARD_WORKERS_KEY, {self.worker_id: now})
+            pipe.zremrangebyscore(SHARD_WORKERS_KEY, "-inf", now - self.lease_ttl)
+            pipe.zcard(SHARD_WORKERS_KEY)
+            _, _, live = await pipe.execute()
+        target = math.ceil(self.n_shards / max(1, int(live)))
+
+        owned = sorted(self.owned)
+        if owned:
+            kept = await self._renew(keys=[self._key(s) for s in owned], args=[self.worker_id, ttl_ms])
+            lost = {s for s, ok in zip(owned, kept) if not int(ok)}
+            if lost:
+                logger.warning("shard leases lost: {}", sorted(lost))
+            owned = [s for s in owned if s not in lost]
+
+        if len(owned) > target:
+            extra = owned[target:]
+            await self._release(keys=[self._key(s) for s in extra], args=[self.worker_id])
+            owned = owned[:target]
+        elif len(owned) < target:
+            free = [s for s in self._claim_order if s not in owned]
+            got = await self._claim(keys=[self._key(s) for s in free],
+                                    args=[self.worker_id, ttl_ms, target - len(owned)])
+            owned += [free[int(i) - 1] for i in got]
+
+        new = set(owned)
+        await self.r.set(SHARD_OWNED_PREFIX + self.worker_id, ",".join(map(str, sorted(new))),
+                         ex=max(1, int(self.lease_ttl)))
+        if new != self.owned:
+            logger.info("shards {} -> {} ({} live workers, target {})",
+                        sorted(self.owned), sorted(new), live, target)
+            self.owned = new
+            if self.on_change is not None:
+                res = self.on_change(new)
+                if asyncio.iscoroutine(res):
+                    await res
+        return self.owned
+
+    async def pass_done(self, shards, gen_key: str) -> int:
+        """
+        Les `shards` viennent de finir un passage; nouvelle génération de sweep
+        (INCR de `gen_key`) si c'étaient les derniers, sinon 0.
+        """
+        if not shards:
+            return 0
+        return int(await self._pass_done(keys=[SHARD_PASSES_KEY, gen_key],
+                                         args=[self.n_shards] + sorted(int(s) for s in shards)))
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            try:
+                await self.beat()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # redis injoignable: les baux expirent d'eux-mêmes et seront repris ailleurs
+                logger.warning("shard heartbeat failed: {}", e)
+
+    async def start(self):
+        await self.beat()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        try:
+            if self.owned:
+                await self._release(keys=[self._key(s) for s in self.owned], args=[self.worker_id])
+            await self.r.zrem(SHARD_WORKERS_KEY, self.worker_id)
+            await self.r.delete(SHARD_OWNED_PREFIX + self.worker_id)
+        except Exception as e:
+            logger.warning("shard release failed: {}", e)
+        self.owned = set()
+
+
+class SharedTokenBucket:
+    """
+    Seau de jetons dans redis, même interface que ratelimit.TokenBucket: le
+    débit (ex. 18 req/s) vaut pour l'ensemble des replicas qui partagent `key`
+    et non pour chacun. Redis injoignable: repli sur `fallback` (seau local)
+    jusqu'au retour de redis.
+    """
+
+    def __init__(self, r, fallback, key: str = SHARED_RATE_KEY):
+        self.r = r
+        self.fallback = fallback
+        self.rate = fallback.rate
+        self.capacity = fallback.capacity
+        self.key = key
+        self._take = r.register_script(_TAKE)
+        self._degraded = False
+
+    async def acquire(self, tokens: float = 1.0):
+        try:
+            wait_ms = int(await self._take(keys=[self.key], args=[self.rate, self.capacity, tokens]))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not self._degraded:
+                self._degraded = True
+                logger.warning("shared rate limit unavailable, using the local bucket: {}", e)
+            return await self.fallback.acquire(tokens)
+        if self._degraded:
+            self._degraded = False
+            logger.info("shared rate limit back")
+        if wait_ms > 0:
+            await asyncio.sleep(wait_ms / 1000)
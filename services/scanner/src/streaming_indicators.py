@@ -0,0 +1,309 @@
+# scanner/streaming_indicators.py
+"""
+Etat d'indicateurs incrémental par symbole (ATR/RSI/ADX/SMA/vol MA).
+
+Reproduit scoring.compute_indicators (pandas_ta 0.4, sans TA-Lib) mais met à
+jour en O(1) à chaque nouvelle bougie au lieu de tout recalculer:
+- ATR: true range, moyenne simple des 14 premiers TR puis lissage de Wilder
+- RSI: lissage de Wilder (ewm adjust=False) des hausses/baisses
+- ADX: +DM/-DM lissés, DX puis ADX lissés (Wilder)
+- SMA20/50 et moyenne du volume sur 20: sommes glissantes
+
+Sur la même série de bougies, latest() donne la dernière ligne de
+compute_indicators(ohlcv_to_df(rows)). La dernière bougie fournie est
+considérée "en cours": elle est recalculée à chaque push() tant que son
+timestamp ne change pas, et n'est intégrée à l'état qu'à l'arrivée de la
+suivante.
+"""
+import math
+import sys
+from collections import deque
+from typing import Optional
+
+from services.scanner.src.scoring import DEFAULT_WEIGHTS, compute_norms_from_indicator_df, compute_simple_score
+
+NAN = float("nan")
+LENGTH = 14
+# toutes les RESYNC_EVERY bougies clôturées, les sommes glissantes sont recalculées exactement (dérive flottante)
+RESYNC_EVERY = 1000
+EPS = sys.float_info.epsilon
+
+
+def _isnan(x) -> bool:
+    return x != x
+
+
+def _has_nan(row: dict) -> bool:
+    return any(_isnan(x) for x in row.values())
+
+
+def _div(a: float, b: float) -> float:
+    # comme numpy (x/0 -> ±inf, 0/0 -> nan) plutôt que ZeroDivisionError
+    if b == 0:
+        if a == 0 or _isnan(a):
+            return NAN
+        return math.copysign(math.inf, a) * (math.copysign(1.0, b))
+    return a / b
+
+
+def _mul(a: float, b: float) -> float:
+    # inf * 0 -> nan, comme numpy
+    if (math.isinf(a) and b == 0) or (math.isinf(b) and a == 0):
+        return NAN
+    return a * b
+
+
+class _Ewm:
+    """pandas `ewm(alpha, adjust=False).mean()` valeur par valeur, trous NaN compris."""
+
+    __slots__ = ("alpha", "value", "old_wt")
+
+    def __init__(self, alpha: float):
+        self.alpha = alpha
+        self.value = NAN
+        self.old_wt = 1.0
+
+    def _next(self, x: float):
+        if _isnan(self.value):
+            return (x, 1.0) if not _isnan(x) else (NAN, 1.0)
+        old_wt = self.old_wt * (1.0 - self.alpha)
+        if _isnan(x):
+            return self.value, old_wt
+        return (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha), 1.0
+
+    def peek(self, x: float) -> float:
+        return self._next(x)[0]
+
+    def push(self, x: float) -> float:
+        self.value, self.old_wt = self._next(x)
+        return self.value
+
+
+class _PresmaRma:
+    """Lissage de l'ATR pandas_ta: NaN pendant `length` valeurs, puis leur moyenne amorce une RMA de Wilder."""
+
+    __slots__ = ("length", "seen", "seed", "ewm")
+
+    def __init__(self, length: int):
+        self.length = length
+        self.seen = 0
+        self.seed = []
+        self.ewm = _Ewm(1.0 / length)
+
+    def _seed_mean(self, x: float) -> float:
+        vals = [v for v in self.seed + [x] if not _isnan(v)]
+        return sum(vals) / len(vals) if vals else NAN
+
+    def peek(self, x: float) -> float:
+        if self.seen < self.length - 1:
+            return NAN
+        if self.seen == self.length - 1:
+            return self.ewm.peek(self._seed_mean(x))
+        return self.ewm.peek(x)
+
+    def push(self, x: float) -> float:
+        if self.seen < self.length - 1:
+            self.seed.append(x)
+            out = NAN
+        elif self.seen == self.length - 1:
+            out = self.ewm.push(self._seed_mean(x))
+            self.seed = []
+        else:
+            out = self.ewm.push(x)
+        self.seen += 1
+        return out
+
+
+class _RollingMean:
+    """Moyenne glissante sur `n` valeurs (NaN tant que la fenêtre n'est pas pleine)."""
+
+    __slots__ = ("n", "window", "total", "pushes")
+
+    def __init__(self, n: int):
+        self.n = n
+        self.window = deque(maxlen=n)
+        self.total = 0.0
+        self.pushes = 0
+
+    def peek(self, x: float) -> float:
+        if len(self.window) + 1 < self.n:
+            return NAN
+        drop = self.window[0] if len(self.window) == self.n else 0.0
+        return (self.total + x - drop) / self.n
+
+    def push(self, x: float) -> float:
+        out = self.peek(x)
+        if len(self.window) == self.n:
+            self.total -= self.window[0]
+        self.window.append(x)
+        self.total += x
+        self.pushes += 1
+        if self.pushes % RESYNC_EVERY == 0:
+            self.total = math.fsum(self.window)
+        return out
+
+
+class IndicatorState:
+    """
+    Etat incrémental des indicateurs de compute_indicators pour une série
+    (un symbole, une granularité).
+    """
+
+    def __init__(self):
+        self.atr = _PresmaRma(LENGTH)         # ATR (prenan=False)
+        self.adx_atr = _PresmaRma(LENGTH)     # ATR interne de l'ADX (prenan=True)
+        self.rsi_pos = _Ewm(1.0 / LENGTH)
+        self.rsi_neg = _Ewm(1.0 / LENGTH)
+        self.dm_pos = _Ewm(1.0 / LENGTH)
+        self.dm_neg = _Ewm(1.0 / LENGTH)
+        self.adx = _Ewm(1.0 / LENGTH)
+        self.ma20 = _RollingMean(20)
+        self.ma50 = _RollingMean(50)
+        self.vol_ma20 = _RollingMean(20)
+        self.prev = None                      # dernière bougie clôturée (ts, o, h, l, c, v)
+        self.pending = None                   # bougie en cours
+        self.bars = 0                         # bougies clôturées intégrées
+        self.flat = False                     # une bougie high == low déjà vue (eps de pandas_ta)
+        self._latest = None
+        self._last_valid = None               # dernière ligne clôturée sans NaN
+
+    @classmethod
+    def from_rows(cls, rows) -> "IndicatorState":
+        """Amorce l'état à partir de lignes Bitget (ordre chronologique)."""
+        st = cls()
+        for row in sorted(rows, key=lambda x: int(x[0])):
+            st.push_row(row)
+        return st
+
+    def push_row(self, row) -> Optional[dict]:
+        # Bitget: ts, open, high, low, close, baseVolume, ...
+        return self.push(int(row[0]), float(row[1]), float(row[2]), float(row[3]), float(row[4]), float(row[5]))
+
+    def catch_up(self, rows) -> bool:
+        """
+        Pousse les lignes Bitget (ordre chronologique, ex. CandleStore.rows) à partir
+        de la bougie en cours: O(bougies nouvelles), pas O(len(rows)). False si
+        `rows` commence après la bougie en cours (trou plus long que le buffer):
+        l'état est alors à reconstruire avec from_rows.
+        """
+        if not rows:
+            return True
+        if self.pending is None:
+            for row in rows:
+                self.push_row(row)
+            return True
+        ts = self.pending[0]
+        if int(rows[0][0]) > ts:
+            return False
+        i = len(rows)
+        while i > 0 and int(rows[i - 1][0]) >= ts:
+            i -= 1
+        for row in rows[i:]:
+            self.push_row(row)
+        return True
+
+    def push(self, ts: int, open_: float, high: float, low: float, close: float, volume: float) -> Optional[dict]:
+        """
+        Ajoute/actualise une bougie. Un timestamp égal à celui de la bougie en
+        cours la remplace; un timestamp plus récent clôture la précédente.
+        """
+        bar = (ts, open_, high, low, close, volume)
+        if self.pending is not None:
+            if ts < self.pending[0]:
+                return self._latest
+            if ts > self.pending[0]:
+                self._step(self.pending, commit=True)
+        self.pending = bar
+        self._latest = self._step(bar, commit=False)
+        return self._latest
+
+    def _step(self, bar, commit: bool) -> dict:
+        ts, o, h, l, c, v = bar
+        op = "push" if commit else "peek"
+        prev = self.prev
+
+        # pandas_ta non_zero_range: eps ajouté à tout high - low dès qu'une bougie est plate.
+        # Ici seulement à partir de la première bougie plate: l'écart sur les barres d'avant est de l'ordre d'eps
+        flat = self.flat or h == l
+        hl = h - l + EPS if flat else h - l
+        if prev is None:
+            tr = abs(hl)
+            up = dn = diff = NAN
+        else:
+            pc = prev[4]
+            tr = max(abs(hl), abs(h - pc), abs(pc - l))
+            up = h - prev[2]
+            dn = prev[3] - l
+            diff = c - pc
+
+        atr = getattr(self.atr, op)(tr)
+        adx_atr = getattr(self.adx_atr, op)(NAN if prev is None else tr)
+
+        # RSI
+        pos = diff if _isnan(diff) else max(diff, 0.0)
+        neg = diff if _isnan(diff) else min(diff, 0.0)
+        avg_pos = getattr(self.rsi_pos, op)(pos)
+        avg_neg = getattr(self.rsi_neg, op)(neg)
+        rsi = _div(100.0 * avg_pos, avg_pos + abs(avg_neg))
+
+        # ADX
+        if _isnan(up):
+            pdm = ndm = NAN
+        else:
+            pdm = up if (up > dn and up > 0) else 0.0
+            ndm = dn if (dn > up and dn > 0) else 0.0
+            # zero() de pandas_ta: à moins d'eps de 0, la valeur vaut 0
+            pdm = 0.0 if abs(pdm) < EPS else pdm
+            ndm = 0.0 if abs(ndm) < EPS else ndm
+        k = _div(100.0, adx_atr)
+        dmp = _mul(k, getattr(self.dm_pos, op)(pdm))
+        dmn = _mul(k, getattr(self.dm_neg, op)(ndm))
+        dx = _div(100.0 * abs(dmp - dmn), dmp + dmn) if not (_isnan(dmp) or _isnan(dmn)) else NAN
+        adx = getattr(self.adx, op)(dx)
+
+        ma20 = getattr(self.ma20, op)(c)
+        ma50 = getattr(self.ma50, op)(c)
+        vol_ma20 = getattr(self.vol_ma20, op)(v)
+
+        row = {
+            "timestamp": ts,
+            "open": o,
+            "high": h,
+            "low": l,
+            "close": c,
+            "volume": v,
+            "atr": atr,
+            "atr_pct": _div(atr, c),
+            "rsi": rsi,
+            "adx": adx,
+            "ma20": ma20,
+            "ma50": ma50,
+            "vol_ma20": vol_ma20,
+            "vol_spike_ratio": _div(v, vol_ma20),
+        }
+        if commit:
+            self.prev = bar
+            self.flat = flat
+            self.bars += 1
+            if not _has_nan(row):
+                self._last_valid = row
+        return row
+
+    def latest(self) -> Optional[dict]:
+        """Dernière ligne d'indicateurs sans NaN (comme iloc[-1] après dropna), ou None."""
+        row = self._latest
+        if row is None or _has_nan(row):
+            return self._last_valid
+        return row
+
+
+def score_latest(state: IndicatorState, weights: dict = None, norm_params: dict = None) -> dict:
+    """Même forme que compute_scores_from_ohlcv(...)[label], depuis l'état incrémental."""
+    latest = state.latest()
+    if latest is None:
+        if state.pending is None:
+            return {"error": "no data", "score": 0.0}
+        return {"error": "insufficient data after indicators", "score": 0.0}
+    norms = compute_norms_from_indicator_df(latest, norm_params or {})
+    score = compute_simple_score(norms, weights or DEFAULT_WEIGHTS)
+    return {"norms": norms, "score": float(score), "latest_raw": norms["raw"]}
@@ -0,0 +1,236 @@
+# scanner/sweep.py
+"""
+Recherche de scoring_weights / norm_params / seuil d'alerte sur l'historique.
+
+1. Une seule fois par symbole: indicateurs (ta_kernels) sur toute l'archive,
+   puis, pour chaque barre complète, les entrées brutes des normes
+   (volume, vol_ma20, atr_pct, vol_spike_ratio, adx, rsi) et les rendements
+   forward aux horizons demandés.
+2. Pour chaque combinaison de caps (volume_ratio_cap x atr_pct_cap x adx_cap),
+   dans un pool de processus: normes [barres, 5] (compute_norms_batch), puis
+   scores de toutes les pondérations d'un coup = normes @ poids[5, K], par
+   blocs de barres, en float32. Les scores à moins de SCORE_TOL d'un seuil
+   sont recalculés en float64 dans l'ordre de compute_simple_score: la
+   décision score >= seuil est celle du scoring en direct. Les alertes de
+   chaque combinaison sont agrégées par produit matriciel avec les
+   rendements forward.
+3. Classement par métrique (t-stat, moyenne ou taux de réussite du rendement
+   forward des alertes, avec un minimum d'alertes) et sortie d'un extrait
+   config.yaml.
+
+Les pondérations parcourent le simplexe (somme = 1) avec un pas donné:
+pas 0.05 -> 10 626 vecteurs.
+"""
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence
+import numpy as np
+
+from services.scanner.src.backtest import forward_returns, stack_candles
+from services.scanner.src.batch_scoring import WEIGHT_TERMS, compute_indicators_batch, compute_norms_batch
+from services.scanner.src.scoring import parse_candles
+
+SWEEP_WORKERS = int(os.getenv("SWEEP_WORKERS", os.cpu_count() or 1))
+SWEEP_BLOCK = int(os.getenv("SWEEP_BLOCK", 256))  # barres par produit matriciel: le masque bloc x K doit tenir en cache
+# erreur max du score float32 (5 termes dans [0, 1], poids de somme 1: ~1e-6); au-delà le float32 décide seul
+SCORE_TOL = 1e-5
+FEATURE_KEYS = ("volume", "vol_ma20", "atr_pct", "vol_spike_ratio", "adx", "rsi")
+DEFAULT_CAPS = {
+    "volume_ratio_cap": (2.0, 3.0, 4.0),
+    "atr_pct_cap": (0.03, 0.05, 0.08),
+    "adx_cap": (30.0, 40.0, 50.0),
+}
+METRICS = ("tstat", "mean", "hit")
+
+
+def weight_grid(step: float = 0.05, n: int = len(WEIGHT_TERMS)) -> np.ndarray:
+    """Tous les vecteurs de n poids >= 0, multiples de `step`, de somme 1: tableau [K, n]."""
+    units = int(round(1.0 / step))
+    out = []
+    # compositions de `units` en n parts (étoiles et barres)
+    for bars in itertools.combinations(range(units + n - 1), n - 1):
+        parts = np.diff((-1,) + bars + (units + n - 1,)) - 1
+        out.append(parts)
+    return np.asarray(out, dtype=np.float64) / units
+
+
+def extract_features(candles_by_symbol: Dict[str, np.ndarray], horizons: Sequence[int],
+                     backend: str = "numba", chunk: int = 64) -> dict:
+    """Entrées des normes et rendements forward de chaque barre complète, tous symboles concaténés."""
+    feats = {k: [] for k in FEATURE_KEYS}
+    fwd = {h: [] for h in horizons}
+    symbols = list(candles_by_symbol)
+    for i in range(0, len(symbols), chunk):
+        ohlcv = stack_candles([parse_candles(candles_by_symbol[s]) for s in symbols[i:i + chunk]])
+        ind = compute_indicators_batch(ohlcv, backend)
+        complete = np.ones(ohlcv.shape[:2], dtype=bool)
+        for v in ind.values():
+            complete &= ~np.isnan(v)
+        for k in FEATURE_KEYS:
+            feats[k].append(ind[k][complete])
+        for h in horizons:
+            fwd[h].append(forward_returns(ohlcv[..., 3], h)[complete])
+    out = {k: np.concatenate(v) if v else np.empty(0) for k, v in feats.items()}
+    out["fwd"] = {h: np.concatenate(v) if v else np.empty(0) for h, v in fwd.items()}
+    return out
+
+
+_features: Optional[dict] = None
+
+
+def _init_worker(features: dict):
+    global _features
+    _features = features
+
+
+def _eval_caps(caps: dict, weights: np.ndarray, thresholds: Sequence[float], block: int,
+               features: Optional[dict] = None) -> dict:
+    """
+    Pour une combinaison de caps: {"n", "sum", "sumsq", "pos"} de forme [horizons, seuils, K]
+    (alertes, somme / somme des carrés / nb > 0 des rendements forward des alertes).
+    """
+    f = features if features is not None else _features
+    norms = compute_norms_batch(f, caps)
+    X64 = np.stack([norms[norm] for _, _, norm in WEIGHT_TERMS], axis=-1)
+    W64 = np.asarray(weights, dtype=np.float64).T  # [5, K]
+    X, W = X64.astype(np.float32), W64.astype(np.float32)
+    horizons = list(f["fwd"])
+    K, H, S = W.shape[1], len(horizons), len(thresholds)
+    # lignes par horizon: alertes avec rendement connu, somme, somme des carrés, nb > 0
+    rets = [f["fwd"][h] for h in horizons]
+    vecs = np.empty((4 * H, len(X)), dtype=np.float32)
+    for hi, r in enumerate(rets):
+        ok = ~np.isnan(r)
+        r0 = np.where(ok, r, 0.0)
+        vecs[4 * hi:4 * hi + 4] = ok, r0, r0 * r0, r0 > 0
+    acc = np.zeros((S, 4 * H, K))
+    mask = np.empty((block, K), dtype=np.float32)
+    for lo in range(0, len(X), block):
+        scores = X[lo:lo + block] @ W  # [B, K]
+        m = mask[:len(scores)]
+        for si, thr in enumerate(thresholds):
+            np.greater_equal(scores, thr, out=m, casting="unsafe")
+            rows, cols = np.nonzero(np.abs(scores - thr) <= SCORE_TOL)
+            if len(rows):
+                m[rows, cols] = _exact_scores(X64[lo + rows], W64[:, cols]) >= thr
+            acc[si] += vecs[:, lo:lo + block] @ m  # [4H, K]
+    acc = acc.reshape(S, H, 4, K).transpose(2, 1, 0, 3)  # [4, H, S, K]
+    n, total, sumsq, pos = acc
+    return {"caps": caps, "n": n, "sum": total, "sumsq": sumsq, "pos": pos}
+
+
+def _exact_scores(x: np.ndarray, w: np.ndarray) -> np.ndarray:
+    """Scores float64 des paires (x[i], w[:, i]), sommés terme à terme comme compute_simple_score."""
+    s = np.zeros(len(x))
+    for j in range(x.shape[1]):
+        s = s + w[j] * x[:, j]
+    return s
+
+
+def cap_grid(caps: Optional[Dict[str, Iterable[float]]] = None) -> List[dict]:
+    caps = caps or DEFAULT_CAPS
+    keys = list(caps)
+    return [dict(zip(keys, values)) for values in itertools.product(*(caps[k] for k in keys))]
+
+
+def sweep(features: dict, weights: np.ndarray, caps: List[dict], thresholds: Sequence[float],
+          horizon: int, metric: str = "tstat", min_alerts: int = 100, top: int = 10,
+          workers: int = SWEEP_WORKERS, block: int = SWEEP_BLOCK) -> List[dict]:
+    """Évalue chaque (caps, seuil, poids); renvoie les `top` meilleurs pour `metric` à `horizon`."""
+    if metric not in METRICS:
+        raise ValueError(f"metric must be one of {METRICS}")
+    thresholds = list(thresholds)
+    if workers > 0:
+        with ProcessPoolExecutor(max_workers=min(workers, len(caps)), mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker, initargs=(features,)) as ex:
+            results = list(ex.map(_eval_caps, caps, itertools.repeat(weights), itertools.repeat(thresholds),
+                                  itertools.repeat(block)))
+    else:
+        results = [_eval_caps(c, weights, thresholds, block, features) for c in caps]
+
+    hi = list(features["fwd"]).index(horizon)
+    ranked = []
+    for res in results:
+        n, s, ss, pos = res["n"][hi], res["sum"][hi], res["sumsq"][hi], res["pos"][hi]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = s / n
+            std = np.sqrt(np.maximum(ss / n - mean * mean, 0.0))
+            value = {"tstat": mean / std * np.sqrt(n), "mean": mean, "hit": pos / n}[metric]
+        value = np.where(n >= min_alerts, value, -np.inf)
+        # meilleurs candidats de cette combinaison de caps seulement (le tri global porte sur peu de lignes)
+        flat = np.argsort(value, axis=None)[::-1][:top]
+        for idx in flat:
+            si, k = np.unravel_index(idx, value.shape)
+            if not np.isfinite(value[si, k]):
+                continue
+            ranked.append({"value": float(value[si, k]), "caps": res["caps"], "threshold": thresholds[si],
+                           "weights": {key: round(float(weights[k, j]), 4) for j, (key, _, _) in enumerate(WEIGHT_TERMS)},
+                           "alerts": int(n[si, k]), "mean": float(mean[si, k]), "hit_rate": float(pos[si, k] / n[si, k])})
+    ranked.sort(key=lambda r: r["value"], reverse=True)
+    return ranked[:top]
+
+
+def config_snippet(best: dict, metric: str, horizon: int) -> str:
+    """Extrait config.yaml (lu par ScoringPool) pour le meilleur résultat."""
+    lines = [f"# sweep: {metric} of {horizon}-bar forward return = {best['value']:.4f}, "
+             f"{best['alerts']} alerts, mean {best['mean'] * 100:+.3f}%, hit {best['hit_rate'] * 100:.1f}%",
+             f"# alert threshold: ALERT_THRESHOLD={best['threshold']}",
+             "scoring_weights:"]
+    lines += [f"  {k}: {v:g}" for k, v in best["weights"].items()]
+    lines.append("norm_params:")
+    lines += [f"  {k}: {v:g}" for k, v in best["caps"].items()]
+    return "\n".join(lines)
+
+
+def _floats(arg: str) -> List[float]:
+    return [float(x) for x in arg.split(",") if x]
+
+
+if __name__ == "__main__":
+    import argparse
+    from services.scanner.src.backtest import _synthetic, load_candles
+    from services.scanner.src.candle_archive import CANDLE_ARCHIVE_DIR, CandleArchive
+
+    p = argparse.ArgumentParser(description="Sweep scoring_weights / norm_params / seuil sur l'archive de bougies")
+    p.add_argument("--granularity", default="1h")
+    p.add_argument("--days", type=float, default=365)
+    p.add_argument("--archive", default=CANDLE_ARCHIVE_DIR)
+    p.add_argument("--synthetic", type=int, default=0, help="N symboles aléatoires (un an de 1h) au lieu de l'archive")
+    p.add_argument("--step", type=float, default=0.05, help="pas de la grille des poids")
+    p.add_argument("--thresholds", default="0.6,0.65,0.7,0.75")
+    p.add_argument("--horizon", type=int, default=24, help="barres")
+    p.add_argument("--metric", choices=METRICS, default="tstat")
+    p.add_argument("--min-alerts", type=int, default=100)
+    p.add_argument("--volume-ratio-caps", default=",".join(map(str, DEFAULT_CAPS["volume_ratio_cap"])))
+    p.add_argument("--atr-pct-caps", default=",".join(map(str, DEFAULT_CAPS["atr_pct_cap"])))
+    p.add_argument("--adx-caps", default=",".join(map(str, DEFAULT_CAPS["adx_cap"])))
+    p.add_argument("--workers", type=int, default=SWEEP_WORKERS)
+    p.add_argument("--top", type=int, default=10)
+    args = p.parse_args()
+
+    if args.synthetic:
+        data = _synthetic(args.synthetic, 24 * 365)
+    else:
+        start = int((time.time() - args.days * 86400) * 1000)
+        data = load_candles(CandleArchive(args.archive), args.granularity, start_ts=start)
+    t0 = time.perf_counter()
+    features = extract_features(data, [args.horizon])
+    W = weight_grid(args.step)
+    caps = cap_grid({"volume_ratio_cap": _floats(args.volume_ratio_caps), "atr_pct_cap": _floats(args.atr_pct_caps),
+                     "adx_cap": _floats(args.adx_caps)})
+    thresholds = _floats(args.thresholds)
+    t1 = time.perf_counter()
+    print(f"{len(data)} symbols, {len(features['rsi'])} bars: features in {t1 - t0:.1f}s")
+    best = sweep(features, W, caps, thresholds, args.horizon, args.metric, args.min_alerts, args.top, args.workers)
+    print(f"{len(W)} weights x {len(caps)} caps x {len(thresholds)} thresholds "
+          f"= {len(W) * len(caps) * len(thresholds)} combinations in {time.perf_counter() - t1:.1f}s")
+    for r in best:
+        print(f"{r['value']:+.4f}  thr={r['threshold']}  n={r['alerts']}  mean={r['mean'] * 100:+.3f}%  "
+              f"hit={r['hit_rate'] * 100:.1f}%  {r['weights']}  {r['caps']}")
+    if best:
+        print("\n" + config_snippet(best[0], args.metric, args.horizon))
+    else:
+        print("no combination reached --min-alerts")
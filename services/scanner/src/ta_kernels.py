@@ -0,0 +1,321 @@
+# scanner/ta_kernels.py
+"""
+Indicateurs pandas_ta (0.4, sans TA-Lib) en NumPy pur, sur le dernier axe.
+
+Chaque fonction accepte un tableau 1-D (une série) ou 2-D (symboles x barres).
+Les NaN en tête de ligne sont traités comme du padding: la série de ce
+symbole commence à sa première valeur valide, comme si pandas_ta avait reçu
+la série courte.
+
+Si numba est installé, ATR/RSI/ADX existent aussi en noyaux compilés
+(nopython, tableaux float64 contigus 1-D); sinon les versions NumPy servent
+de repli. Le choix se fait par `backend` ("numpy" | "numba").
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:  # numba optionnel
+    njit = None
+    HAS_NUMBA = False
+
+LENGTH = 14
+EPS = np.finfo(float).eps
+BACKENDS = ("numpy", "numba")
+
+
+def _shift(x: np.ndarray, n: int = 1) -> np.ndarray:
+    out = np.full_like(x, np.nan)
+    out[..., n:] = x[..., :-n]
+    return out
+
+
+def first_valid(x: np.ndarray) -> np.ndarray:
+    """Index de la première valeur non-NaN de chaque ligne (T si aucune)."""
+    valid = ~np.isnan(x)
+    return np.where(valid.any(axis=-1), valid.argmax(axis=-1), x.shape[-1])
+
+
+def rma(x: np.ndarray, length: int) -> np.ndarray:
+    """pandas `ewm(alpha=1/length, adjust=False).mean()` ligne par ligne (NaN compris)."""
+    x = np.asarray(x, dtype=float)
+    alpha = 1.0 / length
+    out = np.empty_like(x)
+    value = np.full(x.shape[:-1], np.nan)
+    old_wt = np.ones(x.shape[:-1])
+    for t in range(x.shape[-1]):
+        cur = x[..., t]
+        started = ~np.isnan(value)
+        obs = ~np.isnan(cur)
+        old_wt = np.where(started, old_wt * (1.0 - alpha), old_wt)
+        upd = started & obs
+        with np.errstate(invalid="ignore"):
+            blended = (old_wt * value + alpha * cur) / (old_wt + alpha)
+        value = np.where(upd, blended, np.where(~started & obs, cur, value))
+        old_wt = np.where(obs, 1.0, old_wt)
+        out[..., t] = value
+    return out
+
+
+def sma(x: np.ndarray, length: int) -> np.ndarray:
+    """Moyenne glissante (NaN si la fenêtre contient un NaN ou est incomplète)."""
+    x = np.asarray(x, dtype=float)
+    out = np.full_like(x, np.nan)
+    if x.shape[-1] >= length:
+        out[..., length - 1:] = sliding_window_view(x, length, axis=-1).mean(axis=-1)
+    return out
+
+
+def true_range(high, low, close, prenan: bool = False) -> np.ndarray:
+    pc = _shift(close)
+    # non_zero_range de pandas_ta: dès qu'une barre a high == low, eps est ajouté à toute la série
+    diff = high - low
+    hl = np.abs(np.where((diff == 0).any(axis=-1, keepdims=True), diff + EPS, diff))
+    with np.errstate(invalid="ignore"):
+        tr = np.fmax(hl, np.fmax(np.abs(high - pc), np.abs(pc - low)))
+    if prenan:
+        tr = np.where(np.isnan(pc), np.nan, tr)
+    return tr
+
+
+def atr(high, low, close, length: int = LENGTH, prenan: bool = False) -> np.ndarray:
+    """ATR Wilder, amorcé par la moyenne des `length` premiers TR (presma pandas_ta)."""
+    tr = true_range(high, low, close, prenan=prenan)
+    start = first_valid(close)[..., None]
+    pos = np.arange(tr.shape[-1])
+    window = (pos >= start) & (pos < start + length)
+    in_seed = window & ~np.isnan(tr)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        seed = np.where(in_seed, tr, 0.0).sum(axis=-1, keepdims=True) / in_seed.sum(axis=-1, keepdims=True)
+    x = np.where(pos < start + length - 1, np.nan, tr)
+    x = np.where(pos == start + length - 1, seed, x)
+    return rma(x, length)
+
+
+def rsi(close, length: int = LENGTH) -> np.ndarray:
+    diff = close - _shift(close)
+    positive = np.where(diff < 0, 0.0, diff)
+    negative = np.where(diff > 0, 0.0, diff)
+    pos_avg = rma(positive, length)
+    neg_avg = rma(negative, length)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return 100.0 * pos_avg / (pos_avg + np.abs(neg_avg))
+
+
+def adx(high, low, close, length: int = LENGTH) -> np.ndarray:
+    atr_ = atr(high, low, close, length=length, prenan=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        k = 100.0 / atr_
+        up = high - _shift(high)
+        dn = _shift(low) - low
+        pos = np.where((up > dn) & (up > 0), up, 0.0 * up)
+        neg = np.where((dn > up) & (dn > 0), dn, 0.0 * dn)
+        pos = np.where(np.abs(pos) < EPS, 0.0, pos)
+        neg = np.where(np.abs(neg) < EPS, 0.0, neg)
+        dmp = k * rma(pos, length)
+        dmn = k * rma(neg, length)
+        dx = 100.0 * np.abs(dmp - dmn) / (dmp + dmn)
+    return rma(dx, length)
+
+
+# --- noyaux scalaires (compilés par numba si disponible) ---------------------
+# Ecrits en boucles simples sur des tableaux float64 1-D: compilés, ils évitent
+# tout l'overhead pandas; interprétés, ils restent plus rapides que la version
+# vectorisée pour une seule série de ~200 barres.
+
+def _make_kernels(jit):
+    @jit
+    def rma_k(x, length):
+        alpha = 1.0 / length
+        n = x.shape[0]
+        out = np.empty(n)
+        value = np.nan
+        old_wt = 1.0
+        for t in range(n):
+            cur = x[t]
+            if value == value:
+                old_wt *= 1.0 - alpha
+                if cur == cur:
+                    value = (old_wt * value + alpha * cur) / (old_wt + alpha)
+                    old_wt = 1.0
+            elif cur == cur:
+                value = cur
+                old_wt = 1.0
+            out[t] = value
+        return out
+
+    @jit
+    def atr_k(high, low, close, length, prenan):
+        n = close.shape[0]
+        tr = np.empty(n)
+        start = n
+        # non_zero_range de pandas_ta: eps sur toute la série si une barre a high == low
+        flat = 0.0
+        for t in range(n):
+            if high[t] - low[t] == 0:
+                flat = EPS
+                break
+        for t in range(n):
+            if start == n and close[t] == close[t]:
+                start = t
+            pc = close[t - 1] if t > 0 else np.nan
+            v = abs(high[t] - low[t] + flat)
+            if pc == pc:
+                a = abs(high[t] - pc)
+                b = abs(pc - low[t])
+                if not (v >= a) and a == a:
+                    v = a
+                if not (v >= b) and b == b:
+                    v = b
+            elif prenan:
+                v = np.nan
+            tr[t] = v
+        total = 0.0
+        count = 0
+        for t in range(start, min(start + length, n)):
+            if tr[t] == tr[t]:
+                total += tr[t]
+                count += 1
+        seed = total / count if count > 0 else np.nan
+        x = np.empty(n)
+        for t in range(n):
+            if t < start + length - 1:
+                x[t] = np.nan
+            elif t == start + length - 1:
+                x[t] = seed
+            else:
+                x[t] = tr[t]
+        return rma_k(x, length)
+
+    @jit
+    def rsi_k(close, length):
+        n = close.shape[0]
+        positive = np.empty(n)
+        negative = np.empty(n)
+        for t in range(n):
+            d = close[t] - close[t - 1] if t > 0 else np.nan
+            positive[t] = 0.0 if d < 0 else d
+            negative[t] = 0.0 if d > 0 else d
+        pos_avg = rma_k(positive, length)
+        neg_avg = rma_k(negative, length)
+        out = np.empty(n)
+        for t in range(n):
+            den = pos_avg[t] + abs(neg_avg[t])
+            out[t] = 100.0 * pos_avg[t] / den if den != 0 else (np.nan if pos_avg[t] == 0 else np.inf)
+        return out
+
+    @jit
+    def adx_k(high, low, close, length):
+        n = close.shape[0]
+        atr_ = atr_k(high, low, close, length, True)
+        pos = np.empty(n)
+        neg = np.empty(n)
+        for t in range(n):
+            if t == 0:
+                pos[t] = np.nan
+                neg[t] = np.nan
+                continue
+            up = high[t] - high[t - 1]
+            dn = low[t - 1] - low[t]
+            p = up if (up > dn and up > 0) else 0.0 * up
+            m = dn if (dn > up and dn > 0) else 0.0 * dn
+            pos[t] = 0.0 if abs(p) < EPS else p
+            neg[t] = 0.0 if abs(m) < EPS else m
+        rp = rma_k(pos, length)
+        rn = rma_k(neg, length)
+        dx = np.empty(n)
+        for t in range(n):
+            if atr_[t] == 0 or atr_[t] != atr_[t]:
+                dx[t] = np.nan
+                continue
+            k = 100.0 / atr_[t]
+            dmp = k * rp[t]
+            dmn = k * rn[t]
+            den = dmp + dmn
+            dx[t] = 100.0 * abs(dmp - dmn) / den if den != 0 else np.nan
+        return rma_k(dx, length)
+
+    return rma_k, atr_k, rsi_k, adx_k
+
+
+# version interprétée (toujours disponible) et version compilée (si numba)
+PY_KERNELS = _make_kernels(lambda f: f)
+# error_model="numpy": x/0 -> inf/nan comme NumPy au lieu de ZeroDivisionError
+NB_KERNELS = _make_kernels(njit(cache=True, nogil=True, error_model="numpy")) if HAS_NUMBA else None
+
+
+def resolve_backend(backend: str) -> str:
+    """"numba" retombe sur "numpy" si numba n'est pas installé."""
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown indicator backend: {backend!r} (expected one of {BACKENDS})")
+    if backend == "numba" and not HAS_NUMBA:
+        return "numpy"
+    return backend
+
+
+def _rows(fn, *arrays):
+    # applique un noyau 1-D à chaque ligne d'un tableau 1-D ou 2-D
+    arrays = [np.ascontiguousarray(a, dtype=np.float64) for a in arrays]
+    if arrays[0].ndim == 1:
+        return fn(*arrays)
+    out = np.empty(arrays[0].shape)
+    for i in range(arrays[0].shape[0]):
+        out[i] = fn(*(a[i] for a in arrays))
+    return out
+
+
+def wilder_indicators(high, low, close, backend: str = "numpy"):
+    """
+    (atr, rsi, adx) de longueur 14. "numba": noyaux compilés ligne par ligne.
+    "numpy": vectorisé sur les symboles en 2-D; en 1-D les noyaux interprétés
+    (une seule série: la boucle bat la vectorisation temporelle).
+    """
+    backend = resolve_backend(backend)
+    if backend == "numba":
+        kernels = NB_KERNELS
+    elif np.ndim(close) == 1:
+        kernels = PY_KERNELS
+    else:
+        return atr(high, low, close), rsi(close), adx(high, low, close)
+    _, atr_k, rsi_k, adx_k = kernels
+    return (_rows(lambda h, l, c: atr_k(h, l, c, LENGTH, False), high, low, close),
+            _rows(lambda c: rsi_k(c, LENGTH), close),
+            _rows(lambda h, l, c: adx_k(h, l, c, LENGTH), high, low, close))
+
+
+def indicators(open_, high, low, close, volume, backend: str = "numpy") -> dict:
+    """Colonnes de scoring.compute_indicators (avant dropna), sur le dernier axe."""
+    atr_, rsi_, adx_ = wilder_indicators(high, low, close, backend)
+    vol_ma20 = sma(volume, 20)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = {
+            "open": open_,
+            "high": high,
+            "low": low,
+            "close": close,
+            "volume": volume,
+            "atr": atr_,
+            "atr_pct": atr_ / close,
+            "rsi": rsi_,
+            "adx": adx_,
+            "ma20": sma(close, 20),
+            "ma50": sma(close, 50),
+            "vol_ma20": vol_ma20,
+            "vol_spike_ratio": volume / vol_ma20,
+        }
+    return out
+
+
+def last_complete_index(ind: dict) -> np.ndarray:
+    """
+    Pour chaque ligne, index de la dernière barre sans NaN dans aucune colonne
+    (équivalent de dropna().iloc[-1]); -1 si aucune.
+    """
+    complete = np.ones(ind["close"].shape, dtype=bool)
+    for v in ind.values():
+        complete &= ~np.isnan(v)
+    T = complete.shape[-1]
+    last = T - 1 - np.argmax(complete[..., ::-1], axis=-1)
+    return np.where(complete.any(axis=-1), last, -1)
@@ -2,137 +2,563 @@
 import asyncio
 import os
 import json
-from typing import List
+import time
+from typing import Dict, List, Optional, Tuple
 import pandas as pd
 import redis.asyncio as aioredis
-from services.scanner.src.fetcher import get_candles
-from services.scanner.src.scoring import compute_scores_from_ohlcv
+from loguru import logger
+from services.scanner.src.candle_archive import CANDLE_ARCHIVE_DIR, CandleArchive
+from services.scanner.src.candle_store import CandleStore
+from services.scanner.src.data_build import load_universe, refresh_universe, symbols_from_universe
+from services.scanner.src.http_client import close_client
+from services.scanner.src.metrics import (BATCH_LATENCY, REDIS_FLUSH_ERRORS, REGISTRY, STAGE_SYMBOLS,
+                                          SWEEP_DURATION, SYMBOLS_PER_SECOND, SYMBOLS_PROCESSED, SYMBOLS_SCORED,
+                                          WORKER_ERRORS)
+from services.scanner.src.prefilter import TickerPrefilter, cutoffs_from_config, filtered_summary, new_stage_counts
+from services.scanner.src.price_cache import PRICE_CACHE_PREFIX, PRICE_CACHE_TTL, encode_price, price_from_candles
+from services.scanner.src.ratelimit import MARKET_LIMITER
+from services.scanner.src.result_store import (REDIS_RESULT_PREFIX, REDIS_SWEEP_GEN_KEY, ResultBatch,
+                                               new_redis_stats)
+from services.scanner.src.scheduler import SymbolScheduler, usdt_volume_24h
+from services.scanner.src.scoring_pool import SCORING_WORKERS, ScoringPool
+from services.scanner.src.shards import SCAN_SHARDS, ShardLeases, SharedTokenBucket, shard_of
+from services.scanner.src.streaming_indicators import IndicatorState, score_latest
+from services.scanner.src.tracing import TRACE_RATE_KEY, SweepTracer
+from services.scanner.src.ws_ingest import BitgetWsIngest
 
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 SYMBOL_LIST_FILE = os.getenv("SYMBOL_LIST_FILE", "./data/filtered_pairs.json")
 STORE_WINNER= os.getenv("STORE_WINNER", "./data/winner.json")
 REDIS_INDEX_KEY = "bot:symbol_index"
-REDIS_RESULT_PREFIX = "bot:result:"  # store last result per symbol as JSON
+REDIS_SCHEDULER_KEY = "bot:scheduler"  # JSON snapshot of the scan queue (SymbolScheduler.snapshot)
 ALERT_STREAM = os.getenv("ALERT_STREAM", "alerts_stream")
 ALERT_GROUP = os.getenv("ALERT_GROUP", "bots")
 ALERT_THRESHOLD = float(os.getenv("ALERT_THRESHOLD", "0.7"))  # default threshold
-BATCH_SIZE = int(os.getenv("BATCH_SIZE", 5))
-SLEEP_BETWEEN_BATCHES = int(os.getenv("SLEEP_BETWEEN_BATCHES", 1 * 60))
+BATCH_SIZE = int(os.getenv("BATCH_SIZE", 50))
+SLEEP_BETWEEN_BATCHES = int(os.getenv("SLEEP_BETWEEN_BATCHES", 10))
+SCAN_SCHEDULE = os.getenv("SCAN_SCHEDULE", "priority")  # "priority" (SymbolScheduler) | "roundrobin"
+INGEST_MODE = os.getenv("INGEST_MODE", "poll")  # "poll" (REST rotation) | "ws" (websocket push, scored on bar close)
+# bars of every symbol close at the same instant: wait that long to score them in one batch
+WS_SCORE_DEBOUNCE = float(os.getenv("WS_SCORE_DEBOUNCE", 0.5))
+TIMEFRAMES = (("1h", "1h"), ("1d", "1day"))  # (summary label, Bitget granularity)
+GRANULARITY_LABELS = {g: label for label, g in TIMEFRAMES}
+# re-download the coin/pair universe that often (seconds, 0 = never); listings/delistings apply without a restart
+UNIVERSE_REFRESH_INTERVAL = float(os.getenv("UNIVERSE_REFRESH_INTERVAL", 6 * 3600))
 
 class BotWorker:
-    def __init__(self, redis_url=REDIS_URL, symbols_file=SYMBOL_LIST_FILE):
+    def __init__(self, redis_url=REDIS_URL, symbols_file=SYMBOL_LIST_FILE, scoring_workers: int = SCORING_WORKERS):
         self.r = aioredis.from_url(redis_url, decode_responses=True)
-        self.symbols = self._load_symbols_file(symbols_file)
-        if not self.symbols:
+        # last N bars per symbol/granularity: each pass only downloads the new bars;
+        # closed bars are kept on disk (history + warm start after a restart)
+        archive = CandleArchive(CANDLE_ARCHIVE_DIR) if CANDLE_ARCHIVE_DIR else None
+        self.candles = CandleStore(redis=self.r, archive=archive)
+        # indicator math runs off the event loop: worker processes in the scanner,
+        # a thread (scoring_workers=0) when embedded in another service such as the bot
+        self.scorer = ScoringPool(workers=scoring_workers)
+        self.ingest = None  # BitgetWsIngest when INGEST_MODE=ws
+        # INGEST_MODE=ws: indicators per (symbol, granularity), updated bar by bar instead of rescoring the buffer
+        self.indicators: Dict[Tuple[str, str], IndicatorState] = {}
+        # cheap stages before the full scoring (config.yaml `scan`): ticker snapshot, then 1h cutoffs
+        self.prefilter = TickerPrefilter()
+        self.cutoffs = cutoffs_from_config()
+        self.stage_counts = new_stage_counts()  # cumulative symbols entering each stage
+        # sampled per-stage spans, one Chrome trace file per sweep (TRACE_SAMPLE_RATE or /trace)
+        self.tracer = SweepTracer()
+        self.symbols_file = symbols_file
+        self.redis_stats = new_redis_stats()
+        self.sweep_gen = 0  # stored with each result: which pass over the universe produced it
+        # universe = every pair of the symbols file; symbols = the part this worker scans
+        # (all of it, or only its shards when SCAN_SHARDS > 0)
+        self.universe = self._load_symbols_file(symbols_file)
+        if not self.universe:
             raise RuntimeError("Aucune paire trouvée dans filtered_pairs.json")
+        self.shards: Optional[ShardLeases] = None
+        self.symbols = list(self.universe)
+        # hot/liquid symbols rescanned every bar, dead ones every few hours
+        self.scheduler = SymbolScheduler(self.symbols)
+        self._scheduler_restored = False
+        self._sweep_started = time.monotonic()
+        self._register_metrics()
+
+    def _register_metrics(self):
+        """Expose the stats this worker already keeps on /metrics (read at scrape time, nothing counted twice)."""
+        cache = self.scorer.cache
+        if cache is not None:
+            REGISTRY.callback("scanner_score_cache_hits_total", "ScoreCache hits", lambda: cache.stats["hits"],
+                              "counter")
+            REGISTRY.callback("scanner_score_cache_misses_total", "ScoreCache misses (expired included)",
+                              lambda: cache.stats["misses"], "counter")
+            REGISTRY.callback("scanner_score_cache_evictions_total", "ScoreCache LRU evictions",
+                              lambda: cache.stats["evictions"], "counter")
+            REGISTRY.callback("scanner_score_cache_entries", "ScoreCache size", lambda: len(cache))
+            REGISTRY.callback("scanner_score_cache_hit_ratio", "ScoreCache hits / lookups since start",
+                              lambda: cache.stats["hits"] / max(1, cache.stats["hits"] + cache.stats["misses"]))
+        st = self.candles.stats
+        REGISTRY.callback("scanner_candle_loads_total", "CandleStore loads by kind (full fetch, incremental, warm start)",
+                          lambda: {k: st[k] for k in ("full", "incremental", "warm")}, "counter", ["kind"])
+        REGISTRY.callback("scanner_candle_rows_fetched_total", "Candle rows downloaded by the CandleStore",
+                          lambda: st["rows_fetched"], "counter")
+        REGISTRY.callback("scanner_redis_round_trips_total", "Redis round trips of the worker",
+                          lambda: self.redis_stats["round_trips"], "counter")
+        REGISTRY.callback("scanner_symbols", "Symbols scanned by this worker (its shards only when sharded)",
+                          lambda: len(self.symbols))
+        REGISTRY.callback("scanner_shards_owned", "Shard leases held by this worker",
+                          lambda: len(self.shards.owned) if self.shards is not None else None)
+
+    def _observe_batch(self, mode: str, n: int, seconds: float, round_trips_before: int):
+        BATCH_LATENCY.labels(mode).observe(seconds)
+        SYMBOLS_PROCESSED.labels(mode).inc(n)
+        if seconds > 0:
+            SYMBOLS_PER_SECOND.set(n / seconds)
+        logger.debug("batch {mode}: {symbols} symbols in {seconds:.2f}s, {round_trips} redis round trips",
+                     mode=mode, symbols=n, seconds=seconds,
+                     round_trips=self.redis_stats["round_trips"] - round_trips_before)
 
     def _load_symbols_file(self, path) -> List[str]:
-        try:
-            with open(path, "r", encoding="utf-8") as f:
-                data = json.load(f)
-                #print(data)
-            syms = []
-            for entry in data:
-                for p in entry.get("pairs", []):
-                    sym = p.get("symbol")
-                    if sym and sym.endswith("USDT"):
-                        syms.append(sym)
-                        break
-            return syms
-        except FileNotFoundError:
-            return []
+        return symbols_from_universe(load_universe(path))
 
-    async def _get_index(self) -> int:
-        v = await self.r.get(REDIS_INDEX_KEY)
-        if v is None:
-            await self.r.set(REDIS_INDEX_KEY, 0)
-            return 0
-        return int(v)
+    def set_symbols(self, symbols: List[str]):
+        """Hot-swap the universe: the next batch already uses it (no restart of the scan loop)."""
+        if not symbols:
+            return
+        self.universe = list(symbols)
+        self._apply_shards()
 
-    async def _set_index(self, idx: int):
-        await self.r.set(REDIS_INDEX_KEY, int(idx))
+    def _apply_shards(self):
+        self.symbols = self.shards.filter(self.universe) if self.shards is not None else list(self.universe)
+        self.scheduler.set_symbols(self.symbols)
 
-    async def _maybe_publish_alert(self, symbol: str, summary: dict):
-        """
-        Publishes to Redis stream if either 1h or 1d score exceeds threshold.
-        """
-        try:
-            s1 = summary.get("1h", {}).get("score", 0.0) or 0.0
-            s1d = summary.get("1d", {}).get("score", 0.0) or 0.0
-            top_score = max(s1, s1d)
-            if top_score >= ALERT_THRESHOLD:
-                payload = {
-                    "symbol": symbol,
-                    "score_1h": s1,
-                    "score_1d": s1d,
-                    "summary": summary
-                }
-                # push to stream as JSON string under field "data"
-                print("xass.r",payload)
-                await self.r.xadd(ALERT_STREAM, {"data": json.dumps(payload)})
-        except Exception as e:
-            # don't fail processing on alert publish failure
-            print("publish alert error:", e)
+    def _by_shard(self, symbols: List[str]) -> dict:
+        out = {}
+        for s in symbols:
+            out.setdefault(shard_of(s, self.shards.n_shards), []).append(s)
+        return out
 
-    async def _process_symbol(self, symbol: str):
+    async def _start_shards(self, on_change=None):
+        """SCAN_SHARDS > 0: only scan the shards whose redis lease this worker holds."""
+        if SCAN_SHARDS <= 0:
+            return
+        previous = set()
+
+        async def changed(owned):
+            nonlocal previous
+            self._apply_shards()
+            gained = sorted(owned - previous)
+            previous = set(owned)
+            if gained and SCAN_SCHEDULE == "priority":
+                # resume the scan queue of the shards we just took over (no full rescan after a failover)
+                for raw in await self.r.mget([f"{REDIS_SCHEDULER_KEY}:{s}" for s in gained]):
+                    self.scheduler.restore(raw)
+            if on_change is not None:
+                await on_change()
+
+        self.shards = ShardLeases(self.r, SCAN_SHARDS, on_change=changed)
+        # the replicas share the exchange's per-IP budget: one token bucket in redis instead of one each
+        if not isinstance(MARKET_LIMITER.bucket, SharedTokenBucket):
+            MARKET_LIMITER.bucket = SharedTokenBucket(self.r, MARKET_LIMITER.bucket)
+        await self.shards.start()
+
+    async def refresh_universe(self) -> bool:
+        """Re-download coins/pairs, rewrite the symbols file if it changed and adopt it. True if it changed."""
+        entries, diff = await refresh_universe(self.symbols_file)
+        symbols = symbols_from_universe(entries)
+        if not symbols or symbols == self.universe:
+            return False
+        logger.info("universe: +{added} -{removed} ~{changed} -> {symbols} symbols", added=len(diff["added"]),
+                    removed=len(diff["removed"]), changed=len(diff["changed"]), symbols=len(symbols))
+        self.set_symbols(symbols)
+        return True
+
+    async def _universe_loop(self, on_change=None):
+        while True:
+            await asyncio.sleep(UNIVERSE_REFRESH_INTERVAL)
+            try:
+                if await self.refresh_universe() and on_change is not None:
+                    await on_change()
+            except Exception as e:
+                logger.warning("universe refresh error: {}", e)
+
+    async def _get_rotation(self, index_key: str = REDIS_INDEX_KEY):
+        """(rotation index, sweep generation) in one round trip; also picks up the trace rate set by /trace."""
+        idx, gen, trace_rate = await self.r.mget(index_key, REDIS_SWEEP_GEN_KEY, TRACE_RATE_KEY)
+        self.redis_stats["round_trips"] += 1
+        self.redis_stats["commands"] += 1
+        self.sweep_gen = int(gen or 0)
+        self.tracer.set_rate(trace_rate)
+        return int(idx or 0), self.sweep_gen
+
+    async def _get_candles(self, symbol: str, granularity: str):
+        if not self.tracer.sampled(symbol):
+            return await self.candles.get(symbol, granularity, limit=200)
+        # limiter wait included: that is what the sweep pays
+        with self.tracer.span(symbol, f"fetch {GRANULARITY_LABELS.get(granularity, granularity)}"):
+            return await self.candles.get(symbol, granularity, limit=200)
+
+    def _dump_trace(self, label: str):
         try:
-            candles_1h = await get_candles(symbol, "1h", limit=200)
-            candles_1d = await get_candles(symbol, "1day", limit=200)
+            path = self.tracer.dump(label)
         except Exception as e:
-            return {"symbol": symbol, "error": str(e)}
+            logger.warning("trace dump failed: {}", e)
+            return
+        if path is not None:
+            logger.info("trace written: {path}", path=path)
+
+    def _is_alert(self, summary: dict) -> bool:
+        """True if either 1h or 1d score exceeds threshold."""
+        s1 = summary.get("1h", {}).get("score", 0.0) or 0.0
+        s1d = summary.get("1d", {}).get("score", 0.0) or 0.0
+        return max(s1, s1d) >= ALERT_THRESHOLD
 
-        # compute scores
+    async def _score_and_store(self, items, index: Optional[int] = None, end_of_sweep: bool = False,
+                               index_key: str = REDIS_INDEX_KEY, scored: Optional[dict] = None,
+                               shard: Optional[int] = None, filtered: Optional[dict] = None) -> dict:
+        """
+        Score (symbol, candles_1h, candles_1d) items in the pool (unless `scored`
+        is given), then write all results, alerts and the rotation index in one
+        redis transaction. `end_of_sweep`: this worker finished a pass (over
+        `shard` when the round-robin rotation is per shard). `filtered`:
+        {symbol: {label: reason}} timeframes dropped before scoring (prefilter,
+        cutoffs), stored as filtered results instead of a score.
+        """
+        filtered = filtered or {}
+        if scored is None:
+            scored = await self.scorer.score_many(items, self.tracer)
+        batch = ResultBatch(REDIS_RESULT_PREFIX, ALERT_STREAM)
+        # last price and 1h/24h/7d changes from the candles we already have, for the bot's messages
+        for symbol, c1h, c1d in items:
+            try:
+                batch.set(PRICE_CACHE_PREFIX + symbol, encode_price(price_from_candles(c1h, c1d)), ex=PRICE_CACHE_TTL)
+            except Exception as e:
+                logger.warning("price cache error: {} {}", symbol, e)
+        volumes = {}
+        for symbol, c1h, _ in items:
+            try:
+                volumes[symbol] = usdt_volume_24h(c1h)
+            except Exception:
+                volumes[symbol] = None
+        results = {}
+        alerted = []
+        for symbol, (summary, err) in scored.items():
+            if err is not None:
+                self.scheduler.update(symbol, None, volumes.get(symbol))
+                results[symbol] = {"symbol": symbol, "error": err}
+                continue
+            if symbol in filtered:
+                summary = {**summary, **{label: filtered_summary(reason) for label, reason in filtered[symbol].items()}}
+            self.scheduler.update(symbol, max((summary.get(tf, {}).get("score", 0.0) or 0.0) for tf in ("1h", "1d")),
+                                  volumes.get(symbol))
+            batch.add_result(symbol, summary, self.sweep_gen)
+            if self._is_alert(summary):
+                batch.add_alert(symbol, summary)
+                alerted.append(symbol)
+            results[symbol] = {"symbol": symbol, "summary": summary}
+        for symbol, reasons in filtered.items():
+            if symbol not in scored:
+                # not scored at all: its results say why, and it leaves the rankings
+                batch.add_result(symbol, {label: filtered_summary(reasons[label]) for label, _ in TIMEFRAMES},
+                                 self.sweep_gen)
+        if index is not None:
+            batch.set(index_key, int(index))
+        if SCAN_SCHEDULE == "priority":
+            # a "sweep" = every symbol scanned at least once, whatever the order
+            end_of_sweep = self.scheduler.end_of_pass()
+            if self.shards is None:
+                batch.set(REDIS_SCHEDULER_KEY, self.scheduler.dumps())
+            else:
+                # one snapshot per shard, picked up by the next owner of the lease
+                for i, symbols in self._by_shard(self.symbols).items():
+                    batch.set(f"{REDIS_SCHEDULER_KEY}:{i}", self.scheduler.dumps(symbols))
+        if end_of_sweep and self.shards is None:
+            batch.incr(REDIS_SWEEP_GEN_KEY)
+        commands = len(batch)
+        t0 = time.time()
         try:
-            summary = compute_scores_from_ohlcv(candles_1h, candles_1d)
+            await batch.flush(self.r, self.redis_stats)
         except Exception as e:
-            return {"symbol": symbol, "error": f"scoring error: {e}"}
+            # don't fail processing on a redis write failure
+            REDIS_FLUSH_ERRORS.inc()
+            logger.warning("redis flush error: {}", e)
+        t1 = time.time()
+        if end_of_sweep and self.shards is not None:
+            await self._shard_pass_done(shard)
+        traced = [s for s in scored if self.tracer.sampled(s)]
+        if traced:
+            # results and alerts share one MULTI/EXEC: each traced symbol gets the whole transaction,
+            # its alert becomes visible to the bot when it commits
+            self.tracer.add("batch", "redis write", t0, t1, commands=commands, symbols=len(items), alerts=len(alerted))
+            for symbol in traced:
+                self.tracer.add(symbol, "redis write", t0, t1, commands=commands)
+            for symbol in alerted:
+                if self.tracer.sampled(symbol):
+                    self.tracer.instant(symbol, "alert publish", t1, stream=ALERT_STREAM)
+        if end_of_sweep:
+            now = time.monotonic()
+            SWEEP_DURATION.observe(now - self._sweep_started)
+            self._sweep_started = now
+            self._dump_trace(f"sweep-{self.sweep_gen}")
+        # closed bars merged since the last batch (polling or WS pushes), written in a thread
+        await self.candles.flush_archive()
+        return results
 
-        # store summary in redis
+    async def _shard_pass_done(self, shard: Optional[int]):
+        """
+        Sharded: the sweep generation is global, bumped once every shard has
+        finished a pass, whichever worker scans it (not once per worker pass).
+        """
+        owned = set(self.shards.owned)
+        # priority mode: one scheduler pass covers every owned shard
+        done = {shard} if shard is not None else set(owned)
+        # shards with no symbol (small universe) never run a pass of their own
+        done |= owned - set(self._by_shard(self.symbols))
         try:
-            await self.r.set(REDIS_RESULT_PREFIX + symbol, json.dumps(summary))
+            gen = await self.shards.pass_done(done, REDIS_SWEEP_GEN_KEY)
         except Exception as e:
-            print("redis set error:", e)
+            logger.warning("sweep generation update failed: {}", e)
+            return
+        self.redis_stats["round_trips"] += 1
+        self.redis_stats["commands"] += 1
+        if gen:
+            logger.info("sweep {} complete (all {} shards)", gen - 1, self.shards.n_shards)
 
-        # publish to alert stream if threshold exceeded
-        await self._maybe_publish_alert(symbol, summary)
+    async def _process_symbols(self, symbols: List[str], index: Optional[int] = None, end_of_sweep: bool = False,
+                               index_key: str = REDIS_INDEX_KEY, shard: Optional[int] = None):
+        """
+        Pipeline in input order: ticker prefilter -> 1h and 1d candles -> per-timeframe
+        cutoffs (process pool, only with scan.cutoffs_enabled) -> scoring of the
+        timeframes left -> redis.
+        """
+        counts = new_stage_counts()
+        counts["universe"] = len(symbols)
+        results = {}
 
-        return {"symbol": symbol, "summary": summary}
+        kept, dropped, volumes = await self.prefilter.split(symbols)
+        counts["tickers"] = len(kept)
+        # {symbol: {label: reason}}: timeframes that won't be scored, written as filtered results
+        filtered = {s: {label: reason for label, _ in TIMEFRAMES} for s, reason in dropped.items()}
+
+        fetched = await asyncio.gather(*(self._get_candles(s, g) for s in kept for _, g in TIMEFRAMES),
+                                       return_exceptions=True)
+        candles = {}
+        for i, symbol in enumerate(kept):
+            c1h, c1d = fetched[2 * i], fetched[2 * i + 1]
+            err = next((res for res in (c1h, c1d) if isinstance(res, Exception)), None)
+            if err is not None:
+                # keeps its previous results (they expire by TTL if this goes on)
+                self.scheduler.update(symbol, None, volumes.get(symbol))
+                results[symbol] = {"symbol": symbol, "error": str(err)}
+            else:
+                candles[symbol] = (c1h, c1d)
+
+        if self.cutoffs:
+            # each timeframe on its own last complete bar: a quiet 1h does not hide a 1d setup
+            for k, (label, _) in enumerate(TIMEFRAMES):
+                failed = await self.scorer.check_cutoffs([(s, c[k]) for s, c in candles.items()], self.cutoffs)
+                for symbol, reason in failed.items():
+                    if reason is not None:
+                        filtered.setdefault(symbol, {})[label] = reason
+        to_score = []
+        for symbol, (c1h, c1d) in candles.items():
+            if len(filtered.get(symbol, ())) == len(TIMEFRAMES):
+                volumes.setdefault(symbol, usdt_volume_24h(c1h))
+                dropped[symbol] = "; ".join(filtered[symbol].values())
+            else:
+                to_score.append((symbol, c1h, c1d))
+        counts["cutoffs"] = len(to_score)
+
+        for symbol, reason in dropped.items():
+            self.scheduler.update(symbol, None, volumes.get(symbol))
+            results[symbol] = {"symbol": symbol, "error": reason}
+        if filtered:
+            logger.info("filtered {} of {} symbols ({} before the candles, {} timeframes cut off)", len(dropped),
+                        len(symbols), len(symbols) - len(kept),
+                        sum(len(r) for s, r in filtered.items() if s in candles))
+            logger.debug("filtered: {}", filtered)
+        counts["scored"] = len(to_score)
+
+        results.update(await self._score_and_store(to_score, index, end_of_sweep, index_key, shard=shard,
+                                                   filtered=filtered))
+        for k, v in counts.items():
+            self.stage_counts[k] += v
+            STAGE_SYMBOLS.labels(k).inc(v)
+        logger.debug("stages {universe} -> {tickers} -> {cutoffs} -> {scored}", **counts)
+        return [results[s] for s in symbols]
+
+    def _stream_state(self, symbol: str, granularity: str, rows: List[list]) -> IndicatorState:
+        """Indicator state of one series caught up with `rows`: only the bars added since the last call are pushed."""
+        key = (symbol, granularity)
+        state = self.indicators.get(key)
+        if state is None or not state.catch_up(rows):
+            # first score of the series, or a gap longer than the buffer
+            state = self.indicators[key] = IndicatorState.from_rows(rows)
+        return state
+
+    def _score_streamed(self, items) -> dict:
+        """{symbol: (summary, error)} like ScoringPool.score_many, from the incremental indicator states."""
+        out = {}
+        for symbol, c1h, c1d in items:
+            try:
+                out[symbol] = ({label: score_latest(self._stream_state(symbol, g, rows), self.scorer.weights,
+                                                    self.scorer.norm_params)
+                                for (label, g), rows in zip(TIMEFRAMES, (c1h, c1d))}, None)
+            except Exception as e:
+                out[symbol] = (None, f"scoring error: {e}")
+        errors = sum(1 for _, err in out.values() if err is not None)
+        SYMBOLS_SCORED.labels("ok").inc(len(out) - errors)
+        SYMBOLS_SCORED.labels("error").inc(errors)
+        return out
+
+    async def _score_stored(self, symbols: List[str]):
+        """
+        Score from the candle store only (kept current by the websocket), no REST
+        call. The bars closed since the last score are folded into each series'
+        IndicatorState: O(new bars) per symbol instead of rescoring the whole buffer.
+        """
+        self.tracer.set_rate(await self.r.get(TRACE_RATE_KEY))
+        items = [(s, self.candles.rows(s, "1h"), self.candles.rows(s, "1day")) for s in symbols]
+        # the first score of a series replays its buffer: off the event loop (states are only touched here)
+        scored = await asyncio.to_thread(self._score_streamed, items)
+        results = await self._score_and_store(items, scored=scored)
+        # every bar close rescores the whole universe: one trace per close
+        self._dump_trace("ws")
+        return [results[s] for s in symbols]
+
+    async def _process_symbol(self, symbol: str):
+        return (await self._process_symbols([symbol]))[0]
 
     async def run_once_batch(self):
-        idx = await self._get_index()
-        n = len(self.symbols)
-        results = []
-        for i in range(BATCH_SIZE):
-            symbol_idx = (idx + i) % n
-            symbol = self.symbols[symbol_idx]
-            res = await self._process_symbol(symbol)
-            results.append(res)
-        new_idx = (idx + BATCH_SIZE) % n
-        if n==idx:
-            await self.r.flushdb()
-        await self._set_index(new_idx)
+        if SCAN_SCHEDULE == "priority":
+            return await self.run_priority_batch()
+        rt = self.redis_stats["round_trips"]
+        index_key, universe, shard = REDIS_INDEX_KEY, self.symbols, None
+        if self.shards is not None:
+            # one rotation index per shard: whoever holds the lease continues where the last owner stopped
+            by_shard = self._by_shard(self.symbols)
+            for _ in range(len(self.shards.owned)):
+                shard = self.shards.next_shard()
+                if shard in by_shard:
+                    break
+            else:
+                return []
+            index_key = f"{REDIS_INDEX_KEY}:{shard}"
+            universe = by_shard[shard]
+        idx, _ = await self._get_rotation(index_key)
+        n = len(universe)
+        idx %= n
+        batch = min(BATCH_SIZE, n)
+        symbols = [universe[(idx + i) % n] for i in range(batch)]
+        new_idx = (idx + batch) % n
+        # symbols are fetched concurrently (max in-flight requests and request rate
+        # are enforced by MARKET_LIMITER), scored in the process pool, then results,
+        # alerts and the new index are written in a single redis transaction.
+        # Nothing is reset at the end of a pass: the sweep generation is bumped and
+        # results left behind expire by TTL.
+        t0 = time.perf_counter()
+        results = await self._process_symbols(symbols, index=new_idx, end_of_sweep=idx + batch >= n,
+                                              index_key=index_key, shard=shard)
+        self._observe_batch("roundrobin", len(symbols), time.perf_counter() - t0, rt)
+        return results
 
+    async def run_priority_batch(self):
+        """Scan the (at most BATCH_SIZE) symbols the scheduler says are due; [] if none is."""
+        rt = self.redis_stats["round_trips"]
+        await self._get_rotation()
+        if not self._scheduler_restored and self.shards is None:
+            self.scheduler.restore(await self.r.get(REDIS_SCHEDULER_KEY))
+            self.redis_stats["round_trips"] += 1
+            self.redis_stats["commands"] += 1
+            self._scheduler_restored = True
+        symbols = self.scheduler.next_batch(BATCH_SIZE)
+        if not symbols:
+            return []
+        t0 = time.perf_counter()
+        results = await self._process_symbols(symbols)
+        self._observe_batch("priority", len(symbols), time.perf_counter() - t0, rt)
         return results
 
+    async def run_stream(self):
+        """
+        INGEST_MODE=ws: le candle store est alimenté par le websocket et un symbole
+        est rescoré dès qu'une de ses barres ferme (ou après un comblement de trou
+        REST), à partir d'états d'indicateurs mis à jour barre par barre (voir _score_stored).
+        """
+        pending = asyncio.Queue()
+
+        def mark(symbol, *_):
+            pending.put_nowait(symbol)
+
+        def new_ingest():
+            return BitgetWsIngest(self.candles, self.symbols, [g for _, g in TIMEFRAMES], on_bar_close=mark,
+                                  on_gap_filled=lambda symbols: [mark(s) for s in symbols])
+
+        async def resubscribe():
+            # nouvel univers ou nouveaux shards: reconnexion avec la nouvelle liste d'abonnements (le comblement REST
+            # rattrape l'historique des nouveaux symboles)
+            if self.ingest is None:
+                return
+            old, self.ingest = self.ingest, new_ingest()
+            await old.stop()
+            kept = set(self.symbols)
+            for key in [k for k in list(self.indicators) if k[0] not in kept]:
+                self.indicators.pop(key, None)
+            await self.ingest.start()
+
+        await self._start_shards(resubscribe)
+        self.ingest = new_ingest()
+        await self.ingest.start()
+        refresher = asyncio.create_task(self._universe_loop(resubscribe)) if UNIVERSE_REFRESH_INTERVAL > 0 else None
+        try:
+            while True:
+                symbols = {await pending.get()}
+                await asyncio.sleep(WS_SCORE_DEBOUNCE)
+                while not pending.empty():
+                    symbols.add(pending.get_nowait())
+                try:
+                    rt = self.redis_stats["round_trips"]
+                    t0 = time.perf_counter()
+                    await self._score_stored(sorted(symbols))
+                    self._observe_batch("ws", len(symbols), time.perf_counter() - t0, rt)
+                except Exception as e:
+                    WORKER_ERRORS.inc()
+                    logger.exception("Worker error: {}", e)
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+            await self.ingest.stop()
+            if self.shards is not None:
+                await self.shards.stop()
+
     async def run_forever(self):
-        while True:
-            try:
-                results = await self.run_once_batch()
-
-                winners = []
-                for r in results:
-                    s1 = r.get("summary", {}).get("1h", {}).get("score", 0) or 0
-                    s1d = r.get("summary", {}).get("1d", {}).get("score", 0) or 0
-                    top = max(s1, s1d)
-                    if top >= ALERT_THRESHOLD:
-                        winners.append({"symbol": r["symbol"], "score_1h": s1, "score_1d": s1d})
+        if INGEST_MODE == "ws":
+            return await self.run_stream()
+        # the batches below pick up self.symbols as soon as the refresher (or a shard change) swaps it
+        await self._start_shards()
+        refresher = asyncio.create_task(self._universe_loop()) if UNIVERSE_REFRESH_INTERVAL > 0 else None
+        try:
+            while True:
+                try:
+                    results = await self.run_once_batch()
+
+                    winners = []
+                    for r in results:
+                        s1 = r.get("summary", {}).get("1h", {}).get("score", 0) or 0
+                        s1d = r.get("summary", {}).get("1d", {}).get("score", 0) or 0
+                        top = max(s1, s1d)
+                        if top >= ALERT_THRESHOLD:
+                            winners.append({"symbol": r["symbol"], "score_1h": s1, "score_1d": s1d})
+                    # written once per batch (the rankings themselves live in the bot:top:* sorted sets)
+                    if winners:
                         with open(STORE_WINNER, "w", encoding="utf-8") as f:
                             json.dump(winners, f, ensure_ascii=False, indent=4)
 
-                print(f"Processed batch: {[r['symbol'] for r in results]}")
-            except Exception as e:
-                print("Worker error:", e)
-            await asyncio.sleep(SLEEP_BETWEEN_BATCHES)
+                except Exception as e:
+                    WORKER_ERRORS.inc()
+                    logger.exception("Worker error: {}", e)
+                await asyncio.sleep(SLEEP_BETWEEN_BATCHES)
+        finally:
+            if refresher is not None:
+                refresher.cancel()
+            if self.shards is not None:
+                await self.shards.stop()
 
 
 if __name__ == "__main__":
@@ -141,7 +567,12 @@ if __name__ == "__main__":
     async def test_worker():
         print("⚡ Starting worker test...")
         worker = BotWorker()
-        results = await worker.run_once_batch()
+        try:
+            # one REST batch whatever INGEST_MODE: run_stream() never returns, run_forever() is the ws entry point
+            results = await worker.run_once_batch()
+        finally:
+            worker.scorer.close()
+            await close_client()
         for r in results:
             sym = r.get("symbol")
             summary = r.get("summary")
@@ -0,0 +1,212 @@
+# scanner/ws_ingest.py
+import asyncio
+import json
+import os
+import random
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+import aiohttp
+from loguru import logger
+from services.scanner.src.candle_store import CandleStore
+
+BITGET_WS_URL = os.getenv("BITGET_WS_URL", "wss://ws.bitget.com/v2/ws/public")
+WS_INST_TYPE = os.getenv("WS_INST_TYPE", "SPOT")
+# Bitget advises < 50 channels per connection for a stable stream
+WS_CHANNELS_PER_CONN = int(os.getenv("WS_CHANNELS_PER_CONN", 50))
+WS_PING_INTERVAL = float(os.getenv("WS_PING_INTERVAL", 25))  # server drops the connection after 2 min without ping
+WS_RECV_TIMEOUT = float(os.getenv("WS_RECV_TIMEOUT", 60))    # no frame (not even pong) for that long -> reconnect
+WS_RECONNECT_MAX = float(os.getenv("WS_RECONNECT_MAX", 30))  # seconds, cap of the exponential backoff
+WS_TICKERS = os.getenv("WS_TICKERS", "0") == "1"
+WS_RECORD_FILE = os.getenv("WS_RECORD_FILE", "")  # append raw frames (JSONL) for ws_replay
+
+# REST granularity -> WS candle channel
+WS_CANDLE_CHANNELS = {
+    "1min": "candle1m",
+    "5min": "candle5m",
+    "15min": "candle15m",
+    "30min": "candle30m",
+    "1h": "candle1H",
+    "4h": "candle4H",
+    "6h": "candle6H",
+    "12h": "candle12H",
+    "1day": "candle1D",
+    "3day": "candle3D",
+    "1week": "candle1W",
+}
+CHANNEL_GRANULARITY = {v: k for k, v in WS_CANDLE_CHANNELS.items()}
+
+BarCloseCallback = Callable[[str, str, int], None]      # (symbol, granularity, ts of the closed bar)
+GapFilledCallback = Callable[[List[str]], None]         # symbols refreshed over REST after a (re)connect
+
+
+class BitgetWsIngest:
+    """
+    Keeps a CandleStore up to date from the Bitget public websocket.
+
+    Channels are spread over several connections; each one pings, reconnects
+    with backoff and resubscribes on its own. After every (re)connect the
+    symbols of that connection are refreshed over REST (incremental fetch), so
+    bars missed while disconnected are filled in. `on_bar_close` fires when a
+    pushed candle opens a new bar, i.e. the previous one is closed.
+    """
+
+    def __init__(self, store: CandleStore, symbols: Sequence[str], granularities: Iterable[str] = ("1h", "1day"),
+                 on_bar_close: Optional[BarCloseCallback] = None, on_gap_filled: Optional[GapFilledCallback] = None,
+                 url: str = BITGET_WS_URL, inst_type: str = WS_INST_TYPE,
+                 channels_per_conn: int = WS_CHANNELS_PER_CONN, tickers: bool = WS_TICKERS,
+                 record_file: str = WS_RECORD_FILE):
+        self.store = store
+        self.symbols = list(symbols)
+        self.granularities = list(granularities)
+        for g in self.granularities:
+            if g not in WS_CANDLE_CHANNELS:
+                raise ValueError(f"no websocket candle channel for granularity {g!r}")
+        self.on_bar_close = on_bar_close
+        self.on_gap_filled = on_gap_filled
+        self.url = url
+        self.inst_type = inst_type
+        self.channels_per_conn = max(1, channels_per_conn)
+        self.with_tickers = tickers
+        self.record_file = record_file
+        self.tickers: Dict[str, dict] = {}  # last ticker push per symbol (WS_TICKERS=1)
+        self.stats = {"connects": 0, "reconnects": 0, "messages": 0, "candles": 0, "bar_closes": 0, "gap_fills": 0}
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._tasks: List[asyncio.Task] = []
+        self._record = None
+        self._record_t0 = None
+
+    def _sub_args(self) -> List[dict]:
+        args = []
+        for symbol in self.symbols:
+            for g in self.granularities:
+                args.append({"instType": self.inst_type, "channel": WS_CANDLE_CHANNELS[g], "instId": symbol})
+            if self.with_tickers:
+                args.append({"instType": self.inst_type, "channel": "ticker", "instId": symbol})
+        return args
+
+    def _shards(self) -> List[List[dict]]:
+        args = self._sub_args()
+        return [args[i:i + self.channels_per_conn] for i in range(0, len(args), self.channels_per_conn)]
+
+    async def start(self):
+        if self._tasks:
+            return
+        self._session = aiohttp.ClientSession()
+        self._tasks = [asyncio.create_task(self._run_conn(i, shard)) for i, shard in enumerate(self._shards())]
+        logger.info("ws ingest: {} channels over {} connections to {}",
+                    sum(len(s) for s in self._shards()), len(self._tasks), self.url)
+
+    async def stop(self):
+        for t in self._tasks:
+            t.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+        if self._record is not None:
+            self._record.close()
+            self._record = None
+
+    async def run(self):
+        await self.start()
+        try:
+            await asyncio.gather(*self._tasks)
+        finally:
+            await self.stop()
+
+    async def _run_conn(self, conn_id: int, args: List[dict]):
+        delay = 1.0
+        first = True
+        while True:
+            try:
+                async with self._session.ws_connect(self.url, autoping=True) as ws:
+                    self.stats["connects"] += 1
+                    if not first:
+                        self.stats["reconnects"] += 1
+                    first = False
+                    await ws.send_str(json.dumps({"op": "subscribe", "args": args}))
+                    delay = 1.0
+                    # subscribed first, then REST: whatever closes during the fill also arrives on the stream
+                    fill = asyncio.create_task(self._fill_gap(args))
+                    ping = asyncio.create_task(self._ping(ws))
+                    try:
+                        await self._read(ws)
+                    finally:
+                        ping.cancel()
+                        fill.cancel()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("ws connection {} lost: {!r}", conn_id, e)
+            await asyncio.sleep(delay * (0.5 + random.random() / 2))
+            delay = min(delay * 2, WS_RECONNECT_MAX)
+
+    async def _ping(self, ws):
+        while True:
+            await asyncio.sleep(WS_PING_INTERVAL)
+            await ws.send_str("ping")
+
+    async def _read(self, ws):
+        while True:
+            msg = await ws.receive(timeout=WS_RECV_TIMEOUT)
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                self._handle(msg.data)
+            elif msg.type in (aiohttp.WSMsgType.CLOSE, aiohttp.WSMsgType.CLOSING,
+                              aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                raise ConnectionError(f"websocket closed ({msg.type.name})")
+
+    async def _fill_gap(self, args: List[dict]):
+        pairs = [(a["instId"], CHANNEL_GRANULARITY[a["channel"]]) for a in args if a["channel"] in CHANNEL_GRANULARITY]
+        res = await asyncio.gather(*(self.store.refresh(s, g) for s, g in pairs), return_exceptions=True)
+        for (s, g), r in zip(pairs, res):
+            if isinstance(r, Exception):
+                logger.warning("ws gap fill failed for {} {}: {}", s, g, r)
+        self.stats["gap_fills"] += 1
+        if self.on_gap_filled is not None:
+            self.on_gap_filled(sorted({s for s, _ in pairs}))
+
+    def _record_frame(self, text: str):
+        if self._record is None:
+            self._record = open(self.record_file, "a", encoding="utf-8")
+            self._record_t0 = time.monotonic()
+        self._record.write(json.dumps({"t": round(time.monotonic() - self._record_t0, 3), "data": text}) + "\n")
+
+    def _handle(self, text: str):
+        if text == "pong":
+            return
+        self.stats["messages"] += 1
+        if self.record_file:
+            self._record_frame(text)
+        try:
+            j = json.loads(text)
+        except ValueError:
+            logger.warning("ws: unexpected frame {!r}", text[:200])
+            return
+        if "event" in j:
+            if j["event"] == "error":
+                logger.warning("ws error: {} {}", j.get("code"), j.get("msg"))
+            return
+        arg = j.get("arg") or {}
+        symbol = arg.get("instId")
+        channel = arg.get("channel")
+        data = j.get("data") or []
+        if channel == "ticker":
+            for d in data:
+                self.tickers[symbol] = d
+            return
+        granularity = CHANNEL_GRANULARITY.get(channel)
+        if granularity and symbol:
+            self._on_candles(symbol, granularity, data)
+
+    def _on_candles(self, symbol: str, granularity: str, rows: List[list]):
+        prev = self.store.last_ts(symbol, granularity)
+        self.store.merge(symbol, granularity, rows)
+        self.stats["candles"] += len(rows)
+        last = self.store.last_ts(symbol, granularity)
+        # a newer bar opened: the one at `prev` is closed
+        if prev is not None and last is not None and last > prev:
+            self.stats["bar_closes"] += 1
+            if self.on_bar_close is not None:
+                self.on_bar_close(symbol, granularity, prev)
+
@@ -0,0 +1,139 @@
+# scanner/ws_replay.py
+"""
+Serveur WebSocket local qui rejoue des trames Bitget enregistrées.
+
+Les trames viennent de WS_RECORD_FILE (une ligne JSON {"t": secondes, "data":
+trame brute} par message reçu par ws_ingest). Le serveur parle le protocole
+public v2: "ping" -> "pong", ack des "subscribe", puis renvoie à chaque client
+les trames des canaux auxquels il s'est abonné, au rythme enregistré
+(divisé par --speed). --drop-after coupe la connexion au bout de N trames
+pour exercer reconnexion + rattrapage REST.
+
+    python -m services.scanner.src.ws_replay frames.jsonl --port 8765 --speed 10
+    INGEST_MODE=ws BITGET_WS_URL=ws://127.0.0.1:8765/v2/ws/public python -m services.scanner.src.worker
+"""
+import argparse
+import asyncio
+import json
+import time
+from typing import List, Optional, Set, Tuple
+from aiohttp import WSMsgType, web
+
+WS_PATH = "/v2/ws/public"
+
+Frame = Tuple[float, Optional[Tuple[str, str]], str]  # (t, (channel, instId), raw)
+
+
+def _frame_key(text: str) -> Optional[Tuple[str, str]]:
+    try:
+        arg = json.loads(text).get("arg") or {}
+    except (ValueError, AttributeError):
+        return None
+    return arg.get("channel"), arg.get("instId")
+
+
+def load_frames(path: str) -> List[Frame]:
+    frames = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            rec = json.loads(line)
+            frames.append((float(rec.get("t", 0.0)), _frame_key(rec["data"]), rec["data"]))
+    frames.sort(key=lambda x: x[0])
+    return frames
+
+
+class ReplayServer:
+    def __init__(self, frames: List[Frame], speed: float = 1.0, loop: bool = False, drop_after: int = 0):
+        self.frames = frames
+        self.speed = speed if speed > 0 else 1.0
+        self.loop = loop
+        self.drop_after = drop_after
+        self.stats = {"connections": 0, "subscribed": 0, "sent": 0, "dropped": 0}
+        self._runner: Optional[web.AppRunner] = None
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application()
+        app.router.add_get(WS_PATH, self._handler)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        return f"ws://{host}:{port}{WS_PATH}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handler(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.stats["connections"] += 1
+        subscribed: Set[Tuple[str, str]] = set()
+        replay = None
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                if msg.data == "ping":
+                    await ws.send_str("pong")
+                    continue
+                req = json.loads(msg.data)
+                if req.get("op") != "subscribe":
+                    continue
+                for arg in req.get("args", []):
+                    subscribed.add((arg.get("channel"), arg.get("instId")))
+                    self.stats["subscribed"] += 1
+                    await ws.send_str(json.dumps({"event": "subscribe", "arg": arg}))
+                if replay is None:
+                    replay = asyncio.create_task(self._replay(ws, subscribed))
+        finally:
+            if replay is not None:
+                replay.cancel()
+        return ws
+
+    async def _replay(self, ws, subscribed: Set[Tuple[str, str]]):
+        sent = 0
+        while True:
+            t0 = time.monotonic()
+            for t, key, text in self.frames:
+                wait = t / self.speed - (time.monotonic() - t0)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                if key not in subscribed:
+                    continue
+                await ws.send_str(text)
+                sent += 1
+                self.stats["sent"] += 1
+                if self.drop_after and sent >= self.drop_after:
+                    self.stats["dropped"] += 1
+                    await ws.close()
+                    return
+            if not self.loop:
+                return
+
+
+async def _serve(args):
+    server = ReplayServer(load_frames(args.frames), speed=args.speed, loop=args.loop, drop_after=args.drop_after)
+    url = await server.start(args.host, args.port)
+    print(f"replaying {len(server.frames)} frames on {url}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded Bitget websocket frames")
+    parser.add_argument("frames", help="JSONL file written by ws_ingest (WS_RECORD_FILE)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed multiplier")
+    parser.add_argument("--loop", action="store_true", help="start over at the end of the file")
+    parser.add_argument("--drop-after", type=int, default=0, help="close each connection after N frames")
+    asyncio.run(_serve(parser.parse_args()))
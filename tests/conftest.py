@@ -0,0 +1,13 @@
+# tests/conftest.py
+import json
+import os
+import pytest
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+@pytest.fixture(scope="session")
+def bitget_candles():
+    """{symbol: {"1h" | "1day": lignes REST Bitget}} de fixtures/candles_bitget.json (voir record_candles.py)."""
+    with open(os.path.join(FIXTURES, "candles_bitget.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
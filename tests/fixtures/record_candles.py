@@ -0,0 +1,28 @@
+# tests/fixtures/record_candles.py
+# Réenregistre candles_bitget.json depuis l'API REST Bitget (mêmes symboles, mêmes profondeurs):
+#     python -m tests.fixtures.record_candles
+import asyncio
+import json
+import os
+from services.scanner.src.fetcher import get_candles
+from services.scanner.src.http_client import close_client
+
+FIXTURE = os.path.join(os.path.dirname(__file__), "candles_bitget.json")
+
+
+async def main():
+    with open(FIXTURE, "r", encoding="utf-8") as f:
+        current = json.load(f)
+    out = {}
+    try:
+        for symbol, by_gran in current.items():
+            out[symbol] = {g: await get_candles(symbol, g, limit=len(rows)) for g, rows in by_gran.items()}
+    finally:
+        await close_client()
+    with open(FIXTURE, "w", encoding="utf-8") as f:
+        json.dump(out, f, separators=(",", ":"))
+    print({s: {g: len(r) for g, r in v.items()} for s, v in out.items()})
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
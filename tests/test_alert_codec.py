@@ -0,0 +1,55 @@
+# tests/test_alert_codec.py
+import asyncio
+import json
+
+import pytest
+
+from services.scanner.src import alert_codec
+from services.scanner.src.alert_codec import decode_alert, encode_alert, trim_args
+
+
+def summary():
+    return {"1h": {"score": 0.7312345678, "norms": {"adx_norm": 0.5},
+                   "latest_raw": {"volume": 123456.789, "atr_pct": 0.0123, "adx": 31.25, "rsi": 41.0}},
+            "1d": {"score": 0.42, "latest_raw": {"volume": 9.5e6, "atr_pct": 0.05, "adx": 18.0, "rsi": float("nan")}}}
+
+
+def test_v2_round_trip_keeps_what_the_bot_renders():
+    fields = encode_alert("BTCUSDT", summary())
+    assert fields["v"] == "2" and fields["d"].startswith("BTCUSDT|0.731235|0.42|")
+    alert = decode_alert(fields)
+    assert alert["symbol"] == "BTCUSDT"
+    assert alert["score_1h"] == 0.731235 and alert["score_1d"] == 0.42
+    assert alert["summary"]["1h"]["latest_raw"] == {"volume": 123457.0, "atr_pct": 0.0123, "adx": 31.25, "rsi": 41.0}
+    raw_1d = alert["summary"]["1d"]["latest_raw"]
+    assert raw_1d["adx"] == 18.0 and raw_1d["rsi"] != raw_1d["rsi"]  # NaN reste NaN
+    # pas de norms en v2: seulement le score et les champs bruts affichés
+    assert set(alert["summary"]["1h"]) == {"score", "latest_raw"}
+
+
+def test_v1_entries_are_still_read():
+    legacy = {"symbol": "ETHUSDT", "score_1h": 0.8, "score_1d": 0.1, "summary": summary()}
+    assert decode_alert({"data": json.dumps(legacy)})["score_1h"] == 0.8
+    assert decode_alert({"json": json.dumps(legacy)})["symbol"] == "ETHUSDT"
+    assert decode_alert({"data": "{not json"}) == {"raw": "{not json"}
+    assert decode_alert({}) == {"raw": ""}
+
+
+def test_trim_args_prefers_retention_over_maxlen(monkeypatch):
+    monkeypatch.setattr(alert_codec.time, "time", lambda: 1_700_000_000.0)
+    assert trim_args(retention=3600, maxlen=100) == {"minid": f"{1_700_000_000_000 - 3_600_000}-0",
+                                                     "approximate": True}
+    assert trim_args(retention=0, maxlen=100) == {"maxlen": 100, "approximate": True}
+    assert trim_args(retention=0, maxlen=0) == {}
+
+
+def test_xadd_accepts_the_trim_args():
+    fakeredis = pytest.importorskip("fakeredis")
+
+    async def scenario():
+        r = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        await r.xadd("alerts", encode_alert("BTCUSDT", summary()), **trim_args(retention=0, maxlen=10))
+        (_, fields), = await r.xrange("alerts")
+        return decode_alert(fields)
+
+    assert asyncio.run(scenario())["symbol"] == "BTCUSDT"
@@ -0,0 +1,102 @@
+# tests/test_alert_listener.py
+# Livraison des alertes: groupe de consommateurs, XACK après envoi, reprise par XAUTOCLAIM, pas de doublon.
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+fakeredis = pytest.importorskip("fakeredis")
+
+from services.bot.src import utils  # noqa: E402
+from services.scanner.src.alert_codec import encode_alert  # noqa: E402
+
+CHAT = 42
+
+
+class BlockingFakeRedis(fakeredis.aioredis.FakeRedis):
+    # fakeredis rend la main tout de suite sur un XREADGROUP BLOCK sans entrée nouvelle: sans ce délai,
+    # la boucle du listener ne céderait jamais la boucle asyncio
+    async def xreadgroup(self, *args, block=None, **kwargs):
+        out = await super().xreadgroup(*args, block=block, **kwargs)
+        if block and not out:
+            await asyncio.sleep(0.01)
+        return out
+
+
+class FakeDelivery:
+    def __init__(self):
+        self.sent = []
+        self.down = False
+
+    async def submit(self, chat_id, text, digest_line=None):
+        if self.down:
+            raise ConnectionError("telegram down")
+        self.sent.append((chat_id, digest_line))
+
+
+def summary(score):
+    return {"1h": {"score": score, "latest_raw": {"volume": 1.0, "atr_pct": 0.01, "adx": 20.0, "rsi": 40.0}},
+            "1d": {"score": 0.1}}
+
+
+@pytest.fixture
+def setup(monkeypatch):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(utils.aioredis, "from_url",
+                        lambda *a, **k: BlockingFakeRedis(server=server, decode_responses=True))
+    delivery = FakeDelivery()
+    monkeypatch.setattr(utils, "get_delivery", lambda bot: delivery)
+
+    async def no_price(symbol):
+        return 1.0, 0.0, 0.0, 0.0
+
+    monkeypatch.setattr(utils, "compute_price_and_changes", no_price)
+    # tout message en attente est aussitôt récupérable, une passe XAUTOCLAIM à chaque tour
+    monkeypatch.setattr(utils, "ALERT_CLAIM_IDLE_MS", 0)
+    monkeypatch.setattr(utils, "ALERT_CLAIM_EVERY", 0.0)
+    return fakeredis.aioredis.FakeRedis(server=server, decode_responses=True), delivery
+
+
+def test_alert_left_pending_by_a_crashed_replica_is_sent_once(setup):
+    r, delivery = setup
+    group = utils.alert_group_name(CHAT)
+
+    async def scenario():
+        await utils.ensure_alert_group(r, group)
+        msg_id = await r.xadd(utils.ALERT_STREAM, encode_alert("BTCUSDT", summary(0.9)))
+        # replica A lit l'entrée puis l'envoi échoue (plantage avant XACK): elle reste en attente chez A
+        (_, [(read_id, fields)]), = await r.xreadgroup(group, "a", {utils.ALERT_STREAM: ">"})
+        delivery.down = True
+        assert not await utils.deliver_alert(r, None, CHAT, group, read_id, fields)
+        delivery.down = False
+        pending_a = (await r.xpending(utils.ALERT_STREAM, group))["pending"]
+
+        # replica B la récupère par XAUTOCLAIM
+        task = asyncio.create_task(utils.alert_listener(None, CHAT, consumer="b"))
+        for _ in range(100):
+            if delivery.sent:
+                break
+            await asyncio.sleep(0.02)
+        await asyncio.sleep(0.1)
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+        # A redémarre avec l'entrée encore en main (ack perdu): la clé bot:alert_sent: empêche un second envoi
+        assert await utils.deliver_alert(r, None, CHAT, group, msg_id, fields)
+        return msg_id, pending_a, (await r.xpending(utils.ALERT_STREAM, group))["pending"]
+
+    msg_id, pending_a, pending_end = asyncio.run(scenario())
+    assert pending_a == 1
+    assert delivery.sent == [(CHAT, utils.winner_digest_line("BTCUSDT", 0.9, 0.0))]
+    assert pending_end == 0
+
+
+def test_group_creation_is_idempotent(setup):
+    r, _ = setup
+
+    async def scenario():
+        await utils.ensure_alert_group(r, "bots:1")
+        await utils.ensure_alert_group(r, "bots:1")
+        return await r.xinfo_groups(utils.ALERT_STREAM)
+
+    assert [g["name"] for g in asyncio.run(scenario())] == ["bots:1"]
@@ -0,0 +1,36 @@
+# tests/test_candle_store.py
+import asyncio
+
+from services.scanner.src import candle_store
+from services.scanner.src.candle_archive import CandleArchive
+from services.scanner.src.candle_store import GRANULARITY_MS, CandleStore
+
+BAR = GRANULARITY_MS["1h"]
+T0 = 1_700_000_000_000 // BAR * BAR
+
+
+def bar(ts, close=1.0):
+    return [str(ts), "1", "1", "1", str(close), "1", "1", "1"]
+
+
+def test_merge_queues_closed_bars_and_flush_writes_them(monkeypatch, tmp_path):
+    clock = [(T0 + 3 * BAR + 1) / 1000]
+    monkeypatch.setattr(candle_store.time, "time", lambda: clock[0])
+    archive = CandleArchive(str(tmp_path))
+    store = CandleStore(archive=archive)
+
+    store.merge("BTCUSDT", "1h", [bar(T0 + i * BAR) for i in range(4)])
+    # pushes WS sur la barre en cours: rien sur disque, rien de plus dans la file
+    for close in (1.1, 1.2, 1.3):
+        store.merge("BTCUSDT", "1h", [bar(T0 + 3 * BAR, close)])
+    assert archive.read("BTCUSDT", "1h").size == 0
+    assert asyncio.run(store.flush_archive()) == 3
+
+    # la barre en cours ferme quand la suivante arrive
+    clock[0] += BAR / 1000
+    store.merge("BTCUSDT", "1h", [bar(T0 + 4 * BAR)])
+    assert asyncio.run(store.flush_archive()) == 1
+    assert asyncio.run(store.flush_archive()) == 0
+    saved = archive.read("BTCUSDT", "1h")
+    assert list(saved["ts"]) == [T0 + i * BAR for i in range(4)]
+    assert float(saved["close"][-1]) == 1.3
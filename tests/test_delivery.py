@@ -0,0 +1,32 @@
+# tests/test_delivery.py
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+
+from services.bot.src.delivery import DeliveryQueue  # noqa: E402
+
+
+class StuckBot:
+    def __init__(self):
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent.append(text)
+        await asyncio.Event().wait()
+
+
+def test_close_cancels_queued_and_in_flight_messages():
+    async def scenario():
+        dq = DeliveryQueue(StuckBot(), digest_window=0)
+        futures = [dq.submit(1, f"msg {i}") for i in range(3)]
+        await asyncio.sleep(0.01)
+        # le premier message est en cours d'envoi, les deux autres attendent derrière
+        await dq.close()
+        return futures, dq
+
+    futures, dq = asyncio.run(scenario())
+    assert all(f.cancelled() for f in futures)
+    assert dq.bot.sent == ["msg 0"]
+    assert not dq._queues[1] and not dq._runners
@@ -0,0 +1,116 @@
+# tests/test_metrics.py
+# Rendu exact du format texte Prometheus 0.0.4 et garde-fou du registre.
+import asyncio
+import importlib
+
+import pytest
+
+from services.scanner.src import metrics
+from services.scanner.src.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_and_gauge_render_exact_lines():
+    reg = Registry()
+    c = Counter("t_requests_total", "Requests by path", ["path", "status"], registry=reg)
+    c.labels("/a", 200).inc()
+    c.labels("/a", 200).inc(2)
+    # antislash, retour à la ligne et guillemet sont échappés dans la valeur du label
+    c.labels('x\\y\n"z"', "error").inc()
+    g = Gauge("t_rate", "Last throughput", registry=reg)
+    g.set(2.5)
+
+    assert reg.render().splitlines() == [
+        "# HELP t_requests_total Requests by path",
+        "# TYPE t_requests_total counter",
+        't_requests_total{path="/a",status="200"} 3',
+        't_requests_total{path="x\\\\y\\n\\"z\\"",status="error"} 1',
+        "# HELP t_rate Last throughput",
+        "# TYPE t_rate gauge",
+        "t_rate 2.5",
+    ]
+
+
+def test_histogram_buckets_are_cumulative_with_sum_and_count():
+    reg = Registry()
+    h = Histogram("t_seconds", "Latency", ["mode"], buckets=(0.1, 1, float("inf")), registry=reg)
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.labels("batch").observe(v)
+
+    assert reg.render().splitlines() == [
+        "# HELP t_seconds Latency",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{mode="batch",le="0.1"} 2',
+        't_seconds_bucket{mode="batch",le="1"} 3',
+        't_seconds_bucket{mode="batch",le="+Inf"} 4',
+        't_seconds_sum{mode="batch"} 3.65',
+        't_seconds_count{mode="batch"} 4',
+    ]
+
+
+def test_callbacks_render_at_scrape_time_and_errors_are_skipped():
+    reg = Registry()
+    stats = {"hits": 1}
+    reg.callback("t_cache_hits_total", "Cache hits", lambda: stats["hits"], kind="counter")
+    reg.callback("t_queue", "Queue depth", lambda: {"a": 2, "b": None}, labelnames=["shard"])
+    reg.callback("t_broken", "Broken source", lambda: 1 / 0)
+    stats["hits"] = 7
+
+    assert reg.render().splitlines() == [
+        "# HELP t_cache_hits_total Cache hits",
+        "# TYPE t_cache_hits_total counter",
+        "t_cache_hits_total 7",
+        "# HELP t_queue Queue depth",
+        "# TYPE t_queue gauge",
+        't_queue{shard="a"} 2',
+    ]
+
+
+def test_reregistering_a_name_as_another_kind_raises():
+    reg = Registry()
+    reg.callback("t_items", "Items", lambda: 1)
+    # même nom, même nature: une nouvelle instance de worker rebranche son callback
+    reg.callback("t_items", "Items", lambda: 2)
+    assert reg.render().splitlines()[-1] == "t_items 2"
+
+    with pytest.raises(ValueError):
+        reg.callback("t_items", "Items", lambda: 3, kind="counter")
+    with pytest.raises(ValueError):
+        Counter("t_items", "Items", registry=reg)
+    Counter("t_total", "Total", registry=reg)
+    with pytest.raises(ValueError):
+        Histogram("t_total", "Total", registry=reg)
+    assert reg.render().splitlines()[-1] == "t_total 0"
+
+
+def test_process_registry_is_served_by_the_app(monkeypatch):
+    pytest.importorskip("fastapi")
+    pytest.importorskip("uvicorn")
+    pytest.importorskip("dotenv")
+    pytest.importorskip("aiogram")
+    monkeypatch.setenv("TELEGRAM_TOKEN", "123456:TEST")
+    main = importlib.import_module("main")
+
+    metrics.SYMBOLS_PER_SECOND.set(12.5)
+    resp = main.metrics()
+    assert resp.media_type == metrics.CONTENT_TYPE
+    lines = resp.body.decode().splitlines()
+    assert "# TYPE scanner_symbols_per_second gauge" in lines
+    assert "scanner_symbols_per_second 12.5" in lines
+
+
+def test_serve_exposes_metrics_over_http():
+    aiohttp = pytest.importorskip("aiohttp")
+
+    async def scenario():
+        runner = await metrics.serve(port=0, host="127.0.0.1")
+        try:
+            port = runner.addresses[0][1]
+            async with aiohttp.ClientSession() as s:
+                async with s.get(f"http://127.0.0.1:{port}/metrics") as resp:
+                    return resp.headers["Content-Type"], await resp.text()
+        finally:
+            await runner.cleanup()
+
+    ctype, body = asyncio.run(scenario())
+    assert ctype == metrics.CONTENT_TYPE
+    assert body == metrics.render()
@@ -0,0 +1,96 @@
+# tests/test_price_cache.py
+# Le bot lit bot:price:<symbol> écrit par le worker et ne retombe sur l'API REST qu'en cas d'absence.
+import asyncio
+
+import pytest
+
+pytest.importorskip("aiogram")
+fakeredis = pytest.importorskip("fakeredis")
+
+from services.bot.src import utils  # noqa: E402
+from services.scanner.src.price_cache import (PRICE_CACHE_PREFIX, PRICE_CACHE_TTL, decode_price,  # noqa: E402
+                                              encode_price, price_from_candles, set_cached_price)
+
+
+@pytest.fixture
+def bot_env(monkeypatch, bitget_candles):
+    r = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(utils, "_redis", r)
+    calls = []
+
+    async def fake_get_candles(symbol, granularity, limit=200):
+        calls.append((symbol, granularity))
+        if symbol not in bitget_candles:
+            raise RuntimeError("unknown symbol")
+        return bitget_candles[symbol][granularity][-limit:]
+
+    monkeypatch.setattr(utils, "get_candles", fake_get_candles)
+    return r, calls
+
+
+def test_miss_fetches_over_rest_and_fills_the_cache(bot_env, bitget_candles):
+    r, calls = bot_env
+    by_gran = bitget_candles["BTCUSDT"]
+
+    async def scenario():
+        first = await utils.compute_price_and_changes("BTCUSDT")
+        second = await utils.compute_price_and_changes("BTCUSDT")
+        return first, second, await r.ttl(PRICE_CACHE_PREFIX + "BTCUSDT")
+
+    first, second, ttl = asyncio.run(scenario())
+    assert calls == [("BTCUSDT", "1h"), ("BTCUSDT", "1day")]
+    # même calcul côté bot (REST) et côté worker (bougies déjà téléchargées)
+    assert first == pytest.approx(price_from_candles(by_gran["1h"], by_gran["1day"]), rel=1e-12)
+    assert second == first
+    assert 0 < ttl <= PRICE_CACHE_TTL
+
+
+def test_value_written_by_the_worker_is_served_until_it_expires(bot_env):
+    r, calls = bot_env
+    key = PRICE_CACHE_PREFIX + "PEPEUSDT"
+
+    async def scenario():
+        await set_cached_price(r, "PEPEUSDT", (1.5, 0.01, None, -0.2))
+        hit = await utils.compute_price_and_changes("PEPEUSDT")
+        assert calls == []
+        # expiration de la clé: retour à l'exchange
+        await r.pexpire(key, 1)
+        await asyncio.sleep(0.01)
+        miss = await utils.compute_price_and_changes("PEPEUSDT")
+        return hit, miss, await r.get(key)
+
+    hit, miss, raw = asyncio.run(scenario())
+    assert hit == (1.5, 0.01, None, -0.2)
+    assert calls == [("PEPEUSDT", "1h"), ("PEPEUSDT", "1day")]
+    assert decode_price(raw) == miss != hit
+
+
+def test_failed_fetch_is_not_cached(bot_env):
+    r, calls = bot_env
+
+    async def scenario():
+        values = await utils.compute_price_and_changes("NOPEUSDT")
+        return values, await r.exists(PRICE_CACHE_PREFIX + "NOPEUSDT")
+
+    values, cached = asyncio.run(scenario())
+    assert values == (0.0, None, None, None)
+    assert not cached
+
+
+def test_redis_down_falls_back_to_rest(bot_env, monkeypatch):
+    _, calls = bot_env
+
+    async def down():
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(utils, "ensure_redis", down)
+    values = asyncio.run(utils.compute_price_and_changes("BTCUSDT"))
+    assert len(calls) == 2 and None not in values
+
+
+def test_codec_round_trip_and_garbage():
+    values = (0.000123, -0.05, None, 1.25)
+    assert decode_price(encode_price(values)) == values
+    assert decode_price(None) is None
+    assert decode_price("1|2") is None
+    assert decode_price("a|b|c|d") is None
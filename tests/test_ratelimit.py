@@ -0,0 +1,38 @@
+# tests/test_ratelimit.py
+import asyncio
+import time
+
+from services.scanner.src.ratelimit import RequestLimiter
+
+
+def test_limiter_survives_successive_event_loops():
+    # le bot fait un asyncio.run() par /run avec le même MARKET_LIMITER (niveau module)
+    limiter = RequestLimiter(max_in_flight=1, rate=1000, burst=1)
+    in_flight = []
+
+    async def one():
+        async with limiter:
+            in_flight.append(1)
+            assert len(in_flight) == 1
+            await asyncio.sleep(0.005)
+            in_flight.pop()
+
+    async def burst():
+        await asyncio.gather(*(one() for _ in range(4)))
+
+    for _ in range(3):
+        asyncio.run(burst())
+
+
+def test_token_budget_is_shared_across_loops():
+    limiter = RequestLimiter(max_in_flight=4, rate=20, burst=1)
+
+    async def one():
+        async with limiter:
+            pass
+
+    t0 = time.monotonic()
+    for _ in range(3):
+        asyncio.run(one())
+    # burst de 1 puis 20/s: la 3e requête attend ~0.1 s même dans une nouvelle boucle
+    assert time.monotonic() - t0 >= 0.09
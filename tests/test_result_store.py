@@ -0,0 +1,77 @@
+# tests/test_result_store.py
+import asyncio
+
+import pytest
+
+from services.scanner.src import result_store
+from services.scanner.src.result_store import REDIS_TOP_PREFIX, RESULT_TTL, ResultBatch
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+PREFIX = "bot:result:"
+
+
+def summary(score):
+    return {tf: {"score": score} for tf in ("1h", "1d")}
+
+
+def test_flush_prunes_scores_older_than_the_result_ttl(monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(result_store.time, "time", lambda: clock[0])
+
+    async def scenario():
+        r = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        batch = ResultBatch(PREFIX, "alerts")
+        batch.add_result("GONEUSDT", summary(0.9))
+        batch.add_result("LIVEUSDT", summary(0.5))
+        await batch.flush(r)
+        # GONEUSDT n'est plus rescoré (délisté, filtré...), LIVEUSDT l'est juste avant le TTL 1h
+        clock[0] += RESULT_TTL["1h"] - 60
+        batch.add_result("LIVEUSDT", summary(0.6))
+        await batch.flush(r)
+        clock[0] += 120
+        batch.add_result("LIVEUSDT", summary(0.7))
+        await batch.flush(r)
+        return {tf: await r.zrange(REDIS_TOP_PREFIX + tf, 0, -1, withscores=True) for tf in ("1h", "1d")}
+
+    ranks = asyncio.run(scenario())
+    assert ranks["1h"] == [("LIVEUSDT", 0.7)]
+    # TTL 1d pas encore écoulé: GONEUSDT y reste jusqu'à l'expiration de son résultat 1d
+    assert ranks["1d"] == [("LIVEUSDT", 0.7), ("GONEUSDT", 0.9)]
+
+
+def test_remove_takes_a_symbol_out_of_every_ranking():
+    async def scenario():
+        r = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        batch = ResultBatch(PREFIX, "alerts")
+        batch.add_result("AUSDT", summary(0.4))
+        batch.add_result("BUSDT", summary(0.8))
+        await batch.flush(r)
+        batch.remove("BUSDT")
+        await batch.flush(r)
+        return ({tf: await r.zrange(REDIS_TOP_PREFIX + tf, 0, -1) for tf in ("1h", "1d")},
+                await r.zrange(REDIS_TOP_PREFIX + "1h:seen", 0, -1))
+
+    ranks, seen = asyncio.run(scenario())
+    assert ranks == {"1h": ["AUSDT"], "1d": ["AUSDT"]}
+    assert seen == ["AUSDT"]
+
+
+def test_top_symbols_skips_members_whose_result_expired():
+    async def scenario():
+        r = fakeredis.aioredis.FakeRedis(decode_responses=True)
+        batch = ResultBatch(PREFIX, "alerts")
+        for i in range(30):
+            batch.add_result(f"S{i:02d}USDT", summary(i / 100))
+        await batch.flush(r)
+        # résultats expirés avant le prune du prochain flush: les meilleurs scores
+        await r.delete(*[f"{PREFIX}S{i:02d}USDT:1h" for i in range(20, 30)])
+        top = await result_store.top_symbols(r, "1h", 5)
+        in_range = await result_store.symbols_in_range(r, "1h", 0.15, 1.0)
+        return top, in_range, await r.zcard(REDIS_TOP_PREFIX + "1h")
+
+    top, in_range, left = asyncio.run(scenario())
+    assert [m for m, _ in top] == [f"S{i:02d}USDT" for i in range(19, 14, -1)]
+    assert [m for m, _ in in_range] == [f"S{i:02d}USDT" for i in range(19, 14, -1)]
+    assert left == 20
@@ -0,0 +1,26 @@
+# tests/test_scheduler.py
+import json
+
+from services.scanner.src.scheduler import SymbolScheduler, merge_snapshots
+
+
+def test_shard_snapshots_merge_into_one_queue():
+    now = 1_000_000.0
+    a = SymbolScheduler(["AUSDT", "BUSDT"], hot_interval=600, cold_interval=3600, max_staleness=3600)
+    b = SymbolScheduler(["CUSDT"], hot_interval=600, cold_interval=3600, max_staleness=3600)
+    a.update("AUSDT", 0.9, 1e9, now=now - 900)
+    a.update("BUSDT", 0.0, 1e3, now=now - 60)
+    # le shard B a écrit son dernier batch 5 min avant le shard A
+    raw_a = json.dumps(a.snapshot(now=now))
+    raw_b = json.dumps(b.snapshot(now=now - 300))
+
+    snap = merge_snapshots([None, raw_a, raw_b], now=now)
+    assert snap["snapshots"] == 2
+    assert (snap["symbols"], snap["never_scanned"]) == (3, 1)
+    # CUSDT jamais scanné et AUSDT (chaud, 10 min) sont dus; BUSDT (froid) ne l'est pas
+    assert snap["due"] == 2
+    assert [e["symbol"] for e in snap["queue"]] == ["CUSDT", "AUSDT", "BUSDT"]
+    assert [e["due_in"] for e in snap["queue"][1:]] == [-300, 3540]
+    hot = snap["queue"][1]
+    assert hot["heat"] == 1.0 and hot["interval"] == 600
+    assert merge_snapshots([None]) is None
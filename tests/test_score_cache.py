@@ -0,0 +1,80 @@
+# tests/test_score_cache.py
+import numpy as np
+import pytest
+
+from services.scanner.src import score_cache
+from services.scanner.src.score_cache import ScoreCache
+from services.scanner.src.scoring import parse_candles
+
+HOUR = 3_600_000
+
+
+@pytest.fixture
+def candles(bitget_candles):
+    return parse_candles(bitget_candles["BTCUSDT"]["1h"])
+
+
+def with_live_close(candles: np.ndarray, close: float) -> np.ndarray:
+    out = candles.copy()
+    out[-1]["close"] = close
+    return out
+
+
+def test_include_keys_on_the_live_bar_values(candles):
+    cache = ScoreCache(live_bar="include")
+    now = int(candles[-1]["ts"]) + HOUR // 2
+    key, scored = cache.key("BTCUSDT", "1h", candles, now)
+    assert len(scored) == len(candles)
+    assert cache.key("BTCUSDT", "1h", candles.copy(), now)[0] == key
+    assert cache.key("BTCUSDT", "1h", with_live_close(candles, 1.0), now)[0] != key
+
+
+def test_stale_reuses_the_summary_until_the_bar_closes(candles):
+    cache = ScoreCache(live_bar="stale")
+    now = int(candles[-1]["ts"]) + HOUR // 2
+    key, scored = cache.key("BTCUSDT", "1h", candles, now)
+    assert len(scored) == len(candles)
+    assert cache.key("BTCUSDT", "1h", with_live_close(candles, 1.0), now)[0] == key
+    # une nouvelle barre: la fenêtre glisse, la clé change
+    assert cache.key("BTCUSDT", "1h", candles[1:], now + HOUR)[0] != key
+
+
+def test_exclude_drops_the_live_bar(candles):
+    cache = ScoreCache(live_bar="exclude")
+    now = int(candles[-1]["ts"]) + HOUR // 2
+    key, scored = cache.key("BTCUSDT", "1h", candles, now)
+    assert len(scored) == len(candles) - 1
+    assert cache.key("BTCUSDT", "1h", with_live_close(candles, 1.0), now)[0] == key
+    # une heure après son ouverture, la dernière barre 1h est close et reste dans la clé
+    closed_key, closed = cache.key("BTCUSDT", "1h", candles, int(candles[-1]["ts"]) + HOUR)
+    assert len(closed) == len(candles) and closed_key != key
+    # en 1d la même barre est encore en cours: durée de barre prise de GRANULARITY_MS["1day"]
+    assert len(cache.key("BTCUSDT", "1d", candles, now + HOUR)[1]) == len(candles) - 1
+
+
+def test_new_closed_bar_invalidates_the_key(candles):
+    for policy in score_cache.LIVE_BAR_POLICIES:
+        cache = ScoreCache(live_bar=policy)
+        old = cache.key("BTCUSDT", "1h", candles[:-1], int(candles[-1]["ts"]) + HOUR)[0]
+        new = cache.key("BTCUSDT", "1h", candles, int(candles[-1]["ts"]) + HOUR)[0]
+        assert old != new, policy
+
+
+def test_lru_eviction_and_ttl_expiry(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(score_cache.time, "monotonic", lambda: clock[0])
+    cache = ScoreCache(maxsize=2, ttl=60)
+    cache.put("a", {"score": 0.1})
+    cache.put("b", {"score": 0.2})
+    assert cache.get("a") == {"score": 0.1}  # "a" devient le plus récent
+    cache.put("c", {"score": 0.3})
+    assert cache.get("b") is None and len(cache) == 2
+    clock[0] += 61
+    assert cache.get("a") is None and cache.get("c") is None
+    assert cache.stats == {"hits": 1, "misses": 3, "expired": 2, "evictions": 1}
+    assert len(cache) == 0
+
+
+def test_unknown_policy_is_rejected():
+    with pytest.raises(ValueError):
+        ScoreCache(live_bar="sometimes")
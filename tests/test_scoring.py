@@ -0,0 +1,76 @@
+# tests/test_scoring.py
+# Le backend par défaut (SCORING_BACKEND=numba, lignes Bitget -> tableau typé) doit donner les mêmes
+# scores que le chemin historique pandas_ta + DataFrame.
+import numpy as np
+import pytest
+
+from services.scanner.src import scoring
+from services.scanner.src.scoring import (CANDLE_DTYPE, compute_scores_from_ohlcv, ohlcv_to_df, parse_candles,
+                                          score_timeframe)
+
+
+def test_default_backend_is_a_kernel_backend():
+    assert scoring.resolve_backend(None) in ("numba", "numpy")
+
+
+def test_parse_candles_matches_ohlcv_to_df(bitget_candles):
+    for by_gran in bitget_candles.values():
+        for rows in by_gran.values():
+            candles = parse_candles(rows)
+            df = ohlcv_to_df(rows)
+            assert candles.dtype == CANDLE_DTYPE
+            for col in ("open", "high", "low", "close", "volume"):
+                # le parseur de pd.to_numeric peut différer d'un ulp de float(str)
+                np.testing.assert_allclose(candles[col], df[col].to_numpy(), rtol=1e-15, atol=0)
+
+
+@pytest.mark.parametrize("backend", ["numba", "numpy"])
+def test_scores_match_pandas_ta_on_recorded_candles(bitget_candles, backend):
+    for symbol, by_gran in bitget_candles.items():
+        want = compute_scores_from_ohlcv(by_gran["1h"], by_gran["1day"], backend="pandas_ta")
+        got = compute_scores_from_ohlcv(by_gran["1h"], by_gran["1day"], backend=backend)
+        for label in ("1h", "1d"):
+            assert ("error" in got[label]) == ("error" in want[label]), (symbol, label)
+            assert got[label]["score"] == pytest.approx(want[label]["score"], rel=1e-9, abs=1e-12), (symbol, label)
+            for k, v in want[label].get("norms", {}).items():
+                if k != "raw":
+                    assert got[label]["norms"][k] == pytest.approx(v, rel=1e-9, abs=1e-12), (symbol, label, k)
+
+
+def test_score_timeframe_accepts_rows_and_typed_arrays(bitget_candles):
+    rows = bitget_candles["BTCUSDT"]["1h"]
+    assert score_timeframe(rows)["score"] == score_timeframe(parse_candles(rows))["score"]
+
+
+def test_batch_scores_match_per_symbol_scores(bitget_candles):
+    from services.scanner.src.batch_scoring import batch_scores_from_ohlcv
+    # NEWUSDT: 40 barres 1h et 2 barres 1d, pas de ligne complète; EMPTYUSDT: aucune bougie
+    h1 = {s: by_gran["1h"] for s, by_gran in bitget_candles.items()}
+    d1 = {s: by_gran["1day"] for s, by_gran in bitget_candles.items()}
+    h1["EMPTYUSDT"], d1["EMPTYUSDT"] = [], []
+    got = batch_scores_from_ohlcv(h1, d1)
+    for symbol in h1:
+        want = compute_scores_from_ohlcv(h1[symbol], d1[symbol], backend="numpy")
+        for label in ("1h", "1d"):
+            assert got[symbol][label].get("error") == want[label].get("error"), (symbol, label)
+            assert got[symbol][label]["score"] == pytest.approx(want[label]["score"], rel=1e-9, abs=1e-12)
+            for k, v in want[label].get("norms", {}).items():
+                if k != "raw":
+                    assert got[symbol][label]["norms"][k] == pytest.approx(v, rel=1e-9, abs=1e-12), (symbol, k)
+    assert got["NEWUSDT"]["1h"]["error"] == "insufficient data after indicators"
+    assert got["EMPTYUSDT"]["1d"]["error"] == "no data"
+
+
+def test_batch_norms_clamp_like_the_scalar_path():
+    from services.scanner.src.batch_scoring import NORM_KEYS, compute_norms_batch
+    # NaN -> 1.0 (min/max Python), inf borné, RSI nul -> 50, vol_ma20 nul -> ratio 0
+    rows = [
+        {"volume": 10.0, "vol_ma20": 0.0, "atr_pct": np.nan, "vol_spike_ratio": np.inf, "adx": np.nan, "rsi": 0.0},
+        {"volume": 5.0, "vol_ma20": 2.0, "atr_pct": 0.2, "vol_spike_ratio": -1.0, "adx": 25.0, "rsi": np.nan},
+    ]
+    batch = compute_norms_batch({k: np.array([r[k] for r in rows]) for k in rows[0]})
+    for i, row in enumerate(rows):
+        want = scoring.compute_norms_from_indicator_df(row)
+        for k in NORM_KEYS:
+            assert batch[k][i] == want[k], (i, k)
+    assert batch["atr_pct_norm"][0] == 1.0 and batch["adx_norm"][0] == 1.0
@@ -0,0 +1,62 @@
+# tests/test_shards.py
+# Ce que les replicas partagent via redis: budget de requêtes et génération de sweep (scripts Lua).
+import asyncio
+import time
+
+import pytest
+
+from services.scanner.src.ratelimit import TokenBucket
+from services.scanner.src.shards import ShardLeases, SharedTokenBucket
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+GEN_KEY = "bot:sweep:gen"
+
+
+def redis_clients(n):
+    server = fakeredis.FakeServer()
+    return [fakeredis.aioredis.FakeRedis(server=server, decode_responses=True) for _ in range(n)]
+
+
+def test_shared_bucket_rate_holds_across_replicas():
+    async def scenario():
+        # deux replicas, chacun avec son seau local de 20 req/s: ensemble ils ne doivent pas dépasser 20 req/s
+        buckets = [SharedTokenBucket(r, TokenBucket(20, 1)) for r in redis_clients(2)]
+        t0 = time.monotonic()
+        await asyncio.gather(*(b.acquire() for b in buckets for _ in range(5)))
+        return time.monotonic() - t0
+
+    # 10 jetons, 1 d'avance: 9 / 20 req/s
+    assert asyncio.run(scenario()) >= 0.4
+
+
+def test_shared_bucket_falls_back_to_local_bucket():
+    class Down:
+        def register_script(self, _script):
+            async def call(**_kwargs):
+                raise ConnectionError("redis down")
+            return call
+
+    local = TokenBucket(1000, 5)
+    bucket = SharedTokenBucket(Down(), local)
+    asyncio.run(bucket.acquire())
+    assert local._tokens < 5
+
+
+def test_sweep_generation_moves_once_every_shard_finished():
+    async def scenario():
+        a, b = redis_clients(2)
+        leases_a = ShardLeases(a, n_shards=4, worker_id="a")
+        leases_b = ShardLeases(b, n_shards=4, worker_id="b")
+        gens = [await leases_a.pass_done({0, 1}, GEN_KEY)]
+        # un shard rapide qui repasse ne compte qu'une fois
+        gens.append(await leases_a.pass_done({0}, GEN_KEY))
+        gens.append(await leases_b.pass_done({2}, GEN_KEY))
+        gens.append(await leases_b.pass_done({3}, GEN_KEY))
+        gens.append(await leases_a.pass_done({0, 1}, GEN_KEY))
+        return gens, await a.get(GEN_KEY)
+
+    gens, stored = asyncio.run(scenario())
+    assert gens == [0, 0, 0, 1, 0]
+    assert stored == "1"
@@ -0,0 +1,94 @@
+# tests/test_streaming_indicators.py
+# IndicatorState (mise à jour O(1) par bougie) contre pandas_ta recalculé sur tout l'historique.
+import numpy as np
+import pandas_ta as ta
+import pytest
+
+from services.scanner.src.scoring import compute_indicators, compute_scores_from_ohlcv, ohlcv_to_df
+from services.scanner.src.streaming_indicators import IndicatorState, score_latest
+
+COLUMNS = ("atr", "atr_pct", "rsi", "adx", "ma20", "ma50", "vol_ma20", "vol_spike_ratio")
+
+
+def reference_latest(rows):
+    df = compute_indicators(ohlcv_to_df(rows), "pandas_ta")
+    return None if df.empty else df.iloc[-1]
+
+
+def assert_matches(got, want, where):
+    if want is None:
+        assert got is None, where
+        return
+    assert got is not None, where
+    assert got["timestamp"] == want.name.value // 10**6, where
+    for col in COLUMNS:
+        assert got[col] == pytest.approx(float(want[col]), rel=1e-9, abs=0, nan_ok=True), (where, col)
+
+
+def rows_from(high, low, close, t0=1_700_000_000_000, step=3_600_000):
+    return [[str(t0 + i * step), repr(float(c)), repr(float(h)), repr(float(l)), repr(float(c)), "10.0", "100.0", "100.0"]
+            for i, (h, l, c) in enumerate(zip(high, low, close))]
+
+
+def test_each_push_matches_pandas_ta_on_recorded_candles(bitget_candles):
+    for symbol, by_gran in bitget_candles.items():
+        for gran, rows in by_gran.items():
+            state = IndicatorState()
+            for k, row in enumerate(rows, start=1):
+                state.push_row(row)
+                # une barre sur cinq suffit (pandas_ta recalcule tout à chaque fois), plus la dernière
+                if k % 5 == 0 or k == len(rows):
+                    assert_matches(state.latest(), reference_latest(rows[:k]), (symbol, gran, k))
+
+
+def test_in_progress_bar_updates_replace_the_last_bar(bitget_candles):
+    rows = bitget_candles["BTCUSDT"]["1h"]
+    state = IndicatorState.from_rows(rows[:-1])
+    last = list(rows[-1])
+    # le même ts poussé plusieurs fois (ticks WS) ne clôture rien
+    for close in ("1.0", last[3], last[4]):
+        state.push_row(last[:4] + [close] + last[5:])
+    assert state.bars == len(rows) - 1
+    assert_matches(state.latest(), reference_latest(rows), "BTCUSDT 1h")
+
+
+def test_catch_up_pushes_only_new_bars(bitget_candles):
+    rows = bitget_candles["PEPEUSDT"]["1h"]
+    state = IndicatorState.from_rows(rows[:200])
+    # fenêtre glissante de 200 bougies comme CandleStore, 3 bougies plus loin
+    assert state.catch_up(rows[3:203])
+    assert state.bars == 202
+    assert_matches(state.latest(), reference_latest(rows[:203]), "PEPEUSDT 1h")
+    # trou plus long que la fenêtre: à reconstruire
+    assert not state.catch_up(rows[230:])
+
+
+@pytest.mark.parametrize("case", ["flat_start", "all_flat"])
+def test_flat_bars_get_pandas_ta_eps(case):
+    # barres plates: pandas_ta ajoute eps à high - low, l'ATR vaut eps et pas 0 (RSI NaN, d'où la série brute)
+    rng = np.random.default_rng(3)
+    close = np.cumprod(1 + rng.normal(0, 0.01, 60)) * 10
+    high, low = close * 1.004, close * 0.996
+    n = 30 if case == "flat_start" else len(close)
+    high[:n] = low[:n] = close[:n] = close[n - 1]
+    rows = rows_from(high, low, close)
+    state = IndicatorState()
+    for k, row in enumerate(rows, start=1):
+        got = state.push_row(row)["atr"]
+        if k <= 15:
+            continue  # pandas_ta ne rend rien sur une série à peine plus longue que `length`
+        df = ohlcv_to_df(rows[:k])
+        want = ta.atr(df["high"], df["low"], df["close"], length=14).iloc[-1]
+        assert got == pytest.approx(float(want), rel=1e-9, abs=0), (case, k)
+
+
+def test_score_latest_matches_compute_scores(bitget_candles):
+    for symbol, by_gran in bitget_candles.items():
+        want = compute_scores_from_ohlcv(by_gran["1h"], by_gran["1day"], backend="pandas_ta")
+        for label, gran in (("1h", "1h"), ("1d", "1day")):
+            got = score_latest(IndicatorState.from_rows(by_gran[gran]))
+            if "error" in want[label]:
+                assert got == want[label], (symbol, label)
+                continue
+            assert got["score"] == pytest.approx(want[label]["score"], rel=1e-9), (symbol, label)
+    assert score_latest(IndicatorState()) == {"error": "no data", "score": 0.0}
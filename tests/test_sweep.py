@@ -0,0 +1,37 @@
+# tests/test_sweep.py
+import numpy as np
+
+from services.scanner.src.batch_scoring import WEIGHT_TERMS
+from services.scanner.src.scoring import compute_norms_from_indicator_df, compute_simple_score
+from services.scanner.src.sweep import FEATURE_KEYS, _eval_caps, weight_grid
+
+
+def quantized_features(n_bars: int, seed: int = 0) -> dict:
+    # normes multiples de 0.05 et poids multiples de 0.25: beaucoup de scores tombent pile sur un seuil
+    rng = np.random.default_rng(seed)
+    steps = lambda: rng.integers(0, 21, n_bars) * 0.05  # noqa: E731
+    f = {
+        "volume": steps() * 3.0,
+        "vol_ma20": np.ones(n_bars),
+        "atr_pct": steps() * 0.05,
+        "vol_spike_ratio": steps() * 3.0,
+        "adx": steps() * 40.0,
+        "rsi": 60.0 - steps() * 30.0,
+    }
+    f["fwd"] = {1: rng.normal(0.0, 0.01, n_bars)}
+    return f
+
+
+def test_alerts_match_live_scoring_at_the_threshold():
+    f = quantized_features(400)
+    weights = weight_grid(0.25)
+    thresholds = [0.5, 0.6, 0.7]
+    caps = {"volume_ratio_cap": 3.0, "atr_pct_cap": 0.05, "adx_cap": 40.0}
+    got = _eval_caps(caps, weights, thresholds, block=64, features=f)["n"][0]
+
+    # même décision que ScoringPool: normes et score float64 barre par barre
+    live = np.array([compute_simple_score(compute_norms_from_indicator_df({k: f[k][i] for k in FEATURE_KEYS}, caps),
+                                          dict(zip((key for key, _, _ in WEIGHT_TERMS), w)))
+                     for i in range(400) for w in weights]).reshape(400, len(weights))
+    expected = np.array([(live >= thr).sum(axis=0) for thr in thresholds])
+    assert np.array_equal(got, expected)
@@ -0,0 +1,101 @@
+# tests/test_ta_kernels.py
+# Parité des noyaux ATR/RSI/ADX (numpy, numba) avec pandas_ta, qui reste la référence.
+import numpy as np
+import pandas as pd
+import pandas_ta as ta
+import pytest
+
+from services.scanner.src import ta_kernels
+from services.scanner.src.scoring import compute_indicators, latest_indicators, parse_candles, candles_to_df
+
+BACKENDS = ["numpy", pytest.param("numba", marks=pytest.mark.skipif(not ta_kernels.HAS_NUMBA,
+                                                                      reason="numba absent"))]
+
+
+def reference(high, low, close):
+    h, l, c = (pd.Series(x) for x in (high, low, close))
+    return (ta.atr(h, l, c, length=14).to_numpy(), ta.rsi(c, length=14).to_numpy(),
+            ta.adx(h, l, c, length=14)["ADX_14"].to_numpy())
+
+
+def assert_same(got, want):
+    # mêmes NaN aux mêmes places, valeurs égales à l'arrondi flottant près (pas de tolérance absolue:
+    # un ATR de 0 contre eps doit échouer)
+    got, want = np.asarray(got, dtype=float), np.asarray(want, dtype=float)
+    assert got.shape == want.shape
+    np.testing.assert_array_equal(np.isnan(got), np.isnan(want))
+    ok = ~np.isnan(want)
+    np.testing.assert_allclose(got[ok], want[ok], rtol=1e-9, atol=0)
+
+
+def walk(n, seed=1):
+    rng = np.random.default_rng(seed)
+    close = np.cumprod(1 + rng.normal(0, 0.01, n)) * 10
+    return close * (1 + rng.uniform(0, 0.01, n)), close * (1 - rng.uniform(0, 0.01, n)), close
+
+
+def _flat_bars():
+    high, low, close = walk(200, seed=2)
+    high[50:60] = low[50:60] = close[50:60] = close[50]
+    return high, low, close
+
+
+def _flat_start():
+    # premières barres plates: l'ATR amorcé vaut eps chez pandas_ta, pas 0
+    high, low, close = walk(120, seed=3)
+    high[:30] = low[:30] = close[:30] = close[30]
+    return high, low, close
+
+
+def _nan_gap():
+    high, low, close = walk(200, seed=4)
+    high[100] = low[100] = close[100] = np.nan
+    return high, low, close
+
+
+CASES = {
+    "random_walk": lambda: walk(300),
+    "flat_bars": _flat_bars,
+    "flat_start": _flat_start,
+    "nan_gap": _nan_gap,
+    "short": lambda: walk(20, seed=5),
+    "all_flat": lambda: (np.full(60, 5.0), np.full(60, 5.0), np.full(60, 5.0)),
+}
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+@pytest.mark.parametrize("case", sorted(CASES))
+def test_wilder_matches_pandas_ta(case, backend):
+    high, low, close = CASES[case]()
+    for got, want in zip(ta_kernels.wilder_indicators(high, low, close, backend), reference(high, low, close)):
+        assert_same(got, want)
+
+
+def test_numpy_2d_rows_match_pandas_ta_on_each_series():
+    # en 2-D les NaN de tête sont du padding: chaque ligne = pandas_ta sur sa série courte
+    series = [walk(300, seed=6), walk(80, seed=7), _flat_bars()]
+    T = max(len(s[2]) for s in series)
+    stacked = [np.full((len(series), T), np.nan) for _ in range(3)]
+    for i, s in enumerate(series):
+        for k in range(3):
+            stacked[k][i, T - len(s[k]):] = s[k]
+    got = ta_kernels.wilder_indicators(*stacked, backend="numpy")
+    for i, s in enumerate(series):
+        n = len(s[2])
+        for g, want in zip(got, reference(*s)):
+            assert_same(g[i, T - n:], want)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_latest_indicators_match_pandas_ta_on_recorded_candles(bitget_candles, backend):
+    for symbol, by_gran in bitget_candles.items():
+        for gran, rows in by_gran.items():
+            candles = parse_candles(rows)
+            df = compute_indicators(candles_to_df(candles), "pandas_ta")
+            got = latest_indicators(candles, backend)
+            if df.empty:
+                assert got is None, (symbol, gran)
+                continue
+            want = df.iloc[-1]
+            for col in ("atr", "atr_pct", "rsi", "adx", "ma20", "ma50", "vol_ma20", "vol_spike_ratio"):
+                assert got[col] == pytest.approx(float(want[col]), rel=1e-9, nan_ok=True), (symbol, gran, col)
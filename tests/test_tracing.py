@@ -0,0 +1,83 @@
+# tests/test_tracing.py
+import json
+import os
+import random
+
+import pytest
+
+from services.scanner.src.tracing import SweepTracer, parse_rate
+
+
+@pytest.mark.parametrize("raw, rate", [("0.25", 0.25), (" 1 ", 1.0), ("0", 0.0), ("5%", 0.05), ("100%", 1.0),
+                                       (0.5, 0.5)])
+def test_parse_rate_accepts_fractions_and_percents(raw, rate):
+    assert parse_rate(raw) == pytest.approx(rate)
+
+
+@pytest.mark.parametrize("raw", [None, "", "abc", "%", "2", "-0.1", "150%", "nan", "inf"])
+def test_parse_rate_rejects_bad_input(raw):
+    assert parse_rate(raw) is None
+
+
+def test_sampling_rate_is_honoured_per_symbol(tmp_path):
+    random.seed(1)
+    tracer = SweepTracer(rate=0.1, out_dir=str(tmp_path))
+    symbols = [f"S{i}USDT" for i in range(5000)]
+    hits = [s for s in symbols if tracer.sampled(s)]
+    assert 400 < len(hits) < 600
+    # un symbole tiré le reste pour tout le sweep, les autres non plus
+    assert all(tracer.sampled(s) for s in hits)
+    assert sum(tracer.sampled(s) for s in symbols) == len(hits)
+
+    off = SweepTracer(rate=0.0, out_dir=str(tmp_path))
+    with off.span("BTCUSDT", "fetch_1h"):
+        pass
+    assert not any(off.sampled(s) for s in symbols) and len(off) == 0
+    full = SweepTracer(rate=1.0, out_dir=str(tmp_path))
+    assert all(full.sampled(s) for s in symbols)
+
+
+def test_set_rate_falls_back_to_the_env_default(tmp_path):
+    tracer = SweepTracer(rate=0.01, out_dir=str(tmp_path))
+    tracer.set_rate("50%")
+    assert tracer.rate == 0.5
+    tracer.set_rate(None)
+    assert tracer.rate == 0.01
+    tracer.set_rate("garbage")
+    assert tracer.rate == 0.01
+
+
+def test_dump_writes_chrome_trace_json(tmp_path):
+    tracer = SweepTracer(rate=1.0, out_dir=str(tmp_path), keep=2, name="w0")
+    with tracer.span("BTCUSDT", "fetch_1h", bars=200):
+        pass
+    tracer.add("BTCUSDT", "indicators", 100.0, 100.25)
+    tracer.add("batch", "redis_write", 100.5, 100.4)
+    tracer.instant("PEPEUSDT", "alert", 101.0)
+
+    path = tracer.dump("sweep-1")
+    assert os.path.basename(path).startswith("sweep-1-w0-")
+    with open(path, encoding="utf-8") as f:
+        trace = json.load(f)
+    events = trace["traceEvents"]
+    spans = [e for e in events if e["ph"] == "X"]
+    assert [e["name"] for e in spans] == ["fetch_1h", "indicators", "redis_write"]
+    for e in spans:
+        assert isinstance(e["ts"], float) and e["dur"] >= 0 and isinstance(e["tid"], int)
+    assert spans[0]["args"] == {"bars": 200}
+    assert (spans[1]["ts"], spans[1]["dur"]) == (100e6, 0.25e6)
+    assert spans[2]["dur"] == 0.0
+    # un fil nommé par symbole, plus le fil "batch"
+    lanes = {e["args"]["name"]: e["tid"] for e in events if e["name"] == "thread_name"}
+    assert lanes == {"batch": 0, "BTCUSDT": 1, "PEPEUSDT": 2}
+    assert [e["ph"] for e in events if e["name"] == "alert"] == ["i"]
+
+    # le dump repart de zéro; seuls les `keep` fichiers les plus récents restent
+    assert tracer.dump("sweep-2") is None and len(tracer) == 0
+    for gen in (2, 3, 4):
+        tracer.add("batch", "redis_write", 0.0, 1.0)
+        os.utime(tracer.dump(f"sweep-{gen}"), (gen, gen))
+    os.utime(path, (1, 1))
+    tracer.add("batch", "redis_write", 0.0, 1.0)
+    tracer.dump("sweep-5")
+    assert sorted(f.split("-w0-")[0] for f in os.listdir(tmp_path)) == ["sweep-4", "sweep-5"]
@@ -0,0 +1,46 @@
+# tests/test_universe.py
+import json
+import os
+
+import pytest
+
+from services.scanner.src.data_build import (build_universe, diff_universe, load_universe, symbols_from_universe,
+                                             write_universe)
+
+
+def coin(name, chain="ERC20", withdrawable="true", fee="1"):
+    return {"coin": name, "chains": [{"chain": chain, "withdrawable": withdrawable, "withdrawFee": fee}]}
+
+
+def pair(base, quote="USDT", status="online"):
+    return {"symbol": f"{base}{quote}", "baseCoin": base, "quoteCoin": quote, "status": status}
+
+
+def test_build_keeps_online_usdt_pairs_of_supported_chains():
+    coins = [coin("BTC", "BTC"), coin("ETH"), coin("XYZ", "UNKNOWNCHAIN"), coin("OFF", withdrawable="false")]
+    symbols = [pair("ETH"), pair("BTC"), pair("BTC", "EUR"), pair("XYZ"), pair("OFF"), pair("ETH", status="offline")]
+    universe = build_universe(coins, symbols)
+    # trié par rang de la meilleure chain: BTC avant ERC20
+    assert symbols_from_universe(universe) == ["BTCUSDT", "ETHUSDT"]
+
+
+def test_diff_reports_added_removed_and_changed():
+    old = build_universe([coin("BTC", "BTC"), coin("ETH"), coin("SOL", "SOL")], [pair("BTC"), pair("ETH"), pair("SOL")])
+    new = build_universe([coin("BTC", "BTC"), coin("ETH", fee="2"), coin("SUI", "SUI")],
+                         [pair("BTC"), pair("ETH"), pair("SUI")])
+    assert diff_universe(old, new) == {"added": ["SUIUSDT"], "removed": ["SOLUSDT"], "changed": ["ETHUSDT"]}
+    assert diff_universe(new, new) == {"added": [], "removed": [], "changed": []}
+
+
+def test_write_is_atomic(tmp_path):
+    path = str(tmp_path / "pairs.json")
+    first = build_universe([coin("ETH")], [pair("ETH")])
+    write_universe(first, path)
+    assert load_universe(path) == first and os.listdir(tmp_path) == ["pairs.json"]
+    # écriture qui échoue en cours de route: l'ancien fichier reste entier
+    with pytest.raises(TypeError):
+        write_universe([{"coin": "BAD", "pairs": [{"symbol": object()}]}], path)
+    with open(path, encoding="utf-8") as f:
+        assert json.load(f) == first
+    assert os.listdir(tmp_path) == ["pairs.json"]
+    assert load_universe(str(tmp_path / "missing.json")) == []
@@ -0,0 +1,125 @@
+# tests/test_worker_pipeline.py
+# _process_symbols de bout en bout sur les bougies enregistrées: prefilter, cutoffs par unité de temps, redis.
+import asyncio
+import json
+
+import pytest
+
+from services.scanner.src import candle_store, prefilter, worker
+from services.scanner.src.prefilter import TickerPrefilter, cutoffs_from_config
+from services.scanner.src.result_store import REDIS_TOP_PREFIX, load_result
+from services.scanner.src.scoring import latest_indicators, parse_candles
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+
+@pytest.fixture
+def make_worker(monkeypatch, tmp_path, bitget_candles):
+    server = fakeredis.FakeServer()
+    monkeypatch.setattr(worker.aioredis, "from_url",
+                        lambda *a, **k: fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+    monkeypatch.setattr(worker, "CANDLE_ARCHIVE_DIR", "")
+
+    async def fake_get_candles(symbol, granularity, limit=200, startTime=None, endTime=None):
+        rows = bitget_candles[symbol][granularity]
+        if startTime:
+            rows = [r for r in rows if int(r[0]) >= int(startTime)]
+        return rows[-limit:]
+
+    async def fake_get_tickers(symbol=None):
+        # PEPEUSDT sous le volume minimum des tests
+        return [{"symbol": s, "usdtVolume": "100" if s == "PEPEUSDT" else "1e9", "bidPr": "1", "askPr": "1.0001"}
+                for s in bitget_candles]
+
+    monkeypatch.setattr(candle_store, "get_candles", fake_get_candles)
+    monkeypatch.setattr(prefilter, "get_tickers", fake_get_tickers)
+    path = tmp_path / "pairs.json"
+    path.write_text(json.dumps([{"pairs": [{"symbol": s}]} for s in bitget_candles]))
+
+    def build(scan: dict):
+        w = worker.BotWorker(symbols_file=str(path), scoring_workers=0)
+        w.prefilter = TickerPrefilter(cfg=scan)
+        w.cutoffs = cutoffs_from_config(scan)
+        return w
+
+    return build
+
+
+def test_cutoffs_are_off_unless_enabled():
+    assert cutoffs_from_config({"atr_cutoff": 0.01, "adx_cutoff": 20}) == {}
+    assert cutoffs_from_config({"cutoffs_enabled": True, "atr_cutoff": 0.01}) == {"atr_cutoff": 0.01}
+
+
+def test_failed_1h_cutoff_still_scores_1d(make_worker, bitget_candles):
+    rows = bitget_candles["BTCUSDT"]
+    atr_1h = latest_indicators(parse_candles(rows["1h"]))["atr_pct"]
+    atr_1d = latest_indicators(parse_candles(rows["1day"]))["atr_pct"]
+    assert atr_1h < atr_1d
+    w = make_worker({"cutoffs_enabled": True, "atr_cutoff": (atr_1h + atr_1d) / 2})
+
+    async def scenario():
+        results = await w._process_symbols(["BTCUSDT"])
+        stored = await load_result(w.r, worker.REDIS_RESULT_PREFIX, "BTCUSDT")
+        ranks = {tf: await w.r.zrange(REDIS_TOP_PREFIX + tf, 0, -1) for tf in ("1h", "1d")}
+        return results[0], stored, ranks
+
+    result, stored, ranks = asyncio.run(scenario())
+    assert result["summary"]["1h"]["filtered"] and result["summary"]["1h"]["error"].startswith("cutoff: atr_pct")
+    assert result["summary"]["1d"]["score"] > 0
+    assert stored["1h"]["filtered"] and stored["1d"]["score"] == result["summary"]["1d"]["score"]
+    assert ranks == {"1h": [], "1d": ["BTCUSDT"]}
+
+
+def test_prefiltered_symbol_leaves_the_rankings(make_worker):
+    w = make_worker({})
+    strict = TickerPrefilter(cfg={"min_volume": 1e6})
+
+    async def scenario():
+        await w._process_symbols(["BTCUSDT", "PEPEUSDT"])
+        before = await w.r.zrange(REDIS_TOP_PREFIX + "1h", 0, -1)
+        w.prefilter = strict
+        results = await w._process_symbols(["BTCUSDT", "PEPEUSDT"])
+        after = {tf: await w.r.zrange(REDIS_TOP_PREFIX + tf, 0, -1) for tf in ("1h", "1d")}
+        return before, results, after, await load_result(w.r, worker.REDIS_RESULT_PREFIX, "PEPEUSDT")
+
+    before, results, after, stored = asyncio.run(scenario())
+    assert sorted(before) == ["BTCUSDT", "PEPEUSDT"]
+    assert results[1]["error"].startswith("prefilter: volume")
+    assert after == {"1h": ["BTCUSDT"], "1d": ["BTCUSDT"]}
+    assert stored["1h"]["filtered"] and stored["1d"]["filtered"]
+
+
+def test_refreshed_universe_is_scanned_without_restart(make_worker, monkeypatch, tmp_path):
+    from services.scanner.src import data_build
+
+    # l'exchange liste NEWUSDT et retire PEPEUSDT
+    listing = {
+        data_build.URL_COINS: [{"coin": c, "chains": [{"chain": "ERC20", "withdrawable": "true"}]}
+                               for c in ("BTC", "NEW")],
+        data_build.URL_SYMBOLS: [{"symbol": f"{c}USDT", "baseCoin": c, "quoteCoin": "USDT", "status": "online"}
+                                 for c in ("BTC", "NEW")],
+    }
+
+    async def fake_fetch_json(url):
+        return listing[url]
+
+    monkeypatch.setattr(data_build, "fetch_json", fake_fetch_json)
+    monkeypatch.setattr(worker, "SCAN_SCHEDULE", "priority")
+    w = make_worker({})
+    # univers au démarrage: BTCUSDT et PEPEUSDT
+    w.set_symbols(["BTCUSDT", "PEPEUSDT"])
+    (tmp_path / "pairs.json").write_text(json.dumps([{"pairs": [{"symbol": s}]} for s in w.universe]))
+
+    async def scenario():
+        changed = await w.refresh_universe()
+        results = await w.run_once_batch()
+        return changed, results
+
+    changed, results = asyncio.run(scenario())
+    assert changed
+    assert sorted(w.symbols) == ["BTCUSDT", "NEWUSDT"]
+    assert sorted(w.scheduler.entries) == ["BTCUSDT", "NEWUSDT"]
+    assert sorted(r["symbol"] for r in results) == ["BTCUSDT", "NEWUSDT"]
+    # le fichier des paires est réécrit: un redémarrage repart du nouvel univers
+    assert w._load_symbols_file(w.symbols_file) == ["BTCUSDT", "NEWUSDT"]
@@ -0,0 +1,91 @@
+# tests/test_ws_replay.py
+# BitgetWsIngest branché sur ReplayServer (trames de fixtures/ws_frames.jsonl, format WS_RECORD_FILE):
+# fusion dans le CandleStore, clôtures de bougies, puis coupure -> reconnexion -> rattrapage REST.
+import asyncio
+import json
+import os
+
+from services.scanner.src import candle_store
+from services.scanner.src.candle_store import CandleStore
+from services.scanner.src.ws_ingest import BitgetWsIngest
+from services.scanner.src.ws_replay import ReplayServer, load_frames
+
+from conftest import FIXTURES
+
+SYMBOLS = ["BTCUSDT", "PEPEUSDT"]
+
+
+def test_replay_merges_closes_bars_and_refills_after_reconnect(bitget_candles, monkeypatch):
+    frames = load_frames(os.path.join(FIXTURES, "ws_frames.jsonl"))
+    rest_calls = []
+
+    async def fake_get_candles(symbol, granularity, limit=200, startTime=None, endTime=None):
+        # 1re connexion: l'API s'arrête à la bougie en cours R[-4], le flux WS apporte la suite.
+        # Après la coupure, les bougies fermées entre-temps (R[-1] n'a jamais été poussée) viennent du REST.
+        first = (symbol, granularity) not in {(s, g) for s, g, _ in rest_calls}
+        rest_calls.append((symbol, granularity, startTime))
+        rows = bitget_candles[symbol][granularity]
+        if first and granularity == "1h":
+            rows = rows[:-3]
+        if startTime:
+            rows = [r for r in rows if int(r[0]) >= int(startTime)]
+        return rows[-limit:]
+
+    monkeypatch.setattr(candle_store, "get_candles", fake_get_candles)
+    store = CandleStore(size=200)
+    closes, gap_fills = [], []
+
+    def on_bar_close(symbol, granularity, ts):
+        closes.append((symbol, granularity, ts, store.rows(symbol, granularity, limit=2)))
+
+    async def scenario():
+        # la connexion est coupée après la dernière trame: exerce reconnexion + rattrapage
+        server = ReplayServer(frames, speed=1.0, drop_after=len(frames))
+        url = await server.start()
+        ingest = BitgetWsIngest(store, SYMBOLS, ["1h", "1day"], on_bar_close=on_bar_close,
+                                on_gap_filled=gap_fills.append, url=url, record_file="")
+        await ingest.start()
+        try:
+            for _ in range(200):
+                if len(gap_fills) >= 2:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await ingest.stop()
+            await server.stop()
+        return ingest, server
+
+    ingest, server = asyncio.run(scenario())
+
+    assert server.stats["dropped"] >= 1
+    assert ingest.stats["reconnects"] >= 1
+    assert gap_fills[:2] == [SYMBOLS, SYMBOLS]
+    assert ingest.stats["candles"] > 0
+
+    # clôtures: R[-4] fermée par l'ouverture de R[-3], puis R[-3] par R[-2], pour chaque symbole
+    expected = []
+    for symbol in SYMBOLS:
+        rows = bitget_candles[symbol]["1h"]
+        expected += [(symbol, "1h", int(rows[-4][0])), (symbol, "1h", int(rows[-3][0]))]
+    assert sorted(c[:3] for c in closes) == sorted(expected)
+    for symbol, granularity, ts, last_two in closes:
+        rows = bitget_candles[symbol]["1h"]
+        closed = next(r for r in rows if int(r[0]) == ts)
+        # la bougie clôturée porte ses valeurs finales (le tick intermédiaire a été remplacé)
+        assert last_two[0] == closed, (symbol, ts)
+        assert int(last_two[1][0]) > ts
+
+    # rattrapage REST à chaque connexion, jusqu'à la bougie manquée pendant la coupure
+    for symbol in SYMBOLS:
+        for granularity in ("1h", "1day"):
+            assert sum(1 for s, g, _ in rest_calls if (s, g) == (symbol, granularity)) >= 2
+            assert store.rows(symbol, granularity) == bitget_candles[symbol][granularity][-200:]
+
+
+def test_recorded_frames_parse():
+    frames = load_frames(os.path.join(FIXTURES, "ws_frames.jsonl"))
+    assert [t for t, _, _ in frames] == sorted(t for t, _, _ in frames)
+    channels = {key for _, key, _ in frames}
+    assert channels == {(c, s) for s in SYMBOLS for c in ("candle1H", "candle1D")}
+    for _, _, text in frames:
+        assert len(json.loads(text)["data"][0]) == 8